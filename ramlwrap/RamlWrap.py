@@ -22,6 +22,7 @@ sing it and put it on youtube...
 """
 import logging
 
+from . utils.config import get_setting
 from . utils.raml import raml_url_patterns
 from . utils.exceptions import FatalException
 
@@ -29,15 +30,24 @@ from . utils.exceptions import FatalException
 logger = logging.getLogger(__name__)
 
 
-def ramlwrap(file_path, function_map):
+def ramlwrap(file_path, function_map, hot_reload=None):
     """
     Check if the file is Raml and parse as appropriate.
+    With hot_reload (which defaults to the RAMLWRAP_HOT_RELOAD setting) the
+    patterns follow changes to the file, see utils.reload.
     """
 
+    if hot_reload is None:
+        hot_reload = get_setting('RAMLWRAP_HOT_RELOAD', False)
+
     try:
         # Check if file is RAML (.raml)
         if file_path.endswith(".raml"):
-            patterns = raml_url_patterns(file_path, function_map)
+            if hot_reload:
+                from . utils.reload import raml_reloading_url_patterns
+                patterns = raml_reloading_url_patterns(file_path, function_map)
+            else:
+                patterns = raml_url_patterns(file_path, function_map)
         else:
             error_msg = "The file: '{}' does not have a .raml extension!".format(file_path)
             logger.error(error_msg)
@@ -1 +1,32 @@
-from .RamlWrap import ramlwrap
\ No newline at end of file
+"""
+Raml API mapping toolkit for Django.
+
+The public names are imported on first use (PEP 562), so `import ramlwrap`
+doesn't pull in Django, jsonschema or yaml for processes that never serve a
+ramlwrap url, such as management commands.
+"""
+import importlib
+
+# Public name to the module it lives in
+_lazy_imports = {
+    "Registry": ".utils.registry",
+    "preload": ".utils.preload",
+    "ramlwrap": ".RamlWrap",
+}
+
+__all__ = sorted(_lazy_imports)
+
+
+def __getattr__(name):
+    module = _lazy_imports.get(name)
+    if module is None:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    # Cache it so __getattr__ isn't called for it again
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_imports))
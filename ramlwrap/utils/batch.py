@@ -0,0 +1,279 @@
+"""
+Offline batch validation of payloads against the request body of a raml method.
+
+Checks archived payloads against the current spec, e.g. before a schema change
+ships, without going through Endpoint.serve. Payloads are decoded and validated
+with the same BodyHandler (decoder plus compiled schema) used when serving, in
+a pool of worker processes:
+
+    results = validate_batch("api.raml", "/orders", "POST", open("payloads.jsonl", "rb"))
+    for failure in results:
+        print(failure.index, failure.path, failure.message)
+    print(results.total, results.failed)
+
+Failures are streamed back in payload order while the pool works on the rest.
+From the command line, with one failure per line on stdout and the counts on stderr:
+
+    python -m ramlwrap.utils.batch api.raml /orders POST payloads.jsonl --processes 8
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+
+from collections import deque
+from multiprocessing import Pool
+
+from jsonschema.exceptions import ValidationError
+
+from . decoders import normalise_media_type
+from . raml import raml_endpoints
+from . schemas import error_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# The handler of the worker process, see _init_worker
+_worker_handler = None
+_worker_content_type = None
+
+
+class BatchFailure:
+    """
+    A payload that failed validation.
+    """
+
+    __slots__ = ("index", "message", "path", "validator")
+
+    def __init__(self, index, message, path=None, validator=None):
+        """
+        :param index: position of the payload in the input, from 0 (blank lines count).
+        :param message: the validation error message.
+        :param path: json path of the invalid value, e.g. '$.items[0].name', None if the payload is malformed.
+        :param validator: the failed json schema keyword, e.g. 'required', or 'malformed'.
+        """
+
+        self.index = index
+        self.message = message
+        self.path = path
+        self.validator = validator
+
+    def to_dict(self):
+        return {"index": self.index, "path": self.path, "validator": self.validator, "message": self.message}
+
+
+class BatchValidation:
+    """
+    The failures of a batch validation, validated as they are iterated over.
+    The counts are final once iteration is done.
+    """
+
+    def __init__(self, handler, content_type, payloads, pool_args=None, processes=1, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Initialisation function."""
+
+        self.handler = handler
+        self.content_type = content_type
+        self.payloads = payloads
+        self.pool_args = pool_args
+        self.processes = processes
+        self.chunk_size = chunk_size
+
+        self.total = 0
+        self.failed = 0
+        self.by_validator = {}
+
+    @property
+    def passed(self):
+        return self.total - self.failed
+
+    def summary(self):
+        """
+        :returns: dict of the counts.
+        """
+
+        return {"total": self.total, "passed": self.passed, "failed": self.failed, "by_validator": self.by_validator}
+
+    def __iter__(self):
+        chunks = _chunks(self.payloads, self.chunk_size)
+
+        if self.processes == 1:
+            results = (_validate_chunk(chunk, self.handler, self.content_type) for chunk in chunks)
+            yield from self._collect(results)
+        else:
+            with Pool(self.processes, initializer=_init_worker, initargs=self.pool_args) as pool:
+                yield from self._collect(self._pooled(pool, chunks))
+
+    def _pooled(self, pool, chunks):
+        """
+        Validate the chunks in the pool, in order. Unlike Pool.imap this only
+        reads a few chunks ahead, so a huge input isn't read into memory.
+        """
+
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_validate_worker_chunk, (chunk,)))
+            if len(pending) >= self.processes * 2:
+                yield pending.popleft().get()
+
+        while pending:
+            yield pending.popleft().get()
+
+    def _collect(self, results):
+        for count, failures in results:
+            self.total += count
+            for failure in failures:
+                self.failed += 1
+                self.by_validator[failure.validator] = self.by_validator.get(failure.validator, 0) + 1
+                yield failure
+
+
+def validate_batch(raml_filepath, path, method, payloads, content_type=None, processes=None,
+                   chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Validate payloads against the request body of a raml method.
+    :param raml_filepath: the path to the raml file (not a file pointer).
+    :param path: the raml resource path, e.g. '/orders' or '/orders/{order_id}'.
+    :param method: the http method, e.g. 'POST'.
+    :param payloads: iterable of request bodies (bytes or str, e.g. the lines of a JSONL file)
+        or of already decoded data.
+    :param content_type: the request content type the payloads are in, defaults to the first one declared.
+    :param processes: number of worker processes, defaults to the number of usable cpus. 1 validates in this process.
+    :param chunk_size: number of payloads sent to a worker at a time.
+    :raises ValueError: raised when the raml has no such method, or it takes no such content type.
+    :returns: a BatchValidation - iterate over it for the BatchFailures.
+    """
+
+    handler, content_type = _find_handler(raml_filepath, path, method, content_type)
+
+    if processes is None:
+        # The cpus this process may actually run on, where the os can tell us
+        if hasattr(os, "sched_getaffinity"):
+            processes = len(os.sched_getaffinity(0))
+        else:
+            processes = os.cpu_count() or 1
+
+    return BatchValidation(handler, content_type, payloads, (raml_filepath, path, method, content_type),
+                           processes, chunk_size)
+
+
+def _find_handler(raml_filepath, path, method, content_type=None):
+    """
+    Find the BodyHandler for the request body of a raml method.
+    :returns: tuple of the handler and the content type it handles.
+    """
+
+    resource = path[1:] if path.startswith("/") else path
+    for endpoint in raml_endpoints(raml_filepath, {}):
+        # Matched on the raml path, the url is a regex for resources with uriParameters
+        if any(action.resource == resource for action in endpoint.request_method_mapping.values()):
+            break
+    else:
+        raise ValueError("No resource %s in %s" % (path, raml_filepath))
+
+    action = endpoint.request_method_mapping.get(method.upper())
+    if action is None:
+        raise ValueError("No %s method for %s in %s" % (method.upper(), path, raml_filepath))
+    if not action.request_handlers:
+        raise ValueError("No request body declared for %s %s" % (method.upper(), path))
+
+    if content_type is None:
+        content_type = next(iter(action.request_handlers))
+
+    handler = action.request_handlers.get(normalise_media_type(content_type))
+    if handler is None:
+        raise ValueError("Content type %s not declared for %s %s" % (content_type, method.upper(), path))
+
+    return handler, content_type
+
+
+def _chunks(payloads, chunk_size):
+    """Split the payloads into lists of (index, payload)."""
+
+    indexed = enumerate(payloads)
+    while True:
+        chunk = list(itertools.islice(indexed, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _validate_chunk(chunk, handler, content_type):
+    """
+    Validate a chunk of payloads.
+    :returns: tuple of the number of payloads validated and the list of BatchFailures.
+    """
+
+    count = 0
+    failures = []
+    for index, payload in chunk:
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+
+        if isinstance(payload, bytes) and not payload.strip():
+            # Blank line
+            continue
+
+        count += 1
+        try:
+            if isinstance(payload, bytes):
+                handler(payload, content_type)
+            elif handler.validator is not None:
+                # Already decoded
+                handler.validator.validate(payload)
+        except ValidationError as e:
+            failures.append(BatchFailure(index, e.message, error_path(e), e.validator))
+        except Exception as e:
+            failures.append(BatchFailure(index, str(e), validator="malformed"))
+
+    return count, failures
+
+
+def _init_worker(raml_filepath, path, method, content_type):
+    """Compile the handler once per worker process."""
+
+    global _worker_handler, _worker_content_type
+
+    _worker_handler, _worker_content_type = _find_handler(raml_filepath, path, method, content_type)
+
+
+def _validate_worker_chunk(chunk):
+    return _validate_chunk(chunk, _worker_handler, _worker_content_type)
+
+
+def main(argv=None):
+    """Validate a JSONL file of payloads, see the module docstring."""
+
+    parser = argparse.ArgumentParser(description="Validate payloads against the request body of a raml method.")
+    parser.add_argument("raml_file")
+    parser.add_argument("path", help="raml resource path, e.g. /orders")
+    parser.add_argument("method", help="http method, e.g. POST")
+    parser.add_argument("payloads", help="file with one payload per line, - for stdin")
+    parser.add_argument("--content-type", default=None)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.payloads == "-":
+        payloads = sys.stdin.buffer
+    else:
+        payloads = open(args.payloads, "rb")
+
+    try:
+        results = validate_batch(args.raml_file, args.path, args.method, payloads, args.content_type,
+                                 args.processes, args.chunk_size)
+        for failure in results:
+            sys.stdout.write(json.dumps(failure.to_dict()) + "\n")
+    finally:
+        if payloads is not sys.stdin.buffer:
+            payloads.close()
+
+    sys.stderr.write(json.dumps(results.summary()) + "\n")
+    return 1 if results.failed else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
@@ -0,0 +1,360 @@
+"""
+Json schemas compiled to python source.
+
+jsonschema walks the schema and dispatches on every keyword for every request
+it validates. For schemas using only the common keywords, compile_validator
+generates a function doing the same checks as straight-line python instead:
+type checks, required keys, precompiled patterns and loops over the items,
+built once, when the schema is compiled as the raml is loaded. For
+
+    {"type": "object", "required": ["name"], "properties": {"name": {"type": "string"}}}
+
+it generates
+
+    def check_0(data):
+        if not (isinstance(data, dict)):
+            return False
+        if isinstance(data, dict):
+            if 'name' not in data:
+                return False
+            if 'name' in data:
+                v_1 = data['name']
+                if not (isinstance(v_1, str)):
+                    return False
+        return True
+
+The function only tells whether data is valid. SchemaValidator calls it first
+and only runs jsonschema, for the error to raise, when it returns False, so
+errors are exactly those jsonschema gives. Schemas using any other keyword
+($ref, patternProperties, multipleOf, ...) are left to jsonschema. Turn it
+off with RAMLWRAP_GENERATED_VALIDATORS = False.
+"""
+import logging
+import numbers
+import re
+
+import jsonschema
+
+from jsonschema import Draft4Validator
+from jsonschema.validators import validator_for
+
+logger = logging.getLogger(__name__)
+
+# Drafts the generated checks follow, those the installed jsonschema has. Draft 4 has boolean
+# exclusiveMinimum/Maximum
+_DRAFTS = tuple(getattr(jsonschema, name) for name in (
+    "Draft4Validator", "Draft6Validator", "Draft7Validator", "Draft201909Validator", "Draft202012Validator")
+    if hasattr(jsonschema, name))
+
+# Keywords the generated checks implement; format is only checked with a format checker, which isn't used
+_SUPPORTED = frozenset([
+    "type", "enum", "const", "format",
+    "minLength", "maxLength", "pattern",
+    "minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum",
+    "properties", "required", "additionalProperties", "minProperties", "maxProperties",
+    "items", "minItems", "maxItems", "uniqueItems",
+    "allOf", "anyOf", "oneOf", "not",
+])
+
+_TYPE_CHECKS = {
+    "string": "isinstance({0}, str)",
+    "object": "isinstance({0}, dict)",
+    "array": "isinstance({0}, list)",
+    "boolean": "isinstance({0}, bool)",
+    "null": "{0} is None",
+    "number": "(isinstance({0}, _Number) and not isinstance({0}, bool))",
+    "integer": "(isinstance({0}, int) and not isinstance({0}, bool)"
+               " or isinstance({0}, float) and {0}.is_integer())",
+}
+
+# Before draft 6, floats are never integers
+_LEGACY_INTEGER = "(isinstance({0}, int) and not isinstance({0}, bool))"
+
+
+class _Unsupported(Exception):
+    """The schema uses something the generated checks don't implement."""
+
+
+def compile_validator(schema, cls=None):
+    """
+    Compile a json schema into a function checking data against it.
+    :param schema: the json schema, as a dict.
+    :param cls: the jsonschema validator class for the schema, defaults to the one its $schema asks for.
+    :returns: function of data returning True if it is valid, or None if the schema
+        can't be compiled (it is then left to jsonschema).
+    """
+
+    try:
+        source, namespace, name = generate_source(schema, cls)
+    except _Unsupported as e:
+        logger.debug("Schema left to jsonschema: %s", e)
+        return None
+
+    try:
+        exec(compile(source, "<ramlwrap schema>", "exec"), namespace)
+    except (SyntaxError, RecursionError, MemoryError) as e:
+        # e.g. nested deeper than python allows
+        logger.debug("Schema left to jsonschema, the generated source doesn't compile: %s", e)
+        return None
+
+    return namespace[name]
+
+
+def generate_source(schema, cls=None):
+    """
+    Generate the source of the function checking data against a json schema, see compile_validator.
+    :param schema: the json schema, as a dict.
+    :param cls: the jsonschema validator class for the schema.
+    :raises _Unsupported: raised when the schema uses a keyword or draft the generated checks don't implement.
+    :returns: tuple of the source, the namespace to run it in and the name of the function.
+    """
+
+    if cls is None:
+        cls = validator_for(schema)
+    if cls not in _DRAFTS:
+        raise _Unsupported("draft %s" % cls.__name__)
+
+    generator = _Generator(cls)
+    name = generator.function(schema)
+    return "\n\n".join(generator.functions), generator.namespace, name
+
+
+class _Generator:
+    """
+    Builds the source of the functions checking a schema and its subschemas.
+    """
+
+    def __init__(self, cls):
+        """Initialisation function."""
+        self.keywords = cls.VALIDATORS
+        self.legacy = cls is Draft4Validator
+        self.functions = []
+        self.namespace = {"_Number": numbers.Number}
+        self.count = 0
+
+    def function(self, schema):
+        """
+        :param schema: a (sub)schema.
+        :returns: the name of a function returning True if its argument is valid against it.
+        """
+
+        name = self._name("check")
+        lines = ["def %s(data):" % name]
+        self.checks(schema, "data", lines, 1)
+        lines.append("    return True")
+        self.functions.append("\n".join(lines))
+        return name
+
+    def checks(self, schema, var, lines, depth):
+        """
+        Add the lines returning False when the value of var doesn't match a schema.
+        :param schema: a (sub)schema.
+        :param var: name of the variable holding the value.
+        :param lines: list of source lines to add to.
+        :param depth: indentation level.
+        """
+
+        if schema is True or schema is False:
+            if self.legacy:
+                raise _Unsupported("boolean schema")
+            if schema is False:
+                self._fail(lines, depth)
+            return
+
+        if not isinstance(schema, dict):
+            raise _Unsupported("schema %r" % (schema,))
+
+        keywords = [keyword for keyword in schema if keyword in self.keywords]
+        unsupported = [keyword for keyword in keywords if keyword not in _SUPPORTED]
+        if unsupported:
+            raise _Unsupported(", ".join(sorted(unsupported)))
+        if schema.get("uniqueItems"):
+            raise _Unsupported("uniqueItems")
+
+        if "type" in schema:
+            self._type(schema["type"], var, lines, depth)
+        if "enum" in schema:
+            self._enum(schema["enum"], var, lines, depth)
+        if "const" in schema and "const" in self.keywords:
+            self._enum([schema["const"]], var, lines, depth)
+
+        self._guarded("isinstance(%s, str)" % var, self._string, schema, var, lines, depth)
+        self._guarded("isinstance(%s, _Number) and not isinstance(%s, bool)" % (var, var), self._number,
+                      schema, var, lines, depth)
+        self._guarded("isinstance(%s, dict)" % var, self._object, schema, var, lines, depth)
+        self._guarded("isinstance(%s, list)" % var, self._array, schema, var, lines, depth)
+
+        for subschema in schema.get("allOf", ()):
+            self.checks(subschema, var, lines, depth)
+        if "anyOf" in schema:
+            calls = ["%s(%s)" % (self.function(subschema), var) for subschema in schema["anyOf"]]
+            self._line(lines, depth, "if not (%s):" % (" or ".join(calls) or "False"))
+            self._fail(lines, depth + 1)
+        if "oneOf" in schema:
+            calls = ["%s(%s)" % (self.function(subschema), var) for subschema in schema["oneOf"]]
+            self._line(lines, depth, "if sum((%s)) != 1:" % "".join(call + ", " for call in calls))
+            self._fail(lines, depth + 1)
+        if "not" in schema:
+            self._line(lines, depth, "if %s(%s):" % (self.function(schema["not"]), var))
+            self._fail(lines, depth + 1)
+
+    def _type(self, types, var, lines, depth):
+        if not isinstance(types, list):
+            types = [types]
+
+        expressions = []
+        for type_name in types:
+            if type_name not in _TYPE_CHECKS:
+                raise _Unsupported("type %r" % (type_name,))
+            template = _LEGACY_INTEGER if self.legacy and type_name == "integer" else _TYPE_CHECKS[type_name]
+            expressions.append(template.format(var))
+
+        self._line(lines, depth, "if not (%s):" % (" or ".join(expressions) or "False"))
+        self._fail(lines, depth + 1)
+
+    def _enum(self, values, var, lines, depth):
+        # jsonschema compares bools, numbers and containers by their own rules, strings and null are simple
+        if not all(value is None or isinstance(value, str) for value in values):
+            raise _Unsupported("enum of %r" % (values,))
+
+        expressions = []
+        strings = frozenset(value for value in values if value is not None)
+        if strings:
+            expressions.append("isinstance(%s, str) and %s in %s" % (var, var, self._constant(strings)))
+        if None in values:
+            expressions.append("%s is None" % var)
+
+        self._line(lines, depth, "if not (%s):" % (" or ".join(expressions) or "False"))
+        self._fail(lines, depth + 1)
+
+    def _string(self, schema, var, lines, depth):
+        if "minLength" in schema:
+            self._line(lines, depth, "if len(%s) < %r:" % (var, schema["minLength"]))
+            self._fail(lines, depth + 1)
+        if "maxLength" in schema:
+            self._line(lines, depth, "if len(%s) > %r:" % (var, schema["maxLength"]))
+            self._fail(lines, depth + 1)
+        if "pattern" in schema:
+            try:
+                pattern = re.compile(schema["pattern"])
+            except (re.error, TypeError):
+                raise _Unsupported("pattern %r" % (schema["pattern"],))
+            self._line(lines, depth, "if not %s.search(%s):" % (self._constant(pattern), var))
+            self._fail(lines, depth + 1)
+
+    def _number(self, schema, var, lines, depth):
+        if self.legacy:
+            # Draft 4 exclusiveMinimum/Maximum are booleans modifying minimum/maximum
+            bounds = [("minimum", "<=" if schema.get("exclusiveMinimum") else "<"),
+                      ("maximum", ">=" if schema.get("exclusiveMaximum") else ">")]
+        else:
+            bounds = [("minimum", "<"), ("maximum", ">"), ("exclusiveMinimum", "<="), ("exclusiveMaximum", ">=")]
+
+        for keyword, operator in bounds:
+            if keyword in schema:
+                self._line(lines, depth, "if %s %s %s:" % (var, operator, self._constant(schema[keyword])))
+                self._fail(lines, depth + 1)
+
+    def _object(self, schema, var, lines, depth):
+        for name in schema.get("required", ()):
+            self._line(lines, depth, "if %s not in %s:" % (self._key(name), var))
+            self._fail(lines, depth + 1)
+
+        if "minProperties" in schema:
+            self._line(lines, depth, "if len(%s) < %r:" % (var, schema["minProperties"]))
+            self._fail(lines, depth + 1)
+        if "maxProperties" in schema:
+            self._line(lines, depth, "if len(%s) > %r:" % (var, schema["maxProperties"]))
+            self._fail(lines, depth + 1)
+
+        properties = schema.get("properties", {})
+        for name, subschema in properties.items():
+            if self._always_valid(subschema):
+                continue
+            key = self._key(name)
+            value = self._name("v")
+            nested = self._nested(subschema, value, depth + 1)
+            if nested:
+                self._line(lines, depth, "if %s in %s:" % (key, var))
+                self._line(lines, depth + 1, "%s = %s[%s]" % (value, var, key))
+                lines.extend(nested)
+
+        additional = schema.get("additionalProperties", True)
+        if isinstance(additional, dict):
+            if not self._always_valid(additional):
+                value = self._name("v")
+                nested = self._nested(additional, value, depth + 2)
+                if nested:
+                    self._line(lines, depth, "for key, %s in %s.items():" % (value, var))
+                    self._line(lines, depth + 1, "if key not in %s:" % self._constant(frozenset(properties)))
+                    lines.extend(nested)
+        elif not additional:
+            if properties:
+                self._line(lines, depth, "for key in %s:" % var)
+                self._line(lines, depth + 1, "if key not in %s:" % self._constant(frozenset(properties)))
+                self._fail(lines, depth + 2)
+            else:
+                self._line(lines, depth, "if %s:" % var)
+                self._fail(lines, depth + 1)
+
+    def _array(self, schema, var, lines, depth):
+        if "minItems" in schema:
+            self._line(lines, depth, "if len(%s) < %r:" % (var, schema["minItems"]))
+            self._fail(lines, depth + 1)
+        if "maxItems" in schema:
+            self._line(lines, depth, "if len(%s) > %r:" % (var, schema["maxItems"]))
+            self._fail(lines, depth + 1)
+
+        if "items" in schema:
+            items = schema["items"]
+            if isinstance(items, list):
+                raise _Unsupported("items as a list")
+            if items is False and not self.legacy:
+                self._line(lines, depth, "if %s:" % var)
+                self._fail(lines, depth + 1)
+            elif not self._always_valid(items):
+                value = self._name("v")
+                nested = self._nested(items, value, depth + 1)
+                if nested:
+                    self._line(lines, depth, "for %s in %s:" % (value, var))
+                    lines.extend(nested)
+
+    def _nested(self, schema, var, depth):
+        """:returns: the lines checking a subschema, empty if it checks nothing."""
+
+        lines = []
+        self.checks(schema, var, lines, depth)
+        return lines
+
+    def _always_valid(self, schema):
+        return schema == {} or (schema is True and not self.legacy)
+
+    def _guarded(self, condition, emit, schema, var, lines, depth):
+        """Add the checks of keywords that only apply to one type, under a check for that type."""
+
+        guarded = []
+        emit(schema, var, guarded, depth + 1)
+        if guarded:
+            self._line(lines, depth, "if %s:" % condition)
+            lines.extend(guarded)
+
+    def _key(self, name):
+        if not isinstance(name, str):
+            raise _Unsupported("property name %r" % (name,))
+        return repr(name)
+
+    def _constant(self, value):
+        name = self._name("c")
+        self.namespace[name] = value
+        return name
+
+    def _name(self, prefix):
+        name = "%s_%d" % (prefix, self.count)
+        self.count += 1
+        return name
+
+    def _line(self, lines, depth, line):
+        lines.append("    " * depth + line)
+
+    def _fail(self, lines, depth):
+        self._line(lines, depth, "return False")
@@ -0,0 +1,212 @@
+"""
+Response compression negotiated on the Accept-Encoding header.
+
+Off unless RAMLWRAP_COMPRESSION_MIN_SIZE is set, or an endpoint turns it on
+with a (compression) annotation on its method (or resource) or a
+'compression' entry in the function map, which takes precedence (False turns
+it off for the endpoint):
+
+    function_map = {'reports': {'function': reports, 'compression': {'min_size': 512, 'level': 9}}}
+
+`True` uses the settings. Bodies smaller than min_size (default
+RAMLWRAP_COMPRESSION_MIN_SIZE, or 1024) are sent as they are. level is the
+gzip level (default RAMLWRAP_COMPRESSION_LEVEL, or 6), or a dict of level per
+coding, e.g. {'gzip': 9, 'br': 5}. gzip is always available, br (brotli)
+when the brotli package is installed; the client's preferred one is used,
+br on a tie.
+
+Examples never change, so for actions without a target they are compressed
+once when the raml is loaded rather than on every request.
+"""
+import gzip
+import logging
+
+from . config import get_setting
+from . decoders import is_installed
+from . encoders import _parse_accept
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_SIZE = 1024
+
+# Content-Encoding to (function of bytes and level to bytes, default level)
+_compressors = {}
+
+# Codings in order of preference when the client likes them equally
+_preference = []
+
+
+class CompressionPolicy:
+    """
+    When and how hard the responses of one action are compressed.
+    """
+
+    __slots__ = ("min_size", "levels")
+
+    def __init__(self, min_size=None, levels=None):
+        """
+        :param min_size: smallest body compressed, in bytes.
+        :param levels: dict of coding to compression level.
+        """
+
+        self.min_size = min_size
+        self.levels = levels or {}
+
+    def level(self, coding):
+        """:returns: the compression level for a coding."""
+
+        level = self.levels.get(coding)
+        if level is None:
+            level = _compressors[coding][1]
+        return level
+
+
+def register_compressor(coding, compress, default_level, preferred=False):
+    """
+    Register a content coding.
+    :param coding: the Content-Encoding, e.g. 'gzip'.
+    :param compress: function of the body bytes and a level to the compressed bytes.
+    :param default_level: level used when none is configured.
+    :param preferred: prefer it to those already registered when the client accepts several equally.
+    :returns: returns nothing.
+    """
+
+    _compressors[coding] = (compress, default_level)
+    if coding in _preference:
+        _preference.remove(coding)
+    if preferred:
+        _preference.insert(0, coding)
+    else:
+        _preference.append(coding)
+
+
+def compile_compression(config):
+    """
+    Build the compression policy of an action.
+    :param config: the (compression) annotation or function map entry: True, False,
+        or a dict with min_size and level.
+    :returns: a CompressionPolicy, False if compression is off for the action,
+        or None to follow the settings.
+    """
+
+    if config is None:
+        return None
+    if not config:
+        return False
+    if not isinstance(config, dict):
+        config = {}
+
+    level = config.get("level")
+    if level is not None and not isinstance(level, dict):
+        # A single level is the gzip one
+        level = {"gzip": level}
+
+    min_size = config.get("min_size")
+    return CompressionPolicy(int(min_size) if min_size is not None else None, level)
+
+
+def compression_policy(action):
+    """
+    :param action: the action serving the response.
+    :returns: the CompressionPolicy in force for it, None if its responses aren't compressed.
+    """
+
+    policy = action.compression
+    if policy is False:
+        return None
+
+    min_size = policy.min_size if policy is not None else None
+    if min_size is None:
+        min_size = get_setting('RAMLWRAP_COMPRESSION_MIN_SIZE')
+        if min_size is None:
+            if policy is None:
+                return None
+            min_size = DEFAULT_MIN_SIZE
+
+    levels = dict(policy.levels) if policy is not None else {}
+    setting_level = get_setting('RAMLWRAP_COMPRESSION_LEVEL')
+    if setting_level is not None:
+        if not isinstance(setting_level, dict):
+            setting_level = {"gzip": setting_level}
+        for coding, level in setting_level.items():
+            levels.setdefault(coding, level)
+
+    return CompressionPolicy(min_size, levels)
+
+
+def negotiate_coding(accept_encoding):
+    """
+    Pick the coding the Accept-Encoding header prefers.
+    :param accept_encoding: the Accept-Encoding header, or None.
+    :returns: the coding, or None to send the body as it is.
+    """
+
+    if not accept_encoding:
+        return None
+
+    parsed = _parse_accept(accept_encoding)
+    best = None
+    best_quality = 0
+    for coding in _preference:
+        quality = _coding_quality(parsed, coding)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(content, coding, level):
+    """
+    :param content: body bytes.
+    :param coding: a registered coding, e.g. 'gzip'.
+    :param level: the compression level.
+    :returns: the compressed bytes.
+    """
+
+    return _compressors[coding][0](content, level)
+
+
+def precompress_examples(encoded_examples, policy):
+    """
+    Compress the encoded examples of an action in every coding.
+    :param encoded_examples: dict of content type to example bytes.
+    :param policy: the CompressionPolicy in force for the action.
+    :returns: dict of (coding, level, example bytes) to the compressed bytes.
+    """
+
+    compressed = {}
+    for content in encoded_examples.values():
+        if len(content) < policy.min_size:
+            continue
+        for coding in _preference:
+            level = policy.level(coding)
+            try:
+                compressed[(coding, level, content)] = compress(content, coding, level)
+            except Exception:
+                logger.exception("Could not compress an example with %s", coding)
+    return compressed
+
+
+def _coding_quality(parsed, coding):
+    quality = None
+    for token, token_quality in parsed:
+        if token == coding:
+            return token_quality
+        if token == "*":
+            quality = token_quality
+    return quality or 0.0
+
+
+def compress_gzip(content, level):
+    # No timestamp, so the same body always compresses to the same bytes
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+def compress_brotli(content, level):
+    import brotli
+    return brotli.compress(content, quality=level)
+
+
+register_compressor("gzip", compress_gzip, 6)
+
+if is_installed("brotli"):
+    register_compressor("br", compress_brotli, 4, preferred=True)
@@ -0,0 +1,41 @@
+"""
+Settings lookup that works with and without Django.
+
+Settings passed to `configure` take precedence. Anything else is read from
+django.conf.settings when Django is installed and configured, so existing
+RAMLWRAP_* settings in a Django project keep working unchanged.
+"""
+
+_settings = {}
+
+
+def configure(**settings):
+    """
+    Set ramlwrap settings without Django, e.g. for the WSGI adapter.
+    :param settings: setting names (e.g. RAMLWRAP_VALIDATION_ERROR_HANDLER) to values.
+    :returns: returns nothing.
+    """
+
+    _settings.update(settings)
+
+
+def get_setting(name, default=None):
+    """
+    Look up a ramlwrap setting.
+    :param name: the setting name.
+    :param default: returned when the setting is not defined anywhere.
+    :returns: the setting value.
+    """
+
+    if name in _settings:
+        return _settings[name]
+
+    try:
+        from django.conf import settings
+    except ImportError:
+        return default
+
+    if not settings.configured:
+        return default
+
+    return getattr(settings, name, default)
@@ -0,0 +1,1124 @@
+"""
+Framework independent validation and dispatch engine.
+
+Nothing in here imports Django. Requests come in as a Request (method, headers,
+query parameters and body bytes) and go out as a Response, or as whatever the
+target returned for the adapter to deal with. The Django adapter lives in
+validation.py and the raw WSGI/ASGI one in wsgi.py.
+"""
+import contextvars
+import hashlib
+import importlib
+import inspect
+import json
+import logging
+import random
+import sys
+
+from types import MappingProxyType
+from urllib.parse import parse_qs
+
+from jsonschema.exceptions import ValidationError
+
+from . compression import compress, compression_policy, negotiate_coding, precompress_examples
+from . config import get_setting
+from . decoders import compile_request_handlers, decode_text, normalise_media_type
+from . encoders import compile_response_encoders, negotiate
+from . exceptions import FatalException, RequestEntityTooLargeException, UnsupportedMediaTypeException
+from . query import compile_query_parameters
+from . schemas import ValidationErrors, compile_schema, error_path
+from . streaming import DEFAULT_CHUNK_SIZE, aencode_stream, encode_stream, is_stream, stream_formats
+from . telemetry import record_validation_failure
+from . tracing import get_tracer
+from . validation_cache import get_validation_cache
+
+logger = logging.getLogger(__name__)
+
+# The action being served in this thread or task, and the media type of its request body
+_request_content_type = contextvars.ContextVar("ramlwrap_request_content_type", default=None)
+
+
+class ContentType:
+    """Represents http content types."""
+    JSON = 'application/json'
+
+    def __init__(self):
+        """Initialisation function."""
+        pass
+
+
+class QueryDict(dict):
+    """
+    Query parameters as a dict of name to list of values. Reading a single
+    value returns the last one, the same as Django's QueryDict.
+    """
+
+    def __init__(self, query_string=""):
+        """Initialisation function."""
+        super(QueryDict, self).__init__(parse_qs(query_string, keep_blank_values=True))
+
+    def __getitem__(self, key):
+        return dict.__getitem__(self, key)[-1]
+
+    def get(self, key, default=None):
+        values = dict.get(self, key)
+        if values:
+            return values[-1]
+        return default
+
+    def getlist(self, key):
+        return list(dict.get(self, key, []))
+
+
+class Request:
+    """
+    A framework independent http request.
+
+    `native` is the object handed to targets and custom handlers: the adapter's
+    own request (e.g. Django's HttpRequest) or the Request itself.
+    """
+
+    method = None
+    path = None
+    headers = None
+    GET = None
+    content_type = None
+    content_length = None
+    native = None
+    validated_data = None
+    validated_data_meta = None
+    validated_query = None
+
+    def __init__(self, method, path, headers=None, query=None, body=b"", content_type=None, native=None,
+                 content_length=None):
+        """
+        Initialisation function.
+        :param method: http method, e.g. 'GET'.
+        :param path: request path.
+        :param headers: mapping of lower case header name to value.
+        :param query: query parameters, a QueryDict (or anything with get/getlist).
+        :param body: body bytes, or a function reading them when first needed. The function
+            is given the maximum size allowed (or None) and raises RequestEntityTooLargeException
+            as soon as more than that arrives.
+        :param content_type: value of the Content-Type header.
+        :param native: object passed to targets, defaults to this request.
+        :param content_length: value of the Content-Length header as an int, None if not sent.
+        """
+
+        self.method = method
+        self.path = path
+        self.headers = headers if headers is not None else {}
+        self.GET = query if query is not None else QueryDict()
+        self.content_type = content_type
+        self.native = native if native is not None else self
+        self.content_length = content_length
+        self._body = body
+
+    @property
+    def body(self):
+        """The body bytes, read on first access."""
+        return self.read_body()
+
+    def read_body(self, max_size=None):
+        """
+        Read the body, giving up once it is larger than max_size.
+        :param max_size: maximum number of bytes allowed, None for no limit.
+        :raises RequestEntityTooLargeException: raised when the body is larger than max_size.
+        :returns: the body bytes.
+        """
+
+        if callable(self._body):
+            self._body = self._body(max_size)
+        elif max_size is not None and len(self._body) > max_size:
+            raise RequestEntityTooLargeException(_too_large_message(max_size))
+        return self._body
+
+
+class _EnvironHeaders:
+    """
+    Read only view of the http headers in a WSGI environ or Django
+    request.META (both use the CGI names), looked up by (case insensitive)
+    header name.
+    """
+
+    __slots__ = ("environ",)
+
+    def __init__(self, environ):
+        """Initialisation function."""
+        self.environ = environ
+
+    def get(self, name, default=None):
+        key = name.upper().replace("-", "_")
+        if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = "HTTP_" + key
+        return self.environ.get(key, default)
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+
+# Size of the chunks read from the request stream when the body size is limited
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def _read_stream(stream, max_size, length=None):
+    """
+    Read a request body from a stream (a WSGI input, a Django HttpRequest),
+    giving up as soon as it grows past max_size, so a chunked upload is never
+    held in memory in full.
+    :param stream: the stream, anything with read(size).
+    :param max_size: maximum body size in bytes, None for no limit.
+    :param length: the Content-Length, None to read until the end of the stream.
+    :raises RequestEntityTooLargeException: raised when the body is larger than max_size.
+    :returns: the body bytes.
+    """
+
+    if max_size is None:
+        return stream.read(length) if length is not None else stream.read()
+
+    chunks = []
+    size = 0
+    remaining = length
+    while remaining is None or remaining > 0:
+        chunk = stream.read(READ_CHUNK_SIZE if remaining is None else min(READ_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise RequestEntityTooLargeException(_too_large_message(max_size))
+        chunks.append(chunk)
+        if remaining is not None:
+            remaining -= len(chunk)
+
+    return b"".join(chunks)
+
+
+class Response:
+    """
+    A framework independent http response. `native` keeps the adapter's own
+    response when this one was built from it. Streamed responses have a
+    `stream` of byte chunks (an async iterator for async generator targets)
+    and no content.
+    """
+
+    status_code = 200
+    content = b""
+    content_type = None
+    headers = None
+    native = None
+    stream = None
+
+    def __init__(self, content=b"", status_code=200, content_type=None, headers=None, native=None, stream=None):
+        """Initialisation function."""
+
+        if content is not None and not isinstance(content, bytes):
+            content = str(content).encode("utf-8")
+
+        self.content = content
+        self.status_code = status_code
+        self.content_type = content_type
+        self.headers = headers if headers is not None else {}
+        self.native = native if native is not None else self
+        self.stream = stream
+
+
+class Endpoint:
+    """
+    Endpoint that represents one url in the service. Each endpoint
+    contains Actions which represent a request method that the endpoint
+    supports.
+    """
+
+    __slots__ = ("url", "request_method_mapping", "uri_converters")
+
+    def __init__(self, url):
+        """Initialisation function."""
+        self.url = url
+        self.request_method_mapping = {}
+        self.uri_converters = None
+
+    def parse_regex(self, regex_dict):
+        """
+        Replace dynamic template in url with corresponding regex for a dynamic value
+        :param regex_dict: dictionary of dynamic id names to regex
+        e.g. {'dynamic_id': '(?P<dynamic_id>[a-zA-Z]+)'}
+        """
+
+        for regex_key, regex in regex_dict.items():
+            string_to_replace = "{%s}" % regex_key
+            self.url = self.url.replace(string_to_replace, regex)
+
+    def convert_dynamic_values(self, dynamic_values):
+        """
+        Convert the dynamic values matched for typed uriParameters to their types, see uri.py.
+        :param dynamic_values: dict of dynamic id names against the matched strings.
+        :returns: dict of dynamic id names against their values.
+        """
+
+        converters = self.uri_converters
+        if not converters or not dynamic_values:
+            return dynamic_values
+
+        values = dict(dynamic_values)
+        for name, convert in converters.items():
+            if values.get(name) is not None:
+                values[name] = convert(values[name])
+        return values
+
+    def add_action(self, request_method, action):
+        """Add an action mapping for the given request method type.
+        :param request_method: http method type to map the action to.
+        :param action: the action to map to the request.
+        :returns: returns nothing.
+        """
+
+        self.request_method_mapping[request_method] = action
+
+    def freeze(self):
+        """Freeze the actions of the endpoint once it is built, see Action.freeze."""
+
+        for action in self.request_method_mapping.values():
+            action.freeze()
+
+    def dispatch(self, request, **dynamic_values):
+        """Serve a framework independent request to the current endpoint.
+        :param request: incoming Request.
+        :param dynamic_values: kwargs of dynamic id names against actual value to substitute into url
+        :returns: returns the Response, content of which is created by the target function.
+        """
+
+        action = self.request_method_mapping.get(request.method)
+        attributes = _request_span_attributes(self, action, request.method)
+        with get_tracer().span("ramlwrap.request", attributes) as span:
+            if action is not None:
+                response = _serve(request, action, self.convert_dynamic_values(dynamic_values))
+            else:
+                response = Response(status_code=405, headers={"Allow": ", ".join(self.request_method_mapping.keys())})
+            span.set_attribute("http.response.status_code", response.status_code)
+
+        return response
+
+
+def _request_span_attributes(endpoint, action, method):
+    """The attributes a request span starts with, see tracing.py."""
+
+    resource = action.resource if action is not None and action.resource is not None else endpoint.url
+    return {"ramlwrap.resource": resource, "http.request.method": method}
+
+
+class Action:
+    """
+    Maps out the api definition associated with the parent Endpoint.
+    One of these will be created per http request method type.
+    """
+
+    __slots__ = ("example", "schema", "target", "query_parameter_checks", "resp_content_type", "regex",
+                 "response_schemas", "response_validation_rate", "max_body_size", "request_options",
+                 "request_content_type_options", "request_handlers", "response_encoders", "response_validators",
+                 "encoded_examples", "query_parser", "response_cache", "etag", "etag_version",
+                 "compression", "compressed_examples", "resource", "method", "max_validation_errors",
+                 "sampled_validation", "_frozen")
+
+    def __init__(self):
+        """Initialisation function."""
+        object.__setattr__(self, "_frozen", False)
+        self.example = None
+        self.schema = None
+        self.target = None
+        self.query_parameter_checks = None
+        self.resp_content_type = None
+        self.regex = None
+        self.response_schemas = {}
+        self.response_validation_rate = None
+        self.max_body_size = None
+        self.request_options = None
+        self.request_content_type_options = None
+        self.request_handlers = None
+        self.response_encoders = None
+        self.response_validators = None
+        self.encoded_examples = None
+        self.query_parser = None
+        self.response_cache = None
+        self.etag = False
+        self.etag_version = None
+        self.compression = None
+        self.compressed_examples = None
+        self.resource = None
+        self.method = None
+        self.max_validation_errors = None
+        self.sampled_validation = None
+
+    @property
+    def requ_content_type(self):
+        """
+        The media type of the request body being served by this action in the
+        current thread or task, e.g. for custom validation handlers.
+        """
+
+        current = _request_content_type.get()
+        if current is not None and current[0] is self:
+            return current[1]
+        return None
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError("Action is frozen, cannot set %s" % name)
+        object.__setattr__(self, name, value)
+
+    def freeze(self):
+        """
+        Compile everything serving needs up front, drop what it doesn't and make
+        the action read only. Called on the actions built from a raml.
+        :returns: returns nothing.
+        """
+
+        if self._frozen:
+            return
+
+        _request_handlers(self)
+        _response_validators(self)
+        _query_parser(self)
+
+        # Examples never change, so encode them once in each response type
+        encoded_examples = {}
+        for content_type, encoder in _response_encoders(self):
+            try:
+                encoded_examples[content_type] = _encode_example(self.example, content_type, encoder)
+            except Exception:
+                # Left to fail when requested
+                pass
+        self.encoded_examples = encoded_examples or _EMPTY
+
+        # Actions without a target only ever send their examples
+        policy = compression_policy(self) if self.target is None else None
+        self.compressed_examples = precompress_examples(encoded_examples, policy) if policy else None
+        self.compressed_examples = self.compressed_examples or _EMPTY
+
+        # Only needed to compile the request handlers
+        self.request_options = None
+        if self.request_content_type_options is not None:
+            self.request_content_type_options = tuple(self.request_content_type_options)
+
+        # Most actions have none of these
+        if not self.response_schemas:
+            self.response_schemas = _EMPTY
+        if not self.response_validators:
+            self.response_validators = _EMPTY
+
+        object.__setattr__(self, "_frozen", True)
+
+
+_EMPTY = MappingProxyType({})
+
+
+def _validate_query_params(params, checks):
+    """
+    Function to validate HTTP GET request params. If there are checks to be
+    performed then they will be; these will be items such as length and type
+    checks defined in the definition file.
+    :param params: incoming request parameters.
+    :param checks: dict of param to rule to validate with.
+    :raises ValidationError: raised when any query parameter fails any
+        of its checks defined in the checks param.
+    :returns: true if validated, otherwise raises an exception when fails.
+    """
+
+    # If validation checks, check the params. If not, pass.
+    if checks:
+        for param in checks:
+            # If the expected param is in the query.
+            if param in params:
+                for check, rule in checks[param].items():
+                    if rule is not None:
+                        error_message = 'QueryParam [%s] failed validation check [%s]:[%s]' % (param, check, rule)
+                        if check == 'minLength':
+                            if len(params.get(param)) < rule:
+                                raise ValidationError(error_message, validator=check)
+                        elif check == 'maxLength':
+                            if len(params.get(param)) > rule:
+                                raise ValidationError(error_message, validator=check)
+                        elif check == 'type':
+                            if rule == 'number':
+                                try:
+                                    float(params.get(param))
+                                except ValueError:
+                                    raise ValidationError(error_message, validator=check)
+
+            # If the require param isn't in the query.
+            elif checks[param].get('required') is True:
+                raise ValidationError('QueryParam [%s] failed validation check [Required]:[True]' % param,
+                                      validator='required')
+
+    return True
+
+
+def _generate_example(action, request=None):
+    """
+    This is used by both GET and POST when returning an example
+    """
+    # The original method of generating straight from the example is bad
+    # because v2 parser now has an object, which also allows us to do the
+    # headers correctly
+
+    encoders = _response_encoders(action)
+    if encoders:
+        # Encode in the response type the client asked for, as for target data
+        content_type, encoder = _negotiate_encoder(request, encoders)
+        if action.encoded_examples is not None and content_type in action.encoded_examples:
+            content = action.encoded_examples[content_type]
+        else:
+            content = _encode_example(action.example, content_type, encoder)
+        return Response(content, content_type=content_type, headers=_vary_accept(encoders))
+
+    ret_data = action.example
+    if ret_data is None:
+        ret_data = b""
+
+    return Response(ret_data, content_type=action.resp_content_type)
+
+
+def _encode_example(example, content_type, encoder):
+    """Encode an example in a response content type."""
+
+    if content_type != ContentType.JSON and isinstance(example, str):
+        # Examples are written as json in the raml, send the data they describe
+        try:
+            example = json.loads(example)
+        except ValueError:
+            pass
+    return encoder(example)
+
+
+def _serve(request, action, dynamic_values=None):
+    """
+    Validate the request, call the target (or generate the example) and render
+    the result as a Response.
+    :param request: incoming Request.
+    :param action: action object containing data used to validate
+        and serve the request.
+    :param dynamic_values: dict of dynamic id names against actual values to substitute into url
+    :returns: returns the Response.
+    """
+
+    etag, not_modified = _version_not_modified(request, action, dynamic_values)
+    if not_modified is not None:
+        return not_modified
+
+    response = _render_result(action, _call_action(request, action, dynamic_values), request)
+
+    if action.response_schemas and _should_validate_response(action):
+        _validate_response(request, action, response)
+
+    return _finish_response(request, action, response, etag)
+
+
+def _version_not_modified(request, action, dynamic_values):
+    """
+    Check the version ETag of an action with an etag_version function against
+    the request, before anything is called or encoded.
+    :param request: incoming Request.
+    :param action: action object containing data used to serve the request.
+    :param dynamic_values: dict of dynamic id names against their values.
+    :returns: (etag, response): the version ETag, None without a version token,
+        and the 304 Response if the client's copy is current, otherwise None.
+    """
+
+    if action.etag_version is None:
+        return None, None
+
+    _validate_query(request, action)
+    etag = _version_etag(request, action, dynamic_values)
+    if etag is not None and _etag_matches(request, etag):
+        # The client's copy is current, so there is nothing to call or encode
+        return etag, _not_modified(etag)
+    return etag, None
+
+
+def _finish_response(request, action, response, etag=None):
+    """
+    Set the ETag of a served response, answering 304 if the request has it
+    already, and compress its body in the coding the request accepts.
+    :param request: incoming Request.
+    :param action: action object that produced the response.
+    :param response: the Response. Its headers can be any mapping with
+        get, item access and in, e.g. an adapter's own response.
+    :param etag: the version ETag, see _version_not_modified.
+    :returns: the 304 Response, or the response with its content and headers updated.
+    """
+
+    if action.etag and response.status_code == 200:
+        etag = etag or response.headers.get("ETag")
+        if etag is None and response.content is not None:
+            etag = _content_etag(response.content)
+        if etag is not None:
+            if _etag_matches(request, etag):
+                return _not_modified(etag)
+            response.headers["ETag"] = etag
+
+    if "Content-Encoding" not in response.headers:
+        compressed = _compress(request, action, response.content)
+        if compressed is not None:
+            coding, response.content = compressed
+            response.headers["Vary"] = _add_vary(response.headers.get("Vary"), "Accept-Encoding")
+            if coding is not None:
+                response.headers["Content-Encoding"] = coding
+                if "Content-Length" in response.headers:
+                    response.headers["Content-Length"] = str(len(response.content))
+                _weaken_etag(response.headers)
+
+    return response
+
+
+def _compress(request, action, content):
+    """
+    Compress a response body in the coding the request accepts, see compression.py.
+    :param request: incoming Request.
+    :param action: action object that produced the response.
+    :param content: the response body bytes.
+    :returns: None if the body isn't compressed whatever the request accepts,
+        otherwise (coding, body) - the coding None and the body unchanged if the
+        request accepts none.
+    """
+
+    policy = compression_policy(action)
+    if policy is None or content is None or len(content) < policy.min_size:
+        return None
+
+    coding = negotiate_coding(request.headers.get("accept-encoding"))
+    if coding is None:
+        return None, content
+
+    level = policy.level(coding)
+    compressed = None
+    if action.compressed_examples:
+        compressed = action.compressed_examples.get((coding, level, content))
+    if compressed is None:
+        compressed = compress(content, coding, level)
+    return coding, compressed
+
+
+def _add_vary(vary, header):
+    """:returns: the Vary header value with header added to it."""
+
+    if not vary:
+        return header
+    if header.lower() in [value.strip().lower() for value in vary.split(",")]:
+        return vary
+    return "%s, %s" % (vary, header)
+
+
+def _weaken_etag(headers):
+    # The ETag was for the uncompressed body, it now only matches it weakly
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = "W/" + etag
+
+
+def _version_etag(request, action, dynamic_values):
+    """
+    The ETag for the version token the action's etag_version function gives.
+    Responses negotiated in different content types get different tags.
+    :param request: incoming Request.
+    :param action: action object with an etag_version function.
+    :param dynamic_values: dict of dynamic id names against their values.
+    :returns: the quoted ETag, or None if the function gave no token.
+    """
+
+    token = action.etag_version(request.native, **(dynamic_values or {}))
+    if token is None:
+        return None
+
+    encoders = _response_encoders(action)
+    content_type = _negotiate_encoder(request, encoders)[0] if len(encoders) > 1 else ""
+    return _content_etag(("%s|%s" % (token, content_type)).encode("utf-8"))
+
+
+def _content_etag(content):
+    """:returns: the quoted ETag of the response body (or version token) bytes."""
+
+    return '"%s"' % hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def _etag_matches(request, etag):
+    """
+    :param request: incoming Request.
+    :param etag: the quoted ETag of the current response.
+    :returns: True if the If-None-Match header of the request matches the ETag.
+    """
+
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        # If-None-Match uses the weak comparison
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
+
+def _not_modified(etag):
+    return Response(b"", status_code=304, headers={"ETag": etag})
+
+
+def _call_action(request, action, dynamic_values=None):
+    """
+    Validate the request and call the action target, or generate the example
+    if there is no target.
+    :param request: incoming Request.
+    :param action: action object containing data used to validate
+        and serve the request.
+    :param dynamic_values: dict of dynamic id names against actual values to substitute into url
+     e.g. {'dynamic_id': 'aBc'}
+    :returns: whatever the target (or error handler) returned.
+    """
+
+    tracer = get_tracer()
+    request_span = tracer.current_span()
+
+    try:
+        _validate_query(request, action)
+    except ValidationError:
+        request_span.set_attribute("ramlwrap.validation", "invalid")
+        raise
+
+    max_body_size = action.max_body_size
+    if max_body_size is None:
+        max_body_size = get_setting('RAMLWRAP_MAX_BODY_SIZE')
+
+    # Reject what we can from the headers alone, before reading any of the body
+    error_response = _check_request_headers(request, action, max_body_size)
+
+    if not error_response:
+        try:
+            body = request.read_body(max_body_size)
+        except RequestEntityTooLargeException as e:
+            error_response = _validation_error_handler(e)
+        else:
+            if body:
+                request_span.set_attribute("http.request.body.size", len(body))
+                error_response = _validate_body(request, action)
+
+    request_span.set_attribute("ramlwrap.validation", "invalid" if error_response else "valid")
+    if error_response:
+        return error_response
+
+    with tracer.span("ramlwrap.target"):
+        if action.target:
+            if dynamic_values:
+                # If there was a dynamic value, pass it through
+                return action.target(request.native, **dynamic_values)
+            return action.target(request.native)
+
+        return _generate_example(action, request)
+
+
+def _validate_query(request, action):
+    """
+    Check the query parameters of the request and store the typed values of
+    the declared ones as validated_query on the request handed to the target.
+    :param request: incoming Request.
+    :param action: action object containing data used to validate the request.
+    :raises ValidationError: raised when a query parameter fails its checks.
+    :returns: the validated query.
+    """
+
+    if request.validated_query is not None:
+        # Already validated, e.g. to build a cache key
+        return request.validated_query
+
+    try:
+        with get_tracer().span("ramlwrap.query"):
+            if action.query_parameter_checks:
+                # Following raises exception on fail or passes through.
+                _validate_query_params(request.GET, action.query_parameter_checks)
+
+            # The declared parameters as typed values, so targets needn't parse request.GET
+            query_parser = _query_parser(action)
+            validated_query = query_parser.parse(request.GET) if query_parser is not None else {}
+    except ValidationError as e:
+        record_validation_failure(action, e)
+        raise
+    request.validated_query = validated_query
+    request.native.validated_query = validated_query
+
+    return validated_query
+
+
+def _render_result(action, result, request=None):
+    """
+    Turn the result of a target into a Response, encoded in the response
+    content type the Accept header of the request negotiates.
+    :param action: action object that produced the result.
+    :param result: the Response or data returned by the target.
+    :param request: incoming Request.
+    :returns: a Response.
+    """
+
+    if isinstance(result, Response):
+        return result
+
+    with get_tracer().span("ramlwrap.render"):
+        if is_stream(result):
+            return _render_stream(action, result, request)
+
+        # As we weren't given a Response, we need to create one
+        # and handle the data correctly.
+        encoders = _response_encoders(action)
+        if encoders:
+            content_type, encoder = _negotiate_encoder(request, encoders)
+            return Response(encoder(result), content_type=content_type, headers=_vary_accept(encoders))
+
+    # FIXME: write more types in here
+    raise Exception("Unsuported response content type - contact @jmons for future feature request")
+
+
+def _render_stream(action, items, request=None):
+    """
+    Stream the items of an iterator (or async iterator) a target returned, see streaming.py.
+    :param action: action object that produced the items.
+    :param items: the iterator.
+    :param request: incoming Request.
+    :returns: a streamed Response.
+    """
+
+    offered = stream_formats([content_type for content_type, _ in _response_encoders(action)])
+    content_type, stream_format = _negotiate_encoder(request, offered)
+    chunk_size = get_setting('RAMLWRAP_STREAM_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+    if inspect.isasyncgen(items):
+        stream = aencode_stream(items, stream_format, chunk_size)
+    else:
+        stream = encode_stream(items, stream_format, chunk_size)
+
+    return Response(None, content_type=content_type, headers=_vary_accept(offered), stream=stream)
+
+
+def _response_encoders(action):
+    """
+    The encoders an action can respond with, see encoders.compile_response_encoders.
+    :param action: action object that produces the response.
+    :returns: list of (media type, encoder), empty if the response type has no encoder.
+    """
+
+    encoders = action.response_encoders
+    if encoders is None:
+        # Actions built by hand (or without a 200 body) respond in resp_content_type
+        encoders = action.response_encoders = compile_response_encoders(
+            [action.resp_content_type] if action.resp_content_type else [])
+
+    return encoders
+
+
+def _negotiate_encoder(request, encoders):
+    accept = request.headers.get("accept") if request is not None else None
+    return negotiate(accept, encoders)
+
+
+def _vary_accept(encoders):
+    # Only responses that could have been encoded differently vary on Accept
+    if len(encoders) > 1:
+        return {"Vary": "Accept"}
+    return None
+
+
+def _validate_body(request, action):
+    """
+    Check the content type of the request, then decode and validate its body
+    with the handler for that content type. The decoded body is stored as
+    validated_data on the request handed to the target, and for actions
+    sampling their large arrays what was sampled as validated_data_meta.
+    :param request: incoming Request.
+    :param action: action object containing data used to validate the request.
+    :returns: an error response if validation failed, otherwise None.
+    """
+
+    media_type, error_response = _check_content_type(request, action)
+    if error_response:
+        return error_response
+
+    handlers = _request_handlers(action)
+    if handlers is None:
+        # There were no content type options in the schema so just load the data
+        data = decode_text(request.body, request.content_type)
+    else:
+        handler = handlers[media_type]
+        cache = get_validation_cache()
+        try:
+            if handler.sampled:
+                # Each body is sampled afresh, so the outcome is never cached
+                meta = {}
+                data = handler(request.body, request.content_type, meta)
+                request.validated_data_meta = meta
+                request.native.validated_data_meta = meta
+            elif cache is None:
+                data = handler(request.body, request.content_type)
+            else:
+                data = cache.decode(action, handler, request.body, request.content_type)
+        except Exception as e:
+            if isinstance(e, ValidationErrors):
+                for error in e.errors:
+                    record_validation_failure(action, error)
+            elif isinstance(e, ValidationError):
+                record_validation_failure(action, e)
+            # Check the value is in settings, and that it is not None
+            if get_setting('RAMLWRAP_VALIDATION_ERROR_HANDLER'):
+                return _call_custom_handler(e, request, action)
+            return _validation_error_handler(e)
+
+    request.validated_data = data
+    request.native.validated_data = data
+
+    return None
+
+
+def _request_handlers(action):
+    """
+    The media type dispatch table of an action, see decoders.compile_request_handlers.
+    :param action: action object containing data used to validate the request.
+    :returns: dict of media type to BodyHandler, or None if the raml declares no request body types.
+    """
+
+    handlers = action.request_handlers
+    if handlers is None and action.request_content_type_options is not None:
+        # Actions built by hand rather than loaded from a raml
+        handlers = action.request_handlers = compile_request_handlers(
+            action.request_options, action.max_validation_errors, action.sampled_validation)
+
+    return handlers
+
+
+def _query_parser(action):
+    """
+    The compiled query_parameter_checks of an action, see query.compile_query_parameters.
+    :param action: action object containing data used to validate the request.
+    :returns: a QueryParser, or None if the raml declares no query parameters.
+    """
+
+    query_parser = action.query_parser
+    if query_parser is None and action.query_parameter_checks and not action._frozen:
+        query_parser = action.query_parser = compile_query_parameters(action.query_parameter_checks)
+
+    return query_parser
+
+
+def _check_request_headers(request, action, max_body_size):
+    """
+    Check the Content-Length and Content-Type of a request that has a body
+    before any of it is read, so oversized or unacceptable uploads are
+    rejected straight away.
+    :param request: incoming Request.
+    :param action: action object containing data used to validate the request.
+    :param max_body_size: maximum body size in bytes, None for no limit.
+    :returns: an error response if the request is rejected, otherwise None.
+    """
+
+    content_length = request.content_length
+    if not content_length:
+        # Nothing (or a chunked body) to check yet
+        return None
+
+    if max_body_size is not None and content_length > max_body_size:
+        return _validation_error_handler(RequestEntityTooLargeException(_too_large_message(max_body_size)))
+
+    return _check_content_type(request, action)[1]
+
+
+def _check_content_type(request, action):
+    """
+    Check the content type of the request is one the raml allows.
+    :param request: incoming Request.
+    :param action: action object containing data used to validate the request.
+    :returns: tuple of the normalised media type of the request (None if it
+        sent none) and an error response if the content type is missing or
+        not allowed, otherwise None.
+    """
+
+    request_content_type = request.content_type
+    if not request_content_type:
+        # couldn't find the content-type header, or it is empty, so error
+        return None, _validation_error_handler(UnsupportedMediaTypeException("Missing Content Type for this request"))
+
+    # Parse the content type coming in (in case there are multiple optional entries)
+    request_content_type = normalise_media_type(request_content_type)
+
+    # The actual content_type we are using in this request, see Action.requ_content_type
+    _request_content_type.set((action, request_content_type))
+
+    handlers = _request_handlers(action)
+    if handlers is not None and request_content_type not in handlers:
+        e = ValidationError("Invalid Content Type for this request: {}".format(request_content_type),
+                            validator="invalid")
+        record_validation_failure(action, e)
+        return request_content_type, _validation_error_handler(e)
+
+    return request_content_type, None
+
+
+def _too_large_message(max_body_size):
+    return "Request body is larger than the maximum of {} bytes".format(max_body_size)
+
+
+def _validation_error_handler(e):
+    """
+    Default validation handler for when a ValidationError occurs.
+    This behaviour can be overriden in the settings file.
+    :param e: exception raised that must be handled.
+    :returns: Response with status depending on the error.
+        ValidationError will return a 422 with json info on the cause
+        (counted rather than logged, see telemetry.py), and each error
+        with where it is in the body when several were collected.
+        Otherwise a FatalException is raised.
+    """
+
+    if isinstance(e, ValidationError):
+        message = 'Validation failed. {}'.format(e.message)
+        error_response = {
+            'message': message,
+            'code': e.validator
+        }
+        if isinstance(e, ValidationErrors):
+            error_response['errors'] = [{
+                'path': error_path(error),
+                'message': error.message,
+                'code': error.validator
+            } for error in e.errors]
+        error_resp = Response(json.dumps(error_response), status_code=422, content_type="application/json")
+
+    elif isinstance(e, (UnsupportedMediaTypeException, RequestEntityTooLargeException)):
+        error_response = {'message': e.message}
+        error_resp = Response(json.dumps(error_response), status_code=e.status_code, content_type="application/json")
+
+    else:
+        raise FatalException('Malformed JSON in the request.', 400)
+
+    return error_resp
+
+
+def _should_validate_response(action):
+    """
+    Decide whether this response is part of the validated sample. The rate
+    comes from the function map for the endpoint, falling back to the
+    RAMLWRAP_RESPONSE_VALIDATION_RATE setting (0 - the default - disables it).
+    :param action: action object that produced the response.
+    :returns: True if the response should be validated.
+    """
+
+    rate = action.response_validation_rate
+    if rate is None:
+        rate = get_setting('RAMLWRAP_RESPONSE_VALIDATION_RATE', 0)
+
+    if not rate:
+        return False
+
+    return rate >= 1 or random.random() < rate
+
+
+def _validate_response(request, action, response):
+    """
+    Validate the response against the schema declared in the raml for its
+    status code. A failure never changes the response sent to the client,
+    it is passed to the RAMLWRAP_RESPONSE_VALIDATION_HANDLER (if set) or logged.
+    :param request: incoming Request.
+    :param action: action object that produced the response.
+    :param response: Response about to be returned (None content for streams).
+    :returns: returns nothing.
+    """
+
+    validator = _response_validators(action).get(response.status_code)
+    if validator is None or response.content is None:
+        return
+
+    content_type = (response.content_type or "").split(";")[0].strip()
+    if content_type != ContentType.JSON:
+        return
+
+    try:
+        validator.validate(json.loads(response.content.decode("utf-8")))
+    except ValidationError as e:
+        _response_validation_failed(e, request, action, response)
+    except ValueError as e:
+        # Malformed json in the response is a violation as well
+        _response_validation_failed(ValidationError("Response is not valid json: {}".format(e), validator="json"),
+                                    request, action, response)
+
+
+def _response_validators(action):
+    """
+    The compiled response_schemas of an action.
+    :param action: action object that produces the response.
+    :returns: dict of status code to SchemaValidator.
+    """
+
+    validators = action.response_validators
+    if validators is None:
+        validators = {}
+        for status_code, schema in action.response_schemas.items():
+            validator = compile_schema(schema)
+            if validator is not None:
+                validators[status_code] = validator
+        action.response_validators = validators
+
+    return validators
+
+
+def _response_validation_failed(e, request, action, response):
+    """
+    Report a response that did not match its schema. The handler defined by
+    RAMLWRAP_RESPONSE_VALIDATION_HANDLER is called with the error, request,
+    action and response; errors raised by it are logged and swallowed.
+    """
+
+    handler_full_path = get_setting('RAMLWRAP_RESPONSE_VALIDATION_HANDLER')
+    if not handler_full_path:
+        logger.warning("Response validation failed for [%s] %s: %s", request.method, request.path, e.message)
+        return
+
+    try:
+        _import_handler(handler_full_path)(e, request.native, action, response.native)
+    except Exception:
+        logger.exception("RAMLWRAP_RESPONSE_VALIDATION_HANDLER raised an exception")
+
+
+def _call_custom_handler(e, request, action):
+    """
+    Dynamically import and call the custom validation error handler
+    defined by the user in the settings.
+    :param e: exception raised that must be handled.
+    :param request: incoming Request that must be served correctly.
+    :param action: action object containing data used to validate and serve the request.
+    :returns: response returned from the custom handler, given the exception.
+    """
+
+    handler = _import_handler(get_setting('RAMLWRAP_VALIDATION_ERROR_HANDLER'))
+
+    if _num_arguments_to_pass(handler) == 3:
+        return handler(e, request.native, action)
+    else:
+        # Handle old versions that still only accept the exception
+        return handler(e)
+
+
+def _import_handler(handler_full_path):
+    """
+    Import a handler function from its full dotted path.
+    :param handler_full_path: e.g. 'myapp.handlers.my_handler'
+    :returns: the handler function.
+    """
+
+    handler_method = handler_full_path.split('.')[-1]
+    handler_class_path = '.'.join(handler_full_path.split('.')[0:-1])
+
+    return getattr(importlib.import_module(handler_class_path), handler_method)
+
+
+def _num_arguments_to_pass(handler):
+    if sys.version_info[0] < 3:
+        # Python 2
+        args = inspect.getargspec(handler).args
+        return len(args)
+    else:
+        # Python 3
+        signature = inspect.signature(handler)
+        return len(signature.parameters)
@@ -0,0 +1,258 @@
+"""
+Request body decoders.
+
+Each media type allowed by the raml gets a BodyHandler when the raml is loaded:
+the decoder registered for the media type plus the compiled schema validator.
+Serving a request is then a dict lookup on the normalised media type.
+
+Register a decoder for another media type with:
+
+    register_decoder("application/xml", my_xml_decoder)
+
+A decoder is called with the body bytes and the full Content-Type header (for
+parameters like charset or boundary) and raises ValueError on a malformed body.
+
+MessagePack and CBOR bodies are decoded when the optional msgpack / cbor2
+packages are installed (pip install ramlwrap[msgpack,cbor]).
+"""
+import csv
+import importlib.util
+import io
+import json
+import sys
+
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import parse_qsl
+
+from . config import get_setting
+from . sampling import SampledValidator
+from . schemas import compile_schema
+from . tracing import get_tracer
+
+_decoders = {}
+
+
+def register_decoder(media_type, decoder):
+    """
+    Register the decoder for a media type, replacing any existing one.
+    Only raml loaded after this call will use it.
+    :param media_type: e.g. 'application/xml'.
+    :param decoder: function of (body bytes, content type header) to decoded data.
+    :returns: returns nothing.
+    """
+
+    _decoders[normalise_media_type(media_type)] = decoder
+
+
+def get_decoder(media_type):
+    """
+    :param media_type: e.g. 'application/json'.
+    :returns: the decoder registered for the media type, or None.
+    """
+
+    return _decoders.get(normalise_media_type(media_type))
+
+
+def normalise_media_type(content_type):
+    """
+    Strip the parameters and whitespace from a content type.
+    :param content_type: e.g. 'Application/JSON; charset=utf-8'.
+    :returns: the media type, e.g. 'application/json'.
+    """
+
+    # Interned: every action of a big raml holds the same few media types
+    return sys.intern(content_type.split(';')[0].strip().lower())
+
+
+class BodyHandler:
+    """
+    Decodes and validates the request bodies of one media type of an action.
+    """
+
+    __slots__ = ("media_type", "decoder", "validator", "max_errors")
+
+    def __init__(self, media_type, decoder=None, validator=None, max_errors=None):
+        """Initialisation function."""
+        self.media_type = media_type
+        self.decoder = decoder
+        self.validator = validator
+        self.max_errors = max_errors
+
+    @property
+    def sampled(self):
+        """True if only a sample of the items of large arrays is validated, see sampling.py."""
+        return isinstance(self.validator, SampledValidator)
+
+    def __call__(self, body, content_type, meta=None):
+        """
+        Decode and validate a request body.
+        :param body: the body bytes.
+        :param content_type: the full Content-Type header of the request.
+        :param meta: dict told whether the body was sample validated, and which arrays were.
+        :raises ValidationError: raised when the decoded body does not match the schema, a
+            ValidationErrors when up to max_errors errors are collected (see schemas.py).
+        :raises ValueError: raised when the body cannot be decoded.
+        :returns: the decoded data.
+        """
+
+        tracer = get_tracer()
+        with tracer.span("ramlwrap.decode"):
+            if self.decoder is None:
+                data = decode_text(body, content_type)
+            else:
+                data = self.decoder(body, content_type)
+
+        if self.validator is not None:
+            max_errors = self.max_errors
+            if max_errors is None:
+                max_errors = get_setting('RAMLWRAP_MAX_VALIDATION_ERRORS')
+            with tracer.span("ramlwrap.validate"):
+                sampled = self.validator.validate(data, max_errors)
+            if meta is not None:
+                meta["sampled"] = bool(sampled)
+                meta["arrays"] = sampled or {}
+
+        return data
+
+
+def compile_request_handlers(request_options, max_errors=None, sampling=None):
+    """
+    Build the media type dispatch table of an action.
+    :param request_options: dict of content type (as declared in the raml) to {"schema": schema or None}.
+    :param max_errors: the number of validation errors to report, 1 to fail fast, None to
+        fall back to the RAMLWRAP_MAX_VALIDATION_ERRORS setting (the best matching error if unset).
+    :param sampling: the SamplingPolicy of the action, None to validate every item of every array.
+    :returns: dict of normalised media type to BodyHandler.
+    """
+
+    handlers = {}
+    for content_type, options in request_options.items():
+        media_type = normalise_media_type(content_type)
+        schema = options.get("schema") if options else None
+        validator = compile_schema(schema) if schema else None
+        if validator is not None and sampling is not None:
+            validator = SampledValidator(validator, sampling)
+        handlers[media_type] = BodyHandler(media_type, get_decoder(media_type), validator, max_errors)
+
+    return handlers
+
+
+def _charset(content_type, default="utf-8"):
+    for param in content_type.split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset' and value.strip():
+            return value.strip().strip('"')
+    return default
+
+
+def _add_value(data, name, value):
+    """Add a field to decoded form data, turning repeated fields into lists."""
+
+    if name not in data:
+        data[name] = value
+    elif isinstance(data[name], list):
+        data[name].append(value)
+    else:
+        data[name] = [data[name], value]
+
+
+def decode_text(body, content_type):
+    """Decode a body to text, or leave it as bytes if it is not text in its charset."""
+
+    try:
+        return body.decode(_charset(content_type or ""))
+    except (UnicodeDecodeError, LookupError):
+        # Just send the body if it cannot be decoded
+        return body
+
+
+def decode_json(body, content_type):
+    """Decode an application/json body."""
+
+    return json.loads(body.decode(_charset(content_type)))
+
+
+def decode_form(body, content_type):
+    """
+    Decode an application/x-www-form-urlencoded body to a dict of field to
+    value (a list of values for repeated fields).
+    """
+
+    data = {}
+    for name, value in parse_qsl(body.decode(_charset(content_type)), keep_blank_values=True):
+        _add_value(data, name, value)
+    return data
+
+
+def decode_multipart(body, content_type):
+    """
+    Decode a multipart/form-data body to a dict of field to value. Fields
+    are strings, files are dicts of filename, content_type and content (bytes).
+    """
+
+    message = BytesParser(policy=HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body)
+    if not message.is_multipart():
+        raise ValueError("Malformed multipart body")
+
+    data = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if name is None:
+            raise ValueError("Multipart body part without a name")
+
+        content = part.get_payload(decode=True) or b""
+        filename = part.get_filename()
+        if filename is None:
+            value = content.decode(part.get_content_charset() or _charset(content_type))
+        else:
+            value = {"filename": filename, "content_type": part.get_content_type(), "content": content}
+        _add_value(data, name, value)
+
+    return data
+
+
+def decode_csv(body, content_type):
+    """Decode a text/csv body (with a header row) to a list of dicts."""
+
+    return list(csv.DictReader(io.StringIO(body.decode(_charset(content_type, "utf-8-sig")))))
+
+
+def decode_msgpack(body, content_type):
+    """Decode an application/msgpack body."""
+
+    import msgpack
+    try:
+        return msgpack.unpackb(body, raw=False)
+    except Exception as e:
+        raise ValueError("Malformed msgpack body: {}".format(e))
+
+
+def decode_cbor(body, content_type):
+    """Decode an application/cbor body."""
+
+    import cbor2
+    try:
+        return cbor2.loads(body)
+    except Exception as e:
+        raise ValueError("Malformed cbor body: {}".format(e))
+
+
+def is_installed(module_name):
+    """Check an optional dependency is installed, without importing it."""
+
+    return importlib.util.find_spec(module_name) is not None
+
+
+register_decoder("application/json", decode_json)
+register_decoder("application/x-www-form-urlencoded", decode_form)
+register_decoder("multipart/form-data", decode_multipart)
+register_decoder("text/csv", decode_csv)
+
+if is_installed("msgpack"):
+    register_decoder("application/msgpack", decode_msgpack)
+    register_decoder("application/x-msgpack", decode_msgpack)
+
+if is_installed("cbor2"):
+    register_decoder("application/cbor", decode_cbor)
@@ -0,0 +1,169 @@
+"""
+Response body encoders and Accept header negotiation.
+
+When a target returns data rather than a response, it is encoded in one of the
+media types the raml declares for the 200 response, picked by the client's
+Accept header (the first declared type when nothing better matches). Each
+action gets its list of (media type, encoder) when the raml is loaded.
+
+Register an encoder for another media type with:
+
+    register_encoder("application/xml", my_xml_encoder)
+
+An encoder is called with the data and returns bytes.
+"""
+import json
+
+from . decoders import is_installed, normalise_media_type
+
+_encoders = {}
+
+# Actions declaring the same response types share one tuple of encoders
+_compiled = {}
+
+# Parsed Accept headers - clients send the same few over and over
+_accept_cache = {}
+_ACCEPT_CACHE_SIZE = 256
+
+
+def register_encoder(media_type, encoder):
+    """
+    Register the encoder for a media type, replacing any existing one.
+    Only raml loaded after this call will use it.
+    :param media_type: e.g. 'application/xml'.
+    :param encoder: function of data to bytes.
+    :returns: returns nothing.
+    """
+
+    _encoders[normalise_media_type(media_type)] = encoder
+    _compiled.clear()
+
+
+def get_encoder(media_type):
+    """
+    :param media_type: e.g. 'application/json'.
+    :returns: the encoder registered for the media type, or None.
+    """
+
+    return _encoders.get(normalise_media_type(media_type))
+
+
+def compile_response_encoders(content_types):
+    """
+    Build the list of encoders an action can respond with.
+    :param content_types: the content types declared for the response, in raml order.
+    :returns: tuple of (media type, encoder) for the types that have an encoder.
+    """
+
+    content_types = tuple(content_types)
+    encoders = _compiled.get(content_types)
+    if encoders is None:
+        encoders = []
+        for content_type in content_types:
+            encoder = get_encoder(content_type)
+            if encoder is not None:
+                encoders.append((normalise_media_type(content_type), encoder))
+        encoders = _compiled[content_types] = tuple(encoders)
+
+    return encoders
+
+
+def negotiate(accept, offered):
+    """
+    Pick the offered media type the Accept header prefers.
+    :param accept: the Accept header, or None.
+    :param offered: list of (media type, value) in order of preference.
+    :returns: the (media type, value) chosen - the first offered one if nothing in Accept matches.
+    """
+
+    if not accept or len(offered) == 1:
+        return offered[0]
+
+    parsed_accept = _parse_accept(accept)
+    best = None
+    best_quality = 0
+    for media_type, value in offered:
+        quality = _quality(parsed_accept, media_type)
+        if quality > best_quality:
+            best, best_quality = (media_type, value), quality
+
+    return best or offered[0]
+
+
+def _parse_accept(accept):
+    """
+    Parse an Accept header into a list of (media range, quality).
+    """
+
+    parsed = _accept_cache.get(accept)
+    if parsed is None:
+        parsed = []
+        for media_range in accept.split(","):
+            params = media_range.split(";")
+            quality = 1.0
+            for param in params[1:]:
+                name, _, value = param.partition("=")
+                if name.strip() == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            parsed.append((params[0].strip().lower(), quality))
+
+        if len(_accept_cache) >= _ACCEPT_CACHE_SIZE:
+            _accept_cache.clear()
+        _accept_cache[accept] = parsed
+
+    return parsed
+
+
+def _quality(parsed_accept, media_type):
+    """The quality the client gives a media type: the most specific range that matches wins."""
+
+    main_type = media_type.split("/")[0]
+    best_specificity = -1
+    quality = 0.0
+    for media_range, range_quality in parsed_accept:
+        if media_range == media_type:
+            specificity = 2
+        elif media_range == main_type + "/*":
+            specificity = 1
+        elif media_range == "*/*":
+            specificity = 0
+        else:
+            continue
+
+        if specificity > best_specificity:
+            best_specificity, quality = specificity, range_quality
+
+    return quality
+
+
+def encode_json(data):
+    return json.dumps(data).encode("utf-8")
+
+
+def encode_ndjson(data):
+    # A list sent as newline delimited json, see streaming.py for iterators
+    return b"".join(json.dumps(item).encode("utf-8") + b"\n" for item in data)
+
+
+def encode_msgpack(data):
+    import msgpack
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def encode_cbor(data):
+    import cbor2
+    return cbor2.dumps(data)
+
+
+register_encoder("application/json", encode_json)
+register_encoder("application/x-ndjson", encode_ndjson)
+
+if is_installed("msgpack"):
+    register_encoder("application/msgpack", encode_msgpack)
+    register_encoder("application/x-msgpack", encode_msgpack)
+
+if is_installed("cbor2"):
+    register_encoder("application/cbor", encode_cbor)
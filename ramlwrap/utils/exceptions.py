@@ -54,4 +54,17 @@ class UnsupportedMediaTypeException(Exception):
 
     def __init__(self, message, status_code=415):
         self.status_code = status_code
-        self.message = message
\ No newline at end of file
+        self.message = message
+
+
+class RequestEntityTooLargeException(Exception):
+    """
+    Exception to be raised if the request body is larger than allowed
+    """
+
+    status_code = 413
+    message = ""  # Error message is set in constructor
+
+    def __init__(self, message, status_code=413):
+        self.status_code = status_code
+        self.message = message
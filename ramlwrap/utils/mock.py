@@ -0,0 +1,284 @@
+"""
+Standalone mock server for a raml file.
+
+Every example declared in the raml is encoded once when the server is built, so
+serving a request is a route lookup and a write of precomputed bytes. The server
+is a plain WSGI callable (with an ASGI entry point) and never touches Django.
+
+Requests may pick which response they get with the headers:
+
+    X-Ramlwrap-Status: 404      the status code of the response to return
+    X-Ramlwrap-Example: two     the name of the example (from `examples`)
+
+Without them the 200 response (or the lowest declared status) and its first
+example are returned.
+
+Run it standalone with:
+
+    python -m ramlwrap.utils.mock path/to/api.raml --port 8000
+"""
+import argparse
+import json
+import logging
+import re
+
+import yaml
+
+from .wsgi import _status_line
+from .yaml_include_loader import Loader
+
+logger = logging.getLogger(__name__)
+
+METHODS = ("get", "post", "put", "delete", "patch")
+
+STATUS_HEADER = "X-Ramlwrap-Status"
+EXAMPLE_HEADER = "X-Ramlwrap-Example"
+
+_WSGI_STATUS_HEADER = "HTTP_X_RAMLWRAP_STATUS"
+_WSGI_EXAMPLE_HEADER = "HTTP_X_RAMLWRAP_EXAMPLE"
+_ASGI_STATUS_HEADER = b"x-ramlwrap-status"
+_ASGI_EXAMPLE_HEADER = b"x-ramlwrap-example"
+
+class MockResponse:
+    """
+    A fully encoded response, ready to be written by either the WSGI or the
+    ASGI entry point.
+    """
+
+    __slots__ = ("status", "body", "wsgi_status", "wsgi_headers", "asgi_headers")
+
+    def __init__(self, status, body, content_type=None, extra_headers=None):
+        """Initialisation function."""
+        self.status = status
+        self.body = body
+
+        headers = [("Content-Length", str(len(body)))]
+        if content_type:
+            headers.insert(0, ("Content-Type", content_type))
+        if extra_headers:
+            headers.extend(extra_headers)
+
+        self.wsgi_status = _status_line(status)
+        self.wsgi_headers = headers
+        self.asgi_headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+
+class MockAction:
+    """
+    The precomputed responses of one request method of a resource, keyed by
+    status code and then example name.
+    """
+
+    __slots__ = ("responses", "default")
+
+    def __init__(self):
+        """Initialisation function."""
+        self.responses = {}
+        self.default = None
+
+    def select(self, status, example):
+        """
+        Select the response for the (optional) status and example requested.
+        :param status: requested status code as a string, or None.
+        :param example: requested example name, or None.
+        :returns: the MockResponse, or None if there is no such response.
+        """
+
+        if status is None and example is None:
+            return self.default
+
+        if status is None:
+            status = self.default.status
+        else:
+            try:
+                status = int(status)
+            except ValueError:
+                return None
+
+        examples = self.responses.get(status)
+        if not examples:
+            return None
+        if example is None:
+            return next(iter(examples.values()))
+        return examples.get(example)
+
+
+class MockServer:
+    """
+    WSGI application serving the examples of a raml file. Use the instance
+    itself as the WSGI callable and `asgi` as the ASGI one.
+    """
+
+    def __init__(self, raml_filepath):
+        """
+        Load the raml and encode every example it contains.
+        :param raml_filepath: the path to the raml file (not a file pointer)
+        """
+
+        with open(raml_filepath) as f:
+            tree = yaml.load(f, Loader=Loader)  # This loader has the !include directive
+
+        self.static_routes = {}
+        self.dynamic_routes = []
+
+        to_look_at = [(tree, "")]
+        for node, path in to_look_at:
+            actions = {}
+            for k in node:
+                if k.startswith("/"):
+                    to_look_at.append((node[k], "%s%s" % (path, k)))
+                elif k in METHODS:
+                    actions[k.upper()] = _build_action(node[k] or {})
+
+            if actions:
+                route = (actions, _not_allowed_response(actions))
+                if "{" in path:
+                    parts = re.split(r"{[^/]+?}", path)
+                    regex = re.compile("^%s$" % "[^/]+".join(re.escape(part) for part in parts))
+                    self.dynamic_routes.append((regex, route))
+                else:
+                    self.static_routes[path] = route
+
+        self.not_found = _error_response(404, "Not found.")
+
+    def resolve(self, method, path, status=None, example=None):
+        """
+        Find the response for a request.
+        :param method: http method of the request.
+        :param path: path of the request (without a base uri).
+        :param status: value of the X-Ramlwrap-Status header, if any.
+        :param example: value of the X-Ramlwrap-Example header, if any.
+        :returns: the MockResponse to send.
+        """
+
+        if len(path) > 1 and path.endswith("/"):
+            path = path[:-1]
+
+        route = self.static_routes.get(path)
+        if route is None:
+            for regex, dynamic_route in self.dynamic_routes:
+                if regex.match(path):
+                    route = dynamic_route
+                    break
+            else:
+                return self.not_found
+
+        actions, not_allowed = route
+        action = actions.get(method)
+        if action is None:
+            return not_allowed
+
+        response = action.select(status, example)
+        if response is None:
+            return _error_response(400, "No example for status [%s] and example [%s]." % (status, example))
+        return response
+
+    def __call__(self, environ, start_response):
+        """WSGI entry point."""
+
+        response = self.resolve(environ["REQUEST_METHOD"], environ.get("PATH_INFO") or "/",
+                                environ.get(_WSGI_STATUS_HEADER), environ.get(_WSGI_EXAMPLE_HEADER))
+        start_response(response.wsgi_status, response.wsgi_headers)
+        return [response.body]
+
+    async def asgi(self, scope, receive, send):
+        """ASGI entry point."""
+
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        status = example = None
+        for name, value in scope["headers"]:
+            if name == _ASGI_STATUS_HEADER:
+                status = value.decode("latin-1")
+            elif name == _ASGI_EXAMPLE_HEADER:
+                example = value.decode("latin-1")
+
+        response = self.resolve(scope["method"], scope["path"] or "/", status, example)
+        await send({"type": "http.response.start", "status": response.status, "headers": response.asgi_headers})
+        await send({"type": "http.response.body", "body": response.body})
+
+
+def _build_action(act):
+    """Encode every response example of a raml method."""
+
+    action = MockAction()
+
+    for status_code, response in (act.get("responses") or {}).items():
+        status_code = int(status_code)
+        examples = {}
+
+        body = (response or {}).get("body")
+        if body:
+            content_type, definition = next(iter(body.items()))
+            definition = definition or {}
+            if "example" in definition:
+                examples["example"] = _encode(definition["example"], content_type)
+            if definition.get("examples"):
+                for name, example in definition["examples"].items():
+                    examples[name] = _encode(example, content_type)
+            examples = dict((name, MockResponse(status_code, data, content_type)) for name, data in examples.items())
+
+        if not examples:
+            examples["example"] = MockResponse(status_code, b"")
+
+        action.responses[status_code] = examples
+
+    if not action.responses:
+        action.responses[200] = {"example": MockResponse(200, b"")}
+
+    default_status = 200 if 200 in action.responses else min(action.responses)
+    action.default = next(iter(action.responses[default_status].values()))
+
+    return action
+
+
+def _encode(example, content_type):
+    """Encode an example as bytes for the given content type."""
+
+    if isinstance(example, bytes):
+        return example
+    if isinstance(example, str):
+        return example.encode("utf-8")
+    if "json" in content_type:
+        return json.dumps(example).encode("utf-8")
+    return str(example).encode("utf-8")
+
+
+def _not_allowed_response(actions):
+    """Build the 405 response for a resource."""
+
+    return _error_response(405, "Method not allowed.", [("Allow", ", ".join(sorted(actions)))])
+
+
+def _error_response(status, message, extra_headers=None):
+    """Build a json error response in the same shape as the validation errors."""
+
+    return MockResponse(status, json.dumps({"message": message}).encode("utf-8"), "application/json", extra_headers)
+
+
+def main(argv=None):
+    """Serve a raml file with the reference WSGI server."""
+
+    from wsgiref.simple_server import make_server
+
+    parser = argparse.ArgumentParser(description="Serve the examples of a raml file.")
+    parser.add_argument("raml_file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, MockServer(args.raml_file))
+    logger.info("Serving mocks for %s on %s:%s", args.raml_file, args.host, args.port)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
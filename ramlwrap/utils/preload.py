@@ -0,0 +1,115 @@
+"""
+Build everything up front in a pre-forking server's master process.
+
+With gunicorn --preload the master imports the application, but Django only
+imports the url conf (and so parses the raml) on the first request in each
+worker. Calling preload in the wsgi module does that work once in the master:
+
+    application = get_wsgi_application()
+    ramlwrap.preload()
+
+It imports the url conf, finds every ramlwrap endpoint in it (and in any
+RamlApplication passed in), makes sure their schemas are compiled and examples
+encoded, and then moves every object that exists so far into the permanent
+generation with gc.freeze(). Workers forked after that share those pages with
+the master instead of copying them when the garbage collector visits them.
+"""
+import gc
+import logging
+
+from . core import Endpoint
+from . sampling import SampledValidator
+
+logger = logging.getLogger(__name__)
+
+
+def preload(*applications, urlconf=None, freeze=True):
+    """
+    Build and compile every endpoint now, then freeze the garbage collector.
+    :param applications: RamlApplications (or other objects with static_routes
+        and dynamic_routes) to preload, besides the Django url conf.
+    :param urlconf: the Django url conf to preload, defaults to ROOT_URLCONF.
+        Skipped when Django isn't configured.
+    :param freeze: call gc.freeze() once done (where python has it).
+    :returns: the number of endpoints preloaded.
+    """
+
+    endpoints = []
+
+    if _django_configured():
+        from django.urls import get_resolver
+        _collect_patterns(get_resolver(urlconf).url_patterns, endpoints)
+
+    for application in applications:
+        endpoints.extend(application.static_routes.values())
+        endpoints.extend(endpoint for _, endpoint in application.dynamic_routes)
+
+    for endpoint in endpoints:
+        endpoint.freeze()
+        for action in endpoint.request_method_mapping.values():
+            _warm_up(action)
+
+    # Everything built so far is there for the life of the process
+    gc.collect()
+    if freeze and hasattr(gc, "freeze"):
+        gc.freeze()
+
+    logger.info("Preloaded %d ramlwrap endpoints", len(endpoints))
+    return len(endpoints)
+
+
+def _django_configured():
+    try:
+        from django.conf import settings
+    except ImportError:
+        return False
+    return settings.configured
+
+
+def _collect_patterns(patterns, endpoints):
+    """Find the ramlwrap endpoints served by a list of Django url patterns."""
+
+    for pattern in patterns:
+        if hasattr(pattern, "url_patterns"):
+            # include()
+            _collect_patterns(pattern.url_patterns, endpoints)
+            continue
+
+        target = getattr(pattern.callback, "__self__", None)
+        # Hot reloaded urls are served through a proxy
+        target = getattr(target, "endpoint", target)
+        if isinstance(target, Endpoint):
+            endpoints.append(target)
+
+
+def _warm_up(action):
+    """
+    Run each compiled schema once, so whatever jsonschema builds lazily on
+    first use (format checkers, resolved $refs) is built now. The generated
+    checks were compiled along with the schemas.
+    """
+
+    for validator in _schema_validators(action):
+        try:
+            validator.validator.is_valid(None)
+        except Exception:
+            # A broken schema fails the same way when serving
+            pass
+
+
+def _schema_validators(action):
+    """
+    The SchemaValidators of an action, those the SampledValidators of its
+    request handlers wrap included.
+    """
+
+    validators = list(action.response_validators.values())
+    for handler in (action.request_handlers or {}).values():
+        validator = handler.validator
+        if isinstance(validator, SampledValidator):
+            validators.append(validator.validator)
+            if validator.envelope is not None:
+                validators.append(validator.envelope)
+        elif validator is not None:
+            validators.append(validator)
+    return validators
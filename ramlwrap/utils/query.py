@@ -0,0 +1,188 @@
+"""
+Typed query parameters.
+
+The queryParameters a raml method declares are compiled into a QueryParser
+when the endpoint is built. Once the query has passed the checks in
+core._validate_query_params, the parser turns its strings into the declared
+types - integer, number and boolean, with anything else left a string - and
+fills in defaults. The result is handed to the target as
+request.validated_query, so targets don't parse request.GET themselves:
+
+    queryParameters:
+      page:
+        type: integer
+        default: 1
+      tag:
+        type: string[]      # or repeat: true in raml 0.8
+
+    request.validated_query == {"page": 1, "tag": ["a", "b"]}    # for ?tag=a&tag=b
+
+Parameters that are neither sent nor have a default are left out, and
+parameters the raml doesn't declare are only in request.GET.
+"""
+import logging
+
+from jsonschema.exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+
+class QueryParameter:
+    """
+    One declared query parameter: how to convert it and what to use when it isn't sent.
+    """
+
+    __slots__ = ("name", "type", "convert", "repeat", "default")
+
+    def __init__(self, name, type_name, convert, repeat, default):
+        """Initialisation function."""
+        self.name = name
+        self.type = type_name
+        self.convert = convert
+        self.repeat = repeat
+        self.default = default
+
+
+class QueryParser:
+    """
+    Converts a query to the typed values of its declared parameters.
+    """
+
+    __slots__ = ("parameters",)
+
+    def __init__(self, parameters):
+        """
+        :param parameters: list of QueryParameter.
+        """
+        self.parameters = tuple(parameters)
+
+    def parse(self, query):
+        """
+        :param query: the query parameters, anything with get and getlist (e.g. a Django QueryDict).
+        :raises ValidationError: raised when a value can't be converted to its declared type.
+        :returns: dict of parameter name to typed value (a list of them for repeated parameters).
+        """
+
+        values = {}
+        for parameter in self.parameters:
+            if parameter.name not in query:
+                if parameter.default is not None:
+                    values[parameter.name] = parameter.default
+                continue
+
+            if parameter.repeat:
+                values[parameter.name] = [_convert(parameter, value) for value in query.getlist(parameter.name)]
+            else:
+                values[parameter.name] = _convert(parameter, query.get(parameter.name))
+
+        return values
+
+
+def compile_query_parameters(declarations):
+    """
+    Compile the queryParameters of a raml method.
+    :param declarations: dict of parameter name to its raml declaration.
+    :returns: a QueryParser, or None if no parameters are declared.
+    """
+
+    if not declarations:
+        return None
+
+    parameters = []
+    for name, declaration in declarations.items():
+        declaration = declaration or {}
+        type_name, repeat = _parameter_type(declaration)
+        convert = get_converter(type_name)
+
+        default = declaration.get("default")
+        if default is not None:
+            try:
+                if repeat:
+                    defaults = default if isinstance(default, list) else [default]
+                    default = [convert(value) for value in defaults]
+                else:
+                    default = convert(default)
+            except ValueError:
+                logger.warning("The default of query parameter [%s] is not a valid %s", name, type_name)
+
+        parameters.append(QueryParameter(name, type_name, convert, repeat, default))
+
+    return QueryParser(parameters)
+
+
+def get_converter(type_name):
+    """
+    :param type_name: a raml parameter type, e.g. 'integer'.
+    :returns: function converting a string to that type, raising ValueError if it can't.
+    """
+
+    return _CONVERTERS.get(type_name, str)
+
+
+def _parameter_type(declaration):
+    """
+    :param declaration: the raml declaration of a query parameter.
+    :returns: tuple of the type of its values and whether it can be repeated.
+    """
+
+    type_name = declaration.get("type") or "string"
+    if not isinstance(type_name, str):
+        return "string", bool(declaration.get("repeat"))
+
+    if type_name.endswith("[]"):
+        # raml 1.0 array shorthand, e.g. integer[]
+        return type_name[:-2], True
+
+    if type_name == "array":
+        items = declaration.get("items") or "string"
+        if isinstance(items, dict):
+            items = items.get("type") or "string"
+        return items, True
+
+    return type_name, bool(declaration.get("repeat"))
+
+
+def _convert(parameter, value):
+    try:
+        return parameter.convert(value)
+    except ValueError:
+        raise ValidationError("QueryParam [%s] failed validation check [type]:[%s]" % (parameter.name, parameter.type),
+                              validator="type")
+
+
+def _to_integer(value):
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError(value)
+        return int(value)
+    return int(value)
+
+
+def _to_number(value):
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def _to_boolean(value):
+    if isinstance(value, bool):
+        return value
+    if value == "true":
+        return True
+    if value == "false":
+        return False
+    raise ValueError(value)
+
+
+_CONVERTERS = {
+    "integer": _to_integer,
+    "number": _to_number,
+    "boolean": _to_boolean,
+}
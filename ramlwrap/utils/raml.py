@@ -1,13 +1,20 @@
 import logging
-import yaml
-
-from django.urls import re_path
+import re
 
 from .yaml_include_loader import Loader
-from .validation import Endpoint, Action
+from .core import Endpoint, Action
+from .decoders import compile_request_handlers
+from .compression import compile_compression
+from .sampling import compile_sampling
+from .encoders import compile_response_encoders
+from .response_cache import compile_cache_policy
+from .uri import compile_uri_parameters
 
 logger = logging.getLogger(__name__)
 
+# A {placeholder} left in a url, rather than a {m,n} quantifier of a uriParameter regex
+_PLACEHOLDER = re.compile(r"\{[^{}0-9,][^{}]*\}")
+
 
 def raml_url_patterns(raml_filepath, function_map):
     """
@@ -18,20 +25,41 @@ def raml_url_patterns(raml_filepath, function_map):
     :return:
     """
 
-    # This function will run in three phases:
+    from django.urls import re_path
+    from .validation import Endpoint as DjangoEndpoint
+
+    patterns = []
+    for endpoint in raml_endpoints(raml_filepath, function_map, DjangoEndpoint):
+        # strip leading
+        if endpoint.url.startswith("/"):
+            url_to_use = endpoint.url[1:]
+        else:
+            url_to_use = endpoint.url
+
+        patterns.append(re_path("^%s$" % url_to_use, endpoint.serve))
+
+    return patterns
+
+
+def raml_endpoints(raml_filepath, function_map, endpoint_class=Endpoint, include_cache=None):
+    """
+    Parse the raml file into endpoints, independent of any web framework.
+    :param raml_filepath: the path to the raml file (not a file pointer)
+    :param function_map: a dictionary of urls to functions for mapping
+    :param endpoint_class: the Endpoint class (or adapter subclass) to build
+    :param include_cache: dict to reuse unchanged includes from, see yaml_include_loader.
+    :return: list of endpoints, one per resource with at least one method
+    """
+
+    # This function will run in two phases:
     # 1) Load the raml (as a yaml document)
     # 2) Parse the raml into nodes that represent 'endpoints'
-    # 3) Convert endpoints into a url structure
 
-    # migrating from pyraml: file handling now has to be done by us
-    # worry about streaming files in future version (for VERY BIG raml?)
-    f = open(raml_filepath)
-    tree = yaml.load(f, Loader=Loader)  # This loader has the !include directive
-    f.close()
+    tree, _ = _load_tree(raml_filepath, include_cache)
 
     # The resource map is the found nodes
 
-    patterns = []
+    endpoints = []
     to_look_at = [
         {
             "node": tree,
@@ -39,29 +67,80 @@ def raml_url_patterns(raml_filepath, function_map):
         }
     ]
 
-    # FIXME: get baseuri, and default media types out here
+    defaults = _defaults(tree)
+    problems = _problems()
+
+    for item in to_look_at:
+        _parse_child(item, endpoints, to_look_at, function_map, defaults, endpoint_class, problems)
+
+    _log_problems(problems)
+
+    return endpoints
 
-    defaults = {
+
+def _load_tree(raml_filepath, include_cache=None):
+    """
+    Load the raml as a yaml document.
+    :param raml_filepath: the path to the raml file (not a file pointer)
+    :param include_cache: dict to reuse unchanged includes from, see yaml_include_loader.
+    :return: tuple of the document and the set of files it includes.
+    """
+
+    # migrating from pyraml: file handling now has to be done by us
+    # worry about streaming files in future version (for VERY BIG raml?)
+    with open(raml_filepath) as f:
+        loader = Loader(f)  # This loader has the !include directive
+        loader.include_cache = include_cache
+        try:
+            tree = loader.get_single_data()
+        finally:
+            loader.dispose()
+
+    return tree, loader.includes
+
+
+def _defaults(tree):
+    # FIXME: get baseuri, and default media types out here
+    return {
         "content_type": "application/json",
     }
 
-    for item in to_look_at:
-        _parse_child(item, patterns, to_look_at, function_map, defaults)
 
-    return patterns
+def _problems():
+    # Resources with problems in the function map, logged together once the raml is parsed
+    return {"old_style": [], "unmapped_dynamic": []}
+
+
+def _log_problems(problems):
+    if problems["old_style"]:
+        logger.warning("The function map for [%s] is not the 2.0 and above object - style. Please fix as this will be depricated in newer versions of RamlWrap (the fix is a simple copy/paste change to your code layout)" % ", ".join(problems["old_style"]))
+    if problems["unmapped_dynamic"]:
+        logger.error("Url: [%s] appears to have a dynamic component but there is no function map for it. You must define the regex in the function map to prevent errors" % ", ".join(problems["unmapped_dynamic"]))
 
 
-def _parse_child(resource, patterns, to_look_at, function_map, defaults):
+def _parse_child(resource, endpoints, to_look_at, function_map, defaults, endpoint_class=Endpoint, problems=None):
 
     node = resource['node']
     path = resource['path']
     local_endpoint = None
 
+    if problems is None:
+        # Parsing a single resource, e.g. on reload
+        own_problems = problems = _problems()
+    else:
+        own_problems = None
+
+    # uriParameters declared on a resource apply to its children as well
+    uri_parameters = resource.get('uri_parameters') or {}
+    if node.get('uriParameters'):
+        uri_parameters = dict(uri_parameters, **node['uriParameters'])
+
     for k in node:
         if k.startswith("/"):
             item = {
                 "node": node[k],
-                "path": "%s%s" % (path, k)
+                "path": "%s%s" % (path, k),
+                "uri_parameters": uri_parameters
             }
 
             to_look_at.append(item)
@@ -75,14 +154,42 @@ def _parse_child(resource, patterns, to_look_at, function_map, defaults):
                 act = node[k]
 
                 if not local_endpoint:
-                    local_endpoint = Endpoint(path)
+                    local_endpoint = endpoint_class(path)
+                    _parse_uri_parameters(local_endpoint, uri_parameters, function_map.get(path))
 
                 # look for a 200.body.{{content-type}}
                 # and a 200.body.{{content-type}}.example
 
                 a = Action()
+                a.resource = path
+                a.method = k.upper()
                 a.resp_content_type = defaults["content_type"]
 
+                # The (maxBodySize) annotation may be set on the method or the whole resource
+                if act and "(maxBodySize)" in act:
+                    a.max_body_size = int(act["(maxBodySize)"])
+                elif "(maxBodySize)" in node:
+                    a.max_body_size = int(node["(maxBodySize)"])
+
+                # As can the (cache) and (etag) annotations, which only apply to GET
+                cache_config = None
+                if act and "(cache)" in act:
+                    cache_config = act["(cache)"]
+                elif "(cache)" in node:
+                    cache_config = node["(cache)"]
+
+                compression = None
+                if act and "(compression)" in act:
+                    compression = act["(compression)"]
+                elif "(compression)" in node:
+                    compression = node["(compression)"]
+
+                etag = None
+                if act and "(etag)" in act:
+                    etag = act["(etag)"]
+                elif "(etag)" in node:
+                    etag = node["(etag)"]
+
                 # FIXME: at some point allow a construct for multi-methods
                 if path in function_map:
                     # Check for new style or old style definitions
@@ -94,16 +201,45 @@ def _parse_child(resource, patterns, to_look_at, function_map, defaults):
                         if "regex" in function_map[path]:
                             # Add dynamic value regex if present
                             local_endpoint.parse_regex(function_map[path]["regex"])
+
+                        if "max_body_size" in function_map[path]:
+                            # Overrides the (maxBodySize) annotation and RAMLWRAP_MAX_BODY_SIZE setting
+                            a.max_body_size = function_map[path]["max_body_size"]
+
+                        if "cache" in function_map[path]:
+                            # Overrides the (cache) annotation
+                            cache_config = function_map[path]["cache"]
+
+                        if "compression" in function_map[path]:
+                            # Overrides the (compression) annotation
+                            compression = function_map[path]["compression"]
+
+                        if "etag" in function_map[path]:
+                            # Overrides the (etag) annotation, a function gives the version token
+                            etag = function_map[path]["etag"]
+
+                        if "response_validation_rate" in function_map[path]:
+                            # Per endpoint override of RAMLWRAP_RESPONSE_VALIDATION_RATE
+                            a.response_validation_rate = function_map[path]["response_validation_rate"]
+
+                        if "max_validation_errors" in function_map[path]:
+                            # Per endpoint override of RAMLWRAP_MAX_VALIDATION_ERRORS, 1 to fail fast
+                            a.max_validation_errors = function_map[path]["max_validation_errors"]
+
+                        if "sampled_validation" in function_map[path]:
+                            # Only validate a sample of the items of large arrays, see sampling.py
+                            a.sampled_validation = compile_sampling(function_map[path]["sampled_validation"])
                     else:
                         # Deprecated! Ramlwrap < 2.0 compatibility
                         # I am not completely sure this is always desirable to fix though?
-                        logger.warn("The function map for [%s] is not the 2.0 and above object - style. Please fix as this will be depricated in newer versions of RamlWrap (the fix is a simple copy/paste change to your code layout)" % path)
+                        if path not in problems["old_style"]:
+                            problems["old_style"].append(path)
                         a.target = function_map[path]
 
                 else:
                     # The path is not in a function map, check if it is a dynamic url as this will cause errors later
-                    if "{" in path:
-                        logger.error("Url: [%s] appears to have a dynamic component but there is no function map for it. You must define the regex in the function map to prevent errors" % path)
+                    if _PLACEHOLDER.search(local_endpoint.url) and path not in problems["unmapped_dynamic"]:
+                        problems["unmapped_dynamic"].append(path)
 
                 if 'body' in act:
                     # if body, look for content type
@@ -121,6 +257,8 @@ def _parse_child(resource, patterns, to_look_at, function_map, defaults):
 
                     a.request_options = request_options
                     a.request_content_type_options = request_content_type_options
+                    a.request_handlers = compile_request_handlers(request_options, a.max_validation_errors,
+                                                                  a.sampled_validation)
 
 
                 # These horrendous if blocks are to get around none type errors when the tree
@@ -128,6 +266,13 @@ def _parse_child(resource, patterns, to_look_at, function_map, defaults):
 
                 if 'responses' in act and act['responses']:
                     for status_code in act['responses']:
+                        # keep every declared response schema so the served response can be checked against it
+                        response = act['responses'][status_code]
+                        if response and response.get('body'):
+                            resp_body = next(iter(response['body'].values()))
+                            if resp_body and resp_body.get('schema'):
+                                a.response_schemas[int(status_code)] = resp_body['schema']
+
                         # this is a response that we care about:
                         if status_code == 200:
                             two_hundred = act['responses'][200]
@@ -135,6 +280,7 @@ def _parse_child(resource, patterns, to_look_at, function_map, defaults):
                                 if resp_attr == "body":
                                     # not sure if this can fail and be valid raml?
                                     a.resp_content_type = next(iter(two_hundred['body']))
+                                    a.response_encoders = compile_response_encoders(two_hundred['body'])
                                     if two_hundred['body'][a.resp_content_type]:
                                         if "example" in two_hundred['body'][a.resp_content_type]:
                                             a.example = two_hundred['body'][a.resp_content_type]['example']
@@ -145,6 +291,17 @@ def _parse_child(resource, patterns, to_look_at, function_map, defaults):
                                             value_iterator = iter(examples)
                                             a.example = next(value_iterator)
 
+                a.compression = compile_compression(compression)
+
+                if k == "get" and etag:
+                    a.etag = True
+                    if callable(etag):
+                        a.etag_version = etag
+
+                if k == "get" and cache_config:
+                    resp_content_types = [content_type for content_type, _ in a.response_encoders or ()]
+                    a.response_cache = compile_cache_policy(path, cache_config, resp_content_types)
+
                 if "queryParameters" in act and act["queryParameters"]:
                     # FIXME: does this help in the query parameterising?
                     # For filling out a.queryparameterchecks
@@ -153,10 +310,26 @@ def _parse_child(resource, patterns, to_look_at, function_map, defaults):
                 local_endpoint.add_action(k.upper(), a)
 
     if local_endpoint:
-        # strip leading
-        if local_endpoint.url.startswith("/"):
-            url_to_use = local_endpoint.url[1:]
-        else:
-            url_to_use = local_endpoint.url
+        # Compile everything now; the raml tree can be freed once the endpoints are built
+        local_endpoint.freeze()
+        endpoints.append(local_endpoint)
+
+    if own_problems is not None:
+        _log_problems(own_problems)
+
+
+def _parse_uri_parameters(endpoint, uri_parameters, mapping):
+    """
+    Replace the {placeholders} of declared uriParameters in the endpoint url
+    with regexes built from their declarations, see uri.py. Placeholders with
+    a regex in the function map are left to it.
+    """
+
+    if not uri_parameters or "{" not in endpoint.url:
+        return
 
-        patterns.append(re_path("^%s$" % url_to_use, local_endpoint.serve))
+    regex_dict = mapping.get("regex") if type(mapping) is dict else None
+    regexes, converters = compile_uri_parameters(endpoint.url, uri_parameters, regex_dict)
+    endpoint.parse_regex(regexes)
+    if converters:
+        endpoint.uri_converters = converters
@@ -0,0 +1,135 @@
+"""
+Serve several raml files from one set of url patterns.
+
+    registry = Registry()
+    registry.add("orders.raml", orders_function_map)
+    registry.add("customers.raml", customers_function_map)
+    urlpatterns.extend(registry.urlpatterns)
+
+Calling ramlwrap() once per raml file parses each file on its own and gives
+Django one list of patterns per file to scan in turn. A registry parses the
+files with a shared include cache, so a schema included by several files is
+read and parsed once (and compiled once, as compile_schema already shares
+identical schemas). Every endpoint is served through a single url resolver
+backed by a Router, which finds literal urls with a dict lookup and only tries
+the regexes of dynamic urls starting with the same path segment.
+
+Resource paths are checked as each file is added: a url already defined (in
+that file or another) raises a FatalException, and a literal url that a
+dynamic one also matches is logged as a warning, since only the literal one
+will ever serve it.
+"""
+import logging
+
+from django.urls import re_path
+from django.urls.resolvers import RegexPattern, URLResolver
+from django.urls.exceptions import Resolver404
+
+from . exceptions import FatalException
+from . raml import raml_endpoints
+from . router import Router, is_dynamic
+
+logger = logging.getLogger(__name__)
+
+
+class Registry:
+    """
+    The endpoints of several raml files, with a combined router.
+    """
+
+    def __init__(self, endpoint_class=None):
+        """
+        :param endpoint_class: the Endpoint class to build, defaults to the Django one.
+        """
+
+        if endpoint_class is None:
+            from . validation import Endpoint as endpoint_class
+
+        self.endpoint_class = endpoint_class
+        self.router = Router()
+        self.specs = []
+        self.include_cache = {}
+
+        self._patterns = []
+        self._pattern_by_endpoint = {}
+        self._sources = {}
+        self._resolver = RegistryResolver(self)
+
+    @property
+    def urlpatterns(self):
+        """A single pattern serving every endpoint, to add to the Django url patterns."""
+
+        return [self._resolver]
+
+    def add(self, raml_filepath, function_map):
+        """
+        Parse a raml file and route to its endpoints.
+        :param raml_filepath: the path to the raml file (not a file pointer)
+        :param function_map: a dictionary of urls to functions for mapping
+        :raises FatalException: raised when a resource path is already defined.
+        :returns: list of the endpoints added.
+        """
+
+        endpoints = raml_endpoints(raml_filepath, function_map, self.endpoint_class, self.include_cache)
+
+        # Check the whole file before routing to any of it
+        pending = Router()
+        for endpoint in endpoints:
+            for other in self.router.overlaps(endpoint.url) + pending.overlaps(endpoint.url):
+                _check_overlap(endpoint, raml_filepath, other, self._sources.get(other, raml_filepath))
+            pending.add(endpoint)
+
+        for endpoint in endpoints:
+            self.router.add(endpoint)
+            pattern = re_path("^%s$" % endpoint.url.lstrip("/"), endpoint.serve)
+            self._patterns.append(pattern)
+            self._pattern_by_endpoint[endpoint] = pattern
+            self._sources[endpoint] = raml_filepath
+        self.specs.append(raml_filepath)
+
+        logger.info("Registered %d endpoints from %s", len(endpoints), raml_filepath)
+        return endpoints
+
+    def source(self, endpoint):
+        """:returns: the raml file an endpoint was defined in."""
+
+        return self._sources.get(endpoint)
+
+
+class RegistryResolver(URLResolver):
+    """
+    Django url resolver for the endpoints of a Registry. Resolving goes
+    through the registry's Router; the url patterns it holds are for reverse(),
+    the system checks and debug pages.
+    """
+
+    def __init__(self, registry):
+        """
+        :param registry: the Registry to serve.
+        """
+
+        super(RegistryResolver, self).__init__(RegexPattern(r"^"), registry._patterns)
+        self.registry = registry
+
+    def resolve(self, path):
+        path = str(path)
+        endpoint, _ = self.registry.router.resolve(path)
+        if endpoint is None:
+            raise Resolver404({"tried": [[pattern] for pattern in self.url_patterns], "path": path})
+
+        # The endpoint's own pattern builds the match, as Django would have
+        return self.registry._pattern_by_endpoint[endpoint].resolve(path)
+
+
+def _check_overlap(endpoint, raml_filepath, other, other_raml_filepath):
+    """Raise for a url defined twice, warn for a literal url shadowing a dynamic one."""
+
+    if endpoint.url.lstrip("/") == other.url.lstrip("/"):
+        message = "The resource [%s] in %s is already defined in %s" % (endpoint.url, raml_filepath,
+                                                                        other_raml_filepath)
+        logger.error(message)
+        raise FatalException(message)
+
+    literal, dynamic = (other, endpoint) if is_dynamic(endpoint.url) else (endpoint, other)
+    logger.warning("The resource [%s] is also matched by [%s]; it is served by [%s]",
+                   literal.url, dynamic.url, literal.url)
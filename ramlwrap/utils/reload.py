@@ -0,0 +1,246 @@
+"""
+Hot reload of raml files, for development and staging.
+
+    urlpatterns.extend(ramlwrap("api.raml", function_map, hot_reload=True))
+
+(or set RAMLWRAP_HOT_RELOAD = True). The raml file and every file it includes
+are polled for changes every RAMLWRAP_HOT_RELOAD_INTERVAL seconds (default 1).
+On a change the raml is loaded again, re-reading only the includes that
+changed, and only the endpoints whose resource changed are rebuilt.
+
+The url patterns served are a live list behind a single include() pattern, and
+each url is served through a proxy, so new endpoints are swapped in by
+replacing references: requests already being served finish on the endpoint
+they started on. If the changed raml can't be loaded the old endpoints keep
+being served. The list's `reloader` is the HotReloader, stop() it to stop
+polling.
+"""
+import logging
+import threading
+
+from django.urls import include, re_path
+from django.views.decorators.csrf import csrf_exempt
+
+from . config import get_setting
+from . raml import _defaults, _load_tree, _parse_child
+from . validation import Endpoint
+from . yaml_include_loader import file_stamp
+
+logger = logging.getLogger(__name__)
+
+
+class HotReloader:
+    """
+    Serves the endpoints of a raml file, rebuilding them when the raml or its
+    includes change.
+    """
+
+    def __init__(self, raml_filepath, function_map, endpoint_class=Endpoint):
+        """
+        :param raml_filepath: the path to the raml file (not a file pointer)
+        :param function_map: a dictionary of urls to functions for mapping
+        :param endpoint_class: the Endpoint class to build
+        """
+
+        self.raml_filepath = raml_filepath
+        self.function_map = function_map
+        self.endpoint_class = endpoint_class
+
+        self.urlpatterns = _PatternList()
+        self.urlpatterns.reloader = self
+        self.rebuilt = []
+
+        self._include_cache = {}
+        self._resources = {}
+        self._proxies = {}
+        self._stamps = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+        self.reload()
+
+    @property
+    def endpoints(self):
+        """The endpoints currently served, in raml order."""
+
+        return [pattern.callback.__self__.endpoint for pattern in self.urlpatterns]
+
+    def check(self):
+        """
+        Reload if the raml or any of its includes changed since the last load.
+        :returns: True if it reloaded.
+        """
+
+        for filename, stamp in self._stamps.items():
+            if file_stamp(filename) != stamp:
+                self.reload()
+                return True
+        return False
+
+    def reload(self):
+        """
+        Load the raml again and swap in the endpoints whose resource changed.
+        :returns: returns nothing.
+        """
+
+        with self._lock:
+            try:
+                tree, includes = _load_tree(self.raml_filepath, self._include_cache)
+            except Exception:
+                if not self._resources:
+                    raise
+                logger.exception("Could not reload %s, still serving the previous version", self.raml_filepath)
+                # Wait for the next change before trying again
+                self._stamps = dict((f, file_stamp(f)) for f in self._stamps)
+                return
+
+            self._stamps = dict((f, file_stamp(f)) for f in includes | {self.raml_filepath})
+            self._swap(tree)
+
+    def _swap(self, tree):
+        defaults = _defaults(tree)
+        resources = {}
+        proxies = {}
+        patterns = []
+        self.rebuilt = []
+
+        for path, node, uri_parameters in _resources(tree):
+            # Only the resource's own methods - child resources are compared separately
+            own_node = dict((k, v) for k, v in node.items() if not k.startswith("/"))
+            resources[path] = (own_node, uri_parameters)
+
+            proxy = self._proxies.get(path)
+            if proxy is None or self._resources.get(path) != resources[path]:
+                built = []
+                _parse_child({"node": own_node, "path": path, "uri_parameters": uri_parameters}, built, [],
+                             self.function_map, defaults, self.endpoint_class)
+                if not built:
+                    continue
+
+                self.rebuilt.append(path)
+                if proxy is None:
+                    proxy = _EndpointProxy(built[0])
+                else:
+                    # Requests already in the old endpoint carry on with it
+                    old_url = proxy.endpoint.url
+                    proxy.endpoint = built[0]
+                    if built[0].url != old_url:
+                        # e.g. the type of a uriParameter changed, so the url regex did
+                        proxy.pattern = None
+                if proxy.pattern is None:
+                    proxy.pattern = re_path("^%s$" % proxy.endpoint.url.lstrip("/"), proxy.serve)
+
+            proxies[path] = proxy
+            patterns.append(proxy.pattern)
+
+        self._resources = resources
+        self._proxies = proxies
+        self.urlpatterns.swap(patterns)
+
+        logger.info("Loaded %s: rebuilt %d of %d endpoints", self.raml_filepath, len(self.rebuilt), len(patterns))
+
+    def start(self, interval=1.0):
+        """
+        Poll for changes in a background thread.
+        :param interval: seconds between polls.
+        :returns: returns nothing.
+        """
+
+        if self._thread is not None:
+            return
+
+        self._stopped.clear()
+
+        def poll():
+            while not self._stopped.wait(interval):
+                try:
+                    self.check()
+                except Exception:
+                    logger.exception("Error checking %s for changes", self.raml_filepath)
+
+        self._thread = threading.Thread(target=poll, name="ramlwrap-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop polling for changes, waiting for a check in progress to finish.
+        :returns: returns nothing.
+        """
+
+        thread = self._thread
+        if thread is None:
+            return
+
+        self._stopped.set()
+        thread.join()
+        self._thread = None
+
+
+class _EndpointProxy:
+    """
+    Serves the current endpoint of a url, so it can be replaced under a live url pattern.
+    """
+
+    __slots__ = ("endpoint", "pattern")
+
+    def __init__(self, endpoint):
+        """Initialisation function."""
+        self.endpoint = endpoint
+        self.pattern = None
+
+    @csrf_exempt
+    def serve(self, request, **dynamic_values):
+        return self.endpoint.serve(request, **dynamic_values)
+
+
+class _PatternList(list):
+    """
+    A list of url patterns that can be replaced while it is being resolved
+    against: iterating gives the patterns as they were when iteration started.
+    """
+
+    _snapshot = ()
+    reloader = None
+
+    def swap(self, patterns):
+        self._snapshot = tuple(patterns)
+        self[:] = patterns
+
+    def __iter__(self):
+        return iter(self._snapshot)
+
+
+def _resources(tree):
+    """
+    Walk the resources of a raml document, in the order raml_endpoints does.
+    :returns: iterator of (resource path, resource node, uriParameters inherited from its parents).
+    """
+
+    to_look_at = [("", tree, {})]
+    for path, node, uri_parameters in to_look_at:
+        if path:
+            yield path, node, uri_parameters
+        if node and node.get("uriParameters"):
+            uri_parameters = dict(uri_parameters, **node["uriParameters"])
+        for k in node or ():
+            if k.startswith("/") and node[k] is not None:
+                to_look_at.append(("%s%s" % (path, k), node[k], uri_parameters))
+
+
+def raml_reloading_url_patterns(raml_filepath, function_map, interval=None):
+    """
+    Url patterns for a raml file that follow changes to it, see the module docstring.
+    :param raml_filepath: the path to the raml file (not a file pointer)
+    :param function_map: a dictionary of urls to functions for mapping
+    :param interval: seconds between polls, defaults to the RAMLWRAP_HOT_RELOAD_INTERVAL setting.
+    :return: list with a single pattern to add to the django url patterns.
+    """
+
+    if interval is None:
+        interval = get_setting('RAMLWRAP_HOT_RELOAD_INTERVAL', 1.0)
+
+    reloader = HotReloader(raml_filepath, function_map)
+    reloader.start(interval)
+
+    return [re_path(r"^", include(reloader.urlpatterns))]
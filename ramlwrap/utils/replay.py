@@ -0,0 +1,389 @@
+"""
+Replay recorded traffic through the url patterns of a raml file.
+
+A request log is a JSONL file with one request per line:
+
+    {"method": "POST", "path": "/orders?page=2", "headers": {"Content-Type": "application/json"}, "body": "{...}"}
+
+("body_base64" can be used instead of "body" for binary bodies.) Each request
+is built with Django's RequestFactory and served in process by the patterns
+ramlwrap() generates, with no web server involved. The report gives per
+endpoint throughput, latency percentiles and status counts, plus the outcome
+of every request so two runs can be diffed:
+
+    report = Replayer("api.raml", function_map).replay(load_log("requests.jsonl"))
+    print(report.summary())
+
+    # Spec upgrade: replay the same traffic against both versions
+    differences = compare("api_v1.raml", "api_v2.raml", function_map, "requests.jsonl")
+
+    # Library upgrade: save the outcomes, upgrade ramlwrap, replay and diff
+    report.save_outcomes("before.jsonl")
+    diff_outcomes(load_outcomes("before.jsonl"), new_report.outcomes)
+
+replay_sharded splits a log across processes. From the command line (with
+DJANGO_SETTINGS_MODULE set, or default settings are used):
+
+    python -m ramlwrap.utils.replay api.raml requests.jsonl --function-map myapp.urls.function_map --processes 8
+"""
+import argparse
+import base64
+import json
+import logging
+import math
+import os
+import sys
+import time
+
+from multiprocessing import Pool
+
+from . core import _import_handler
+from . raml import raml_url_patterns
+
+logger = logging.getLogger(__name__)
+
+UNRESOLVED = "<unresolved>"
+
+# The replayer of the worker process, see _init_worker
+_worker_replayer = None
+
+
+class EndpointStats:
+    """
+    Request count, status counts and latencies of one endpoint.
+    """
+
+    __slots__ = ("requests", "statuses", "latencies")
+
+    def __init__(self):
+        """Initialisation function."""
+        self.requests = 0
+        self.statuses = {}
+        self.latencies = []
+
+    def add(self, status, latency):
+        self.requests += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.latencies.append(latency)
+
+    def merge(self, other):
+        self.requests += other.requests
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        self.latencies.extend(other.latencies)
+
+    def summary(self):
+        """
+        :returns: dict of the request count, status counts, throughput (requests per
+            second of serving time) and latency percentiles in milliseconds.
+        """
+
+        latencies = sorted(self.latencies)
+        total = sum(latencies)
+        return {
+            "requests": self.requests,
+            "statuses": self.statuses,
+            "throughput": self.requests / total if total else None,
+            "p50": _percentile(latencies, 50) * 1000,
+            "p90": _percentile(latencies, 90) * 1000,
+            "p99": _percentile(latencies, 99) * 1000,
+            "max": latencies[-1] * 1000 if latencies else 0.0,
+        }
+
+
+class ReplayReport:
+    """
+    The results of a replay: stats per endpoint and the outcome of each request.
+    Outcomes are (index, method, path, status, code) - code being the error code
+    in the body of a json error response (e.g. 'required') or the exception raised.
+    """
+
+    def __init__(self):
+        """Initialisation function."""
+        self.endpoints = {}
+        self.outcomes = []
+        self.elapsed = 0.0
+
+    def add(self, endpoint, outcome, latency):
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats()
+        stats.add(outcome[3], latency)
+        self.outcomes.append(outcome)
+
+    def merge(self, other):
+        """Merge in the report of another shard of the same log."""
+
+        for endpoint, stats in other.endpoints.items():
+            if endpoint in self.endpoints:
+                self.endpoints[endpoint].merge(stats)
+            else:
+                self.endpoints[endpoint] = stats
+        self.outcomes.extend(other.outcomes)
+        self.outcomes.sort(key=lambda outcome: outcome[0])
+        self.elapsed = max(self.elapsed, other.elapsed)
+
+    def summary(self):
+        """
+        :returns: dict of the overall request count, wall clock time and throughput,
+            and the summary of each endpoint (see EndpointStats.summary).
+        """
+
+        requests = len(self.outcomes)
+        return {
+            "requests": requests,
+            "elapsed": self.elapsed,
+            "throughput": requests / self.elapsed if self.elapsed else None,
+            "endpoints": dict((endpoint, stats.summary()) for endpoint, stats in sorted(self.endpoints.items())),
+        }
+
+    def save_outcomes(self, path):
+        """Write the outcomes to a JSONL file, for diff_outcomes after an upgrade."""
+
+        with open(path, "w") as f:
+            for outcome in self.outcomes:
+                f.write(json.dumps(outcome) + "\n")
+
+
+class Replayer:
+    """
+    Serves recorded requests with the url patterns ramlwrap() builds for a raml file.
+    """
+
+    def __init__(self, raml_filepath, function_map):
+        """
+        :param raml_filepath: the path to the raml file (not a file pointer)
+        :param function_map: a dictionary of urls to functions for mapping
+        """
+
+        from django.test.client import RequestFactory
+        from django.urls.resolvers import RegexPattern, URLResolver
+
+        self.resolver = URLResolver(RegexPattern(r"^/"), raml_url_patterns(raml_filepath, function_map))
+        self.factory = RequestFactory()
+
+    def replay(self, records, shard=0, shards=1):
+        """
+        Serve the recorded requests.
+        :param records: iterable of request dicts, see load_log.
+        :param shard: only serve the requests whose index modulo shards is shard.
+        :param shards: number of shards the log is split into.
+        :returns: a ReplayReport.
+        """
+
+        from django.urls import Resolver404
+
+        report = ReplayReport()
+        started = time.perf_counter()
+
+        for index, record in enumerate(records):
+            if index % shards != shard:
+                continue
+
+            request = self._build_request(record)
+
+            start = time.perf_counter()
+            try:
+                match = self.resolver.resolve(request.path_info)
+            except Resolver404:
+                endpoint, status, code = UNRESOLVED, 404, None
+            else:
+                endpoint = getattr(match.func, "__self__", None)
+                endpoint = endpoint.url if endpoint is not None else UNRESOLVED
+                try:
+                    response = match.func(request, *match.args, **match.kwargs)
+                except Exception as e:
+                    # With a real server this would be a 500
+                    status, code = 500, e.__class__.__name__
+                else:
+                    status, code = response.status_code, _error_code(response)
+            latency = time.perf_counter() - start
+
+            report.add(endpoint, (index, record["method"].upper(), record["path"], status, code), latency)
+
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def _build_request(self, record):
+        headers = record.get("headers") or {}
+        meta = {}
+        content_type = None
+        for name, value in headers.items():
+            key = name.upper().replace("-", "_")
+            if key == "CONTENT_TYPE":
+                content_type = value
+            elif key != "CONTENT_LENGTH":
+                meta["HTTP_" + key] = value
+
+        if "body_base64" in record:
+            body = base64.b64decode(record["body_base64"])
+        else:
+            body = (record.get("body") or "").encode("utf-8")
+
+        request = self.factory.generic(record["method"].upper(), record["path"], body,
+                                       content_type or "application/octet-stream", **meta)
+        if content_type is None:
+            request.META.pop("CONTENT_TYPE", None)
+        return request
+
+
+def load_log(path):
+    """
+    Read a JSONL request log, skipping blank lines.
+    :param path: path of the log.
+    :returns: iterator of request dicts with method, path, and optionally headers and body.
+    """
+
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_outcomes(path):
+    """Read the outcomes written by ReplayReport.save_outcomes."""
+
+    with open(path) as f:
+        return [tuple(json.loads(line)) for line in f if line.strip()]
+
+
+def diff_outcomes(outcomes_a, outcomes_b):
+    """
+    Compare the outcomes of two replays of the same log.
+    :returns: list of (index, method, path, (status a, code a), (status b, code b)) for each request
+        whose outcome differs.
+    """
+
+    outcomes_b = dict((tuple(outcome)[0], tuple(outcome)) for outcome in outcomes_b)
+    differences = []
+    for outcome_a in outcomes_a:
+        index, method, path, status, code = outcome_a
+        outcome_b = outcomes_b.get(index)
+        if outcome_b is None or (status, code) != outcome_b[3:]:
+            differences.append((index, method, path, (status, code), outcome_b[3:] if outcome_b else None))
+
+    return differences
+
+
+def compare(raml_filepath_a, raml_filepath_b, function_map, log_path):
+    """
+    Replay a log against two versions of a raml file.
+    :returns: list of differences, see diff_outcomes.
+    """
+
+    report_a = Replayer(raml_filepath_a, function_map).replay(load_log(log_path))
+    report_b = Replayer(raml_filepath_b, function_map).replay(load_log(log_path))
+    return diff_outcomes(report_a.outcomes, report_b.outcomes)
+
+
+def replay_sharded(raml_filepath, function_map, log_path, processes):
+    """
+    Replay a log across processes. Each process reads the log and serves every
+    processes'th request, so the shards get the same mix of endpoints.
+    :param raml_filepath: the path to the raml file (not a file pointer)
+    :param function_map: a dictionary of urls to functions, or its dotted path
+        (e.g. 'myapp.urls.function_map') for platforms that don't fork.
+    :param log_path: path of the JSONL request log.
+    :param processes: number of processes.
+    :returns: the merged ReplayReport.
+    """
+
+    started = time.perf_counter()
+
+    with Pool(processes, initializer=_init_worker, initargs=(raml_filepath, function_map)) as pool:
+        reports = pool.map(_replay_shard, [(log_path, shard, processes) for shard in range(processes)])
+
+    report = reports[0]
+    for other in reports[1:]:
+        report.merge(other)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def _init_worker(raml_filepath, function_map):
+    global _worker_replayer
+
+    _setup_django()
+    if isinstance(function_map, str):
+        function_map = _import_handler(function_map)
+    _worker_replayer = Replayer(raml_filepath, function_map)
+
+
+def _replay_shard(args):
+    log_path, shard, shards = args
+    return _worker_replayer.replay(load_log(log_path), shard, shards)
+
+
+def _error_code(response):
+    """The error code in a json error response body, e.g. 'required'."""
+
+    if response.status_code < 400 or response.streaming:
+        return None
+    try:
+        return json.loads(response.content.decode("utf-8")).get("code")
+    except Exception:
+        return None
+
+
+def _percentile(values, percent):
+    """Nearest rank percentile of sorted values."""
+
+    if not values:
+        return 0.0
+    rank = int(math.ceil(percent / 100.0 * len(values)))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+def _setup_django():
+    """Configure Django with default settings if the environment doesn't."""
+
+    import django
+    from django.conf import settings
+
+    if not settings.configured and not os.environ.get("DJANGO_SETTINGS_MODULE"):
+        settings.configure()
+    django.setup()
+
+
+def main(argv=None):
+    """Replay a request log, see the module docstring."""
+
+    parser = argparse.ArgumentParser(description="Replay a JSONL request log through the url patterns of a raml file.")
+    parser.add_argument("raml_file")
+    parser.add_argument("log", help="JSONL request log")
+    parser.add_argument("--function-map", default=None, help="dotted path of the function map, e.g. myapp.urls.function_map")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--compare", default=None, help="another raml file to replay the log against and diff with")
+    parser.add_argument("--baseline", default=None, help="outcomes saved by an earlier run to diff with")
+    parser.add_argument("--save-outcomes", default=None, help="file to save the outcomes to")
+    args = parser.parse_args(argv)
+
+    _setup_django()
+    function_map = _import_handler(args.function_map) if args.function_map else {}
+
+    if args.processes > 1:
+        report = replay_sharded(args.raml_file, args.function_map or {}, args.log, args.processes)
+    else:
+        report = Replayer(args.raml_file, function_map).replay(load_log(args.log))
+
+    sys.stdout.write(json.dumps(report.summary(), indent=2) + "\n")
+
+    if args.save_outcomes:
+        report.save_outcomes(args.save_outcomes)
+
+    differences = []
+    if args.compare:
+        other = Replayer(args.compare, function_map).replay(load_log(args.log))
+        differences = diff_outcomes(report.outcomes, other.outcomes)
+    elif args.baseline:
+        differences = diff_outcomes(load_outcomes(args.baseline), report.outcomes)
+
+    for difference in differences:
+        sys.stdout.write(json.dumps(difference) + "\n")
+
+    return 1 if differences else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Caching of GET responses in a Django cache backend.
+
+Turned on per endpoint with a (cache) annotation on the get method (or its
+resource) in the raml, or a 'cache' entry in the function map, which takes
+precedence (None turns a raml annotation off):
+
+    /reports/{report_id}:
+      get:
+        (cache):
+          ttl: 300
+          vary: [Accept-Language]
+
+    function_map = {'reports/{report_id}': {'function': report, 'cache': {'ttl': 300}}}
+
+A ttl on its own can be given as the value, e.g. `(cache): 300`. Responses are
+stored in the RAMLWRAP_RESPONSE_CACHE_ALIAS cache ('default' unless set, or
+'alias' in the annotation) under a key made of the resource path, the dynamic
+values, the query (the typed values of the declared queryParameters, or the
+whole query if none are declared) and the request headers named in vary. The
+Accept header is added to vary for endpoints that respond in more than one
+content type. Only 200 responses that set no cookies are stored.
+
+When a response isn't cached, only one request (across every process sharing
+the cache) calls the target while the others wait, for up to
+RAMLWRAP_RESPONSE_CACHE_LOCK_TIMEOUT seconds (default 10), for the response to
+be stored. Hits, misses, stores and waits are counted per endpoint, see
+cache_stats.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from . config import get_setting
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ramlwrap:response:"
+
+# How often a request waiting for another to store the response checks the cache
+LOCK_POLL_INTERVAL = 0.05
+
+# Stats per endpoint url, kept across hot reloads of the endpoint
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+class CacheStats:
+    """
+    Response cache counters of one endpoint.
+    """
+
+    __slots__ = ("hits", "misses", "stores", "waits")
+
+    def __init__(self):
+        """Initialisation function."""
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.waits = 0
+
+    def count(self, counter):
+        with _stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def to_dict(self):
+        return {"hits": self.hits, "misses": self.misses, "stores": self.stores, "waits": self.waits}
+
+
+class CachePolicy:
+    """
+    How the responses of one GET action are cached.
+    """
+
+    __slots__ = ("path", "ttl", "vary", "alias", "stats")
+
+    def __init__(self, path, ttl, vary=(), alias=None):
+        """
+        :param path: the resource path, part of every key.
+        :param ttl: seconds a response is cached for, None for the cache's default timeout.
+        :param vary: names of the request headers that are part of the key.
+        :param alias: the Django cache to use, defaults to the RAMLWRAP_RESPONSE_CACHE_ALIAS setting.
+        """
+
+        self.path = path
+        self.ttl = ttl
+        self.vary = tuple(vary)
+        self.alias = alias
+
+        with _stats_lock:
+            self.stats = _stats.setdefault(path, CacheStats())
+
+    def key(self, request, dynamic_values, query):
+        """
+        :param request: incoming core Request.
+        :param dynamic_values: dict of dynamic id names against their values.
+        :param query: the validated query, or None to key on the whole query.
+        :returns: the cache key of the response to a request.
+        """
+
+        if query is None:
+            query = dict((name, request.GET.getlist(name)) for name in request.GET)
+
+        parts = [self.path, dynamic_values or {}, query, [request.headers.get(name) for name in self.vary]]
+        digest = hashlib.blake2b(json.dumps(parts, sort_keys=True, default=str).encode("utf-8"), digest_size=16)
+        return KEY_PREFIX + digest.hexdigest()
+
+    def serve(self, key, compute):
+        """
+        Return the cached response, or compute and cache it.
+        :param key: the cache key, see key.
+        :param compute: function serving the request, returning a Django HttpResponse.
+        :returns: the HttpResponse.
+        """
+
+        from django.core.cache import caches
+        from django.core.cache.backends.base import DEFAULT_TIMEOUT
+        from django.utils.cache import patch_vary_headers
+
+        cache = caches[self.alias or get_setting('RAMLWRAP_RESPONSE_CACHE_ALIAS', 'default')]
+
+        cached = cache.get(key)
+        if cached is not None:
+            self.stats.count("hits")
+            return _from_cached(cached)
+
+        lock_timeout = get_setting('RAMLWRAP_RESPONSE_CACHE_LOCK_TIMEOUT', 10)
+        lock_key = key + ":lock"
+        if not cache.add(lock_key, 1, lock_timeout):
+            # Another request is computing it, wait for that rather than compute it again
+            self.stats.count("waits")
+            cached = _wait_for(cache, key, lock_key, lock_timeout)
+            if cached is not None:
+                self.stats.count("hits")
+                return _from_cached(cached)
+            lock_key = None
+
+        self.stats.count("misses")
+        try:
+            response = compute()
+            if self.vary:
+                patch_vary_headers(response, self.vary)
+            if _cacheable(response):
+                cache.set(key, _to_cached(response), DEFAULT_TIMEOUT if self.ttl is None else self.ttl)
+                self.stats.count("stores")
+        finally:
+            if lock_key is not None:
+                cache.delete(lock_key)
+
+        return response
+
+
+def compile_cache_policy(path, config, resp_content_types=()):
+    """
+    Build the cache policy of a GET action.
+    :param path: the resource path.
+    :param config: the (cache) annotation or function map entry: a ttl, or a dict with ttl, vary and alias.
+    :param resp_content_types: the content types the action responds with.
+    :returns: a CachePolicy, or None if caching is off.
+    """
+
+    if not config:
+        return None
+
+    if not isinstance(config, dict):
+        config = {"ttl": config}
+
+    vary = list(config.get("vary") or [])
+    if len(resp_content_types) > 1 and "accept" not in [name.lower() for name in vary]:
+        # The response is negotiated on the Accept header
+        vary.append("Accept")
+
+    ttl = config.get("ttl")
+    return CachePolicy(path, int(ttl) if ttl is not None else None, vary, config.get("alias"))
+
+
+def cache_stats():
+    """
+    :returns: dict of endpoint url to its hits, misses, stores and waits.
+    """
+
+    with _stats_lock:
+        return dict((path, stats.to_dict()) for path, stats in _stats.items())
+
+
+def reset_cache_stats():
+    """Zero the counters of every endpoint."""
+
+    with _stats_lock:
+        for stats in _stats.values():
+            stats.hits = stats.misses = stats.stores = stats.waits = 0
+
+
+def _wait_for(cache, key, lock_key, timeout):
+    """
+    Poll the cache for a key until it is set, the lock is released without
+    it being set (the response wasn't cacheable) or the timeout passes.
+    """
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        cached = cache.get(key)
+        if cached is not None or cache.get(lock_key) is None:
+            return cached
+    return None
+
+
+def _cacheable(response):
+    return response.status_code == 200 and not response.streaming and not response.cookies
+
+
+def _to_cached(response):
+    return response.status_code, response.content, list(response.items())
+
+
+def _from_cached(cached):
+    from django.http.response import HttpResponse
+
+    status_code, content, headers = cached
+    response = HttpResponse(content, status=status_code)
+    for header, value in headers:
+        response[header] = value
+    return response
@@ -0,0 +1,113 @@
+"""
+Url routing for endpoints, independent of any web framework.
+
+Literal urls are found with a dict lookup. Dynamic urls (those with a regex in
+them) are indexed by their first path segment when it is literal, so a path
+is only matched against the regexes that could serve it rather than all of
+them in turn.
+"""
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Characters that make an endpoint url a regex rather than a literal path
+_REGEX_CHARACTERS = set("()[]{}\\*+?|.^$")
+
+
+class Router:
+    """
+    Finds the endpoint serving a path.
+    """
+
+    def __init__(self):
+        """Initialisation function."""
+        self.static_routes = {}
+        self.dynamic_routes = []
+        self._indexed = {}
+        self._unindexed = []
+
+    @property
+    def endpoints(self):
+        """Every endpoint routed to, literal urls first."""
+
+        return list(self.static_routes.values()) + [endpoint for _, endpoint in self.dynamic_routes]
+
+    def add(self, endpoint):
+        """
+        Route to an endpoint. When two endpoints have the same literal url the
+        first one added is kept, as with Django url patterns.
+        :param endpoint: the Endpoint to add.
+        :returns: returns nothing.
+        """
+
+        url = _strip_slash(endpoint.url)
+        if not is_dynamic(url):
+            self.static_routes.setdefault(url, endpoint)
+            return
+
+        route = (re.compile("^%s$" % url), endpoint)
+        self.dynamic_routes.append(route)
+
+        segment = url.split("/", 1)[0]
+        if is_dynamic(segment):
+            self._unindexed.append(route)
+        else:
+            self._indexed.setdefault(segment, []).append(route)
+
+    def resolve(self, path):
+        """
+        Find the endpoint for a path.
+        :param path: request path, with or without the leading slash.
+        :returns: tuple of the endpoint (None if not found) and its dynamic values.
+        """
+
+        if path.startswith("/"):
+            path = path[1:]
+
+        endpoint = self.static_routes.get(path)
+        if endpoint is not None:
+            return endpoint, {}
+
+        for routes in (self._indexed.get(path.split("/", 1)[0], ()), self._unindexed):
+            for regex, endpoint in routes:
+                match = regex.match(path)
+                if match:
+                    return endpoint, match.groupdict()
+
+        return None, None
+
+    def overlaps(self, url):
+        """
+        Find the endpoints a url would clash with: one with the same url, a
+        dynamic url matching it, or (for a dynamic url) a literal url it matches.
+        :param url: the endpoint url, with or without the leading slash.
+        :returns: list of the endpoints already routed to that overlap.
+        """
+
+        url = _strip_slash(url)
+        found = []
+
+        if is_dynamic(url):
+            regex = re.compile("^%s$" % url)
+            found.extend(endpoint for existing, endpoint in self.dynamic_routes if existing.pattern == regex.pattern)
+            found.extend(endpoint for literal, endpoint in self.static_routes.items() if regex.match(literal))
+        else:
+            if url in self.static_routes:
+                found.append(self.static_routes[url])
+            found.extend(endpoint for regex, endpoint in self.dynamic_routes if regex.match(url))
+
+        return found
+
+
+def is_dynamic(url):
+    """
+    :param url: an endpoint url or part of one.
+    :returns: True if the url is a regex rather than a literal path.
+    """
+
+    return not _REGEX_CHARACTERS.isdisjoint(url)
+
+
+def _strip_slash(url):
+    return url[1:] if url.startswith("/") else url
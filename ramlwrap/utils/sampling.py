@@ -0,0 +1,202 @@
+"""
+Sampled validation of very large arrays in request bodies.
+
+Bulk endpoints fed by trusted producers can opt in to validating only a
+sample of the items of their large arrays, with a 'sampled_validation' entry
+in the function map:
+
+    function_map = {'bulk/records': {'function': import_records, 'sampled_validation': {'first': 1000, 'rate': 0.01}}}
+
+Everything but the items of the arrays (the envelope, and the array lengths
+and uniqueness) is validated in full, as are the first `first` items (default
+RAMLWRAP_SAMPLED_VALIDATION_FIRST, or 100) of each array. Of the rest, a
+random `rate` (default RAMLWRAP_SAMPLED_VALIDATION_RATE, or 0.01) are
+validated. `True` uses the settings.
+
+The arrays sampled are those whose schema is reached from the root through
+'properties' alone and has a single 'items' schema, e.g. the body itself or
+the 'records' of {"batch": ..., "records": [...]}. Anything else is validated
+in full. Targets are told what was sampled by request.validated_data_meta:
+
+    {"sampled": True, "arrays": {"$.records": {"length": 500000, "validated": 5990}}}
+"""
+import copy
+import logging
+import math
+import random
+
+from itertools import chain
+
+from . config import get_setting
+from . schemas import SchemaValidator, json_path, raise_errors
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIRST = 100
+DEFAULT_RATE = 0.01
+
+# Array keywords that evaluate the items along with the 'items' schema
+_WHOLE_ARRAY_KEYWORDS = ("additionalItems", "prefixItems", "contains", "unevaluatedItems")
+
+
+class SamplingPolicy:
+    """
+    How many of the items of the large arrays of one action are validated.
+    """
+
+    __slots__ = ("first", "rate")
+
+    def __init__(self, first=None, rate=None):
+        """
+        :param first: the number of items at the start of each array always validated.
+        :param rate: the fraction of the rest of the items validated, 0 to 1.
+        """
+
+        self.first = first
+        self.rate = rate
+
+
+def compile_sampling(config):
+    """
+    Build the sampling policy of an action.
+    :param config: the function map entry: True, False, or a dict with first and rate.
+    :raises ValueError: raised when first or rate is out of range.
+    :returns: a SamplingPolicy, or None if the action validates every item.
+    """
+
+    if not config:
+        return None
+    if not isinstance(config, dict):
+        config = {}
+
+    first = config.get("first")
+    if first is not None and int(first) < 0:
+        raise ValueError("sampled_validation first must not be negative: {}".format(first))
+
+    rate = config.get("rate")
+    if rate is not None and not 0 <= rate <= 1:
+        raise ValueError("sampled_validation rate must be between 0 and 1: {}".format(rate))
+
+    return SamplingPolicy(int(first) if first is not None else None, rate)
+
+
+class SampledValidator:
+    """
+    A SchemaValidator that only validates a sample of the items of large arrays.
+    """
+
+    __slots__ = ("validator", "policy", "arrays", "envelope")
+
+    def __init__(self, validator, policy):
+        """
+        Initialisation function.
+        :param validator: the SchemaValidator of the whole schema.
+        :param policy: the SamplingPolicy of the action.
+        """
+
+        self.validator = validator
+        self.policy = policy
+        # List of (keys leading to the array, schema route to its items, items schema)
+        self.arrays = _sampled_arrays(validator.schema)
+        self.envelope = SchemaValidator(_without_items(validator.schema, self.arrays)) if self.arrays else None
+
+    @property
+    def schema(self):
+        return self.validator.schema
+
+    def validate(self, data, max_errors=None):
+        """
+        Validate data against the schema, sampling the items of its large arrays.
+        :param data: decoded request data.
+        :param max_errors: the number of errors to collect, None for the best matching one.
+        :raises ValidationError: raised as by SchemaValidator.validate if the data is invalid.
+        :returns: dict of json path of each sampled array to its length and the number of its items validated,
+            empty if every item was validated.
+        """
+
+        first, rate = self._limits()
+        samples = []
+        for keys, route, items_schema in self.arrays:
+            items = _find(data, keys)
+            if isinstance(items, list) and len(items) > first and rate < 1:
+                samples.append((keys, route, items_schema, items, _sample_indexes(len(items), first, rate)))
+
+        if not samples:
+            self.validator.validate(data, max_errors)
+            return {}
+
+        errors = chain(self.envelope.validator.iter_errors(data), self._item_errors(samples))
+        raise_errors(errors, max_errors)
+
+        return dict((json_path(keys), {"length": len(items), "validated": len(indexes)})
+                    for keys, _, _, items, indexes in samples)
+
+    def _limits(self):
+        first = self.policy.first
+        if first is None:
+            first = get_setting('RAMLWRAP_SAMPLED_VALIDATION_FIRST', DEFAULT_FIRST)
+        rate = self.policy.rate
+        if rate is None:
+            rate = get_setting('RAMLWRAP_SAMPLED_VALIDATION_RATE', DEFAULT_RATE)
+        return first, rate
+
+    def _item_errors(self, samples):
+        # Validated against the root validator so $refs in the items resolve as they would in full
+        validator = self.validator.validator
+        for keys, route, items_schema, items, indexes in samples:
+            for index in indexes:
+                for error in validator.descend(items[index], items_schema, path=index):
+                    error.path.extendleft(reversed(keys))
+                    error.schema_path.extendleft(reversed(route))
+                    yield error
+
+
+def _sampled_arrays(schema, keys=(), route=()):
+    """
+    Find the arrays of a schema whose items can be sampled.
+    :returns: list of (keys leading to the array, schema route to its items, items schema).
+    """
+
+    if not isinstance(schema, dict) or "$ref" in schema:
+        return []
+
+    arrays = []
+    items = schema.get("items")
+    if isinstance(items, (dict, bool)) and not any(keyword in schema for keyword in _WHOLE_ARRAY_KEYWORDS):
+        arrays.append((keys, route + ("items",), items))
+
+    properties = schema.get("properties")
+    if isinstance(properties, dict):
+        for key, subschema in properties.items():
+            arrays.extend(_sampled_arrays(subschema, keys + (key,), route + ("properties", key)))
+    return arrays
+
+
+def _without_items(schema, arrays):
+    """A copy of the schema with the items schema of each sampled array removed."""
+
+    schema = copy.deepcopy(schema)
+    for _, route, _ in arrays:
+        node = schema
+        for part in route[:-1]:
+            node = node[part]
+        del node[route[-1]]
+    return schema
+
+
+def _find(data, keys):
+    for key in keys:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _sample_indexes(length, first, rate):
+    """
+    :returns: sorted list of the indexes of the items validated, the first ones and a random sample of the rest.
+    """
+
+    rest = range(first, length)
+    size = int(math.ceil(len(rest) * rate))
+    return list(range(first)) + sorted(random.sample(rest, size))
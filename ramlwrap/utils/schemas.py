@@ -0,0 +1,170 @@
+"""
+Compiled json schema validators.
+
+The raml schemas are turned into validator objects once, when the raml is
+loaded, instead of jsonschema.validate() re-checking the schema and building
+a new validator on every request. Where it can be, a schema is also compiled
+to python source that checks valid data without jsonschema, see codegen.py.
+That happens when the validator is built, so it is done while the raml is
+loaded (once, in the master of a pre-forking server that preloads) and never
+inside a request.
+
+By default invalid data raises the single best matching error. Given
+max_errors, validate() raises ValidationErrors with the first max_errors
+errors instead: 1 fails fast (the cheapest, validation stops at the first
+error), more lets clients fix several problems in one round trip without
+paying for every error of a huge invalid body.
+"""
+import json
+import logging
+import weakref
+
+from itertools import islice
+
+from jsonschema.exceptions import SchemaError, ValidationError, best_match
+from jsonschema.validators import validator_for
+
+from . codegen import compile_validator
+from . config import get_setting
+
+logger = logging.getLogger(__name__)
+
+# Identical schemas (e.g. one file included in many places) share a validator
+_validators = weakref.WeakValueDictionary()
+
+
+class ValidationErrors(ValidationError):
+    """
+    The errors collected validating data, raised as the first of them so
+    handlers expecting a single ValidationError keep working.
+    """
+
+    def __init__(self, errors):
+        """
+        Initialisation function.
+        :param errors: list of the ValidationErrors, in the order they were found.
+        """
+
+        first = errors[0]
+        super(ValidationErrors, self).__init__(
+            first.message, validator=first.validator, path=first.absolute_path, cause=first.cause,
+            context=first.context, validator_value=first.validator_value, instance=first.instance,
+            schema=first.schema, schema_path=first.absolute_schema_path)
+        self.errors = errors
+
+
+class SchemaValidator:
+    """
+    A json schema compiled into a jsonschema validator. Raises the same
+    (best match) ValidationError as jsonschema.validate. `check` is the
+    generated function checking data is valid, None if the schema is left
+    to jsonschema.
+    """
+
+    __slots__ = ("schema", "validator", "check", "__weakref__")
+
+    def __init__(self, schema):
+        """Initialisation function."""
+
+        cls = validator_for(schema)
+        check = None
+        try:
+            cls.check_schema(schema)
+        except SchemaError as e:
+            logger.error("Invalid json schema, requests will be validated against it as is: %s", e.message)
+        else:
+            if get_setting('RAMLWRAP_GENERATED_VALIDATORS', True):
+                check = compile_validator(schema, cls)
+
+        self.schema = schema
+        self.validator = cls(schema)
+        self.check = check
+
+    def validate(self, data, max_errors=None):
+        """
+        Validate data against the schema.
+        :param data: decoded request data.
+        :param max_errors: the number of errors to collect, None for the best matching one.
+        :raises ValidationError: raised with the best matching error if the data is invalid.
+        :raises ValidationErrors: raised instead with up to max_errors errors, if given.
+        :returns: returns nothing.
+        """
+
+        check = self.check
+        if check is not None and check(data):
+            return
+
+        raise_errors(self.validator.iter_errors(data), max_errors)
+
+
+def raise_errors(errors, max_errors=None):
+    """
+    Raise the errors found validating some data, as SchemaValidator.validate does.
+    :param errors: iterator of ValidationErrors, e.g. from iter_errors.
+    :param max_errors: the number of errors to collect, None for the best matching one.
+    :raises ValidationError: raised with the best matching error if there are any.
+    :raises ValidationErrors: raised instead with up to max_errors errors, if given.
+    :returns: returns nothing.
+    """
+
+    if max_errors:
+        errors = list(islice(errors, max_errors))
+        if errors:
+            raise ValidationErrors(errors)
+        return
+
+    error = best_match(errors)
+    if error is not None:
+        raise error
+
+
+def compile_schema(schema):
+    """
+    Compile a raml schema into a validator.
+    :param schema: the schema as a dict, or a string of json.
+    :returns: a SchemaValidator, or None if the schema is not a json schema (e.g. xml).
+    """
+
+    if isinstance(schema, str):
+        try:
+            schema = json.loads(schema)
+        except ValueError:
+            return None
+
+    if not isinstance(schema, dict):
+        return None
+
+    try:
+        key = json.dumps(schema, sort_keys=True)
+    except (TypeError, ValueError):
+        return SchemaValidator(schema)
+
+    validator = _validators.get(key)
+    if validator is None:
+        validator = _validators[key] = SchemaValidator(schema)
+    return validator
+
+
+def error_path(error):
+    """
+    Where in the data a validation error is.
+    :param error: a jsonschema ValidationError.
+    :returns: the location as a json path, e.g. '$.items[0].name' ('$' for the whole document).
+    """
+
+    return json_path(error.absolute_path)
+
+
+def json_path(parts):
+    """
+    :param parts: the keys and indexes leading to a place in some data.
+    :returns: the place as a json path, e.g. '$.items[0].name' ('$' for the whole document).
+    """
+
+    path = "$"
+    for part in parts:
+        if isinstance(part, int):
+            path += "[%d]" % part
+        else:
+            path += ".%s" % part
+    return path
@@ -0,0 +1,198 @@
+"""
+Streaming responses from iterator and generator targets.
+
+A target can return an iterator (e.g. a generator) of items rather than the
+whole response data:
+
+    def export(request):
+        for row in Order.objects.iterator():
+            yield {"id": row.id, "total": str(row.total)}
+
+The items are encoded one at a time and sent in chunks of about
+RAMLWRAP_STREAM_CHUNK_SIZE bytes (default 64KiB), so memory use is bounded by
+the chunk size rather than the size of the response. They are sent as
+newline delimited json when the raml declares application/x-ndjson for the
+200 response and the client accepts it, and as a json array otherwise.
+
+Async generators are streamed by the ASGI entry point of RamlApplication (and
+by Django's StreamingHttpResponse under ASGI); the WSGI entry point runs them
+on an event loop of its own.
+"""
+import asyncio
+import inspect
+import json
+
+from collections.abc import Iterator
+
+from . decoders import normalise_media_type
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+JSON_ARRAY = "application/json"
+NDJSON = "application/x-ndjson"
+
+_formats = {}
+
+
+class StreamFormat:
+    """
+    How a stream of items is framed: the bytes before the first item, between
+    items and after the last one, and the encoder of each item.
+    """
+
+    __slots__ = ("start", "separator", "end", "encode_item", "empty")
+
+    def __init__(self, start, separator, end, encode_item, empty=None):
+        """
+        :param empty: what an empty stream is sent as, defaults to start and end.
+        """
+        self.start = start
+        self.separator = separator
+        self.end = end
+        self.encode_item = encode_item
+        self.empty = start + end if empty is None else empty
+
+
+def register_stream_format(media_type, stream_format):
+    """
+    Register how items are streamed in a media type, replacing any existing format.
+    :param media_type: e.g. 'application/x-ndjson'.
+    :param stream_format: a StreamFormat.
+    :returns: returns nothing.
+    """
+
+    _formats[normalise_media_type(media_type)] = stream_format
+
+
+def stream_formats(content_types):
+    """
+    :param content_types: the media types an action responds with.
+    :returns: list of (media type, StreamFormat) for those that can be streamed,
+        a json array if none can.
+    """
+
+    offered = [(content_type, _formats[content_type]) for content_type in content_types if content_type in _formats]
+    return offered or [(JSON_ARRAY, _formats[JSON_ARRAY])]
+
+
+def is_stream(result):
+    """:returns: True if a target result is an iterator of items to stream."""
+
+    return isinstance(result, Iterator) or inspect.isasyncgen(result)
+
+
+def encode_stream(items, stream_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encode an iterator of items in chunks.
+    :param items: iterator of items.
+    :param stream_format: the StreamFormat to frame them with.
+    :param chunk_size: chunks are yielded once they reach this many bytes.
+    :returns: generator of byte chunks.
+    """
+
+    buffer = _ChunkBuffer(stream_format, chunk_size)
+    try:
+        for item in items:
+            chunk = buffer.add(item)
+            if chunk:
+                yield chunk
+        yield buffer.finish()
+    finally:
+        close = getattr(items, "close", None)
+        if close is not None:
+            close()
+
+
+async def aencode_stream(items, stream_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encode an async iterator of items in chunks, see encode_stream.
+    :returns: async generator of byte chunks.
+    """
+
+    buffer = _ChunkBuffer(stream_format, chunk_size)
+    try:
+        async for item in items:
+            chunk = buffer.add(item)
+            if chunk:
+                yield chunk
+        yield buffer.finish()
+    finally:
+        aclose = getattr(items, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def iterate_async(async_iterator):
+    """
+    Iterate an async iterator from synchronous code, on an event loop of its own.
+    :param async_iterator: e.g. an async generator.
+    :returns: generator of its items.
+    """
+
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(async_iterator.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        try:
+            loop.run_until_complete(async_iterator.aclose())
+        except AttributeError:
+            pass
+        loop.close()
+
+
+class _ChunkBuffer:
+    """
+    Collects encoded items until there is a chunk's worth.
+    """
+
+    __slots__ = ("stream_format", "chunk_size", "parts", "size", "count")
+
+    def __init__(self, stream_format, chunk_size):
+        """Initialisation function."""
+        self.stream_format = stream_format
+        self.chunk_size = chunk_size
+        self.parts = [stream_format.start]
+        self.size = len(stream_format.start)
+        self.count = 0
+
+    def add(self, item):
+        """:returns: a chunk to send, or None if the buffer isn't full yet."""
+
+        if self.count:
+            self.parts.append(self.stream_format.separator)
+            self.size += len(self.stream_format.separator)
+
+        encoded = self.stream_format.encode_item(item)
+        self.parts.append(encoded)
+        self.size += len(encoded)
+        self.count += 1
+
+        if self.size < self.chunk_size:
+            return None
+        return self._flush()
+
+    def finish(self):
+        """:returns: the last chunk."""
+
+        if not self.count:
+            return self.stream_format.empty
+        self.parts.append(self.stream_format.end)
+        return self._flush()
+
+    def _flush(self):
+        chunk = b"".join(self.parts)
+        self.parts = []
+        self.size = 0
+        return chunk
+
+
+def _encode_json_item(item):
+    return json.dumps(item).encode("utf-8")
+
+
+register_stream_format(JSON_ARRAY, StreamFormat(b"[", b",", b"]", _encode_json_item))
+register_stream_format(NDJSON, StreamFormat(b"", b"\n", b"\n", _encode_json_item, empty=b""))
@@ -0,0 +1,210 @@
+"""
+Aggregated telemetry of request validation failures.
+
+Rather than a log line for every request that fails validation, failures are
+counted in memory by endpoint, method, validator keyword (e.g. 'required') and
+json path, keeping the first few messages of each as samples. The counts are
+reported every RAMLWRAP_VALIDATION_TELEMETRY_INTERVAL seconds (default 60,
+checked as failures are recorded; None to only report on flush), on
+flush_validation_failures() and when the process exits: one log line per key,
+or a list of dicts passed to the RAMLWRAP_VALIDATION_TELEMETRY_HANDLER function
+(given as its full dotted path) instead if that is set:
+
+    [{"resource": "orders/{order_id}", "method": "POST", "validator": "required",
+      "path": "$.items[0]", "count": 120, "samples": ["'sku' is a required property"]}]
+
+A misbehaving client then costs a dict lookup per failure instead of
+formatting and writing a log line.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from . config import get_setting
+from . schemas import error_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 60
+
+# Messages kept per key
+MAX_SAMPLES = 3
+
+# Keys counted between reports, failures with other keys are counted together as dropped
+MAX_KEYS = 1000
+
+
+class FailureCount:
+    """
+    The failures of one endpoint, method, validator and path since the last report.
+    """
+
+    __slots__ = ("count", "samples")
+
+    def __init__(self):
+        """Initialisation function."""
+        self.count = 0
+        self.samples = []
+
+
+class FailureAggregator:
+    """
+    Counts validation failures between reports.
+    """
+
+    def __init__(self, max_samples=MAX_SAMPLES, max_keys=MAX_KEYS):
+        """
+        :param max_samples: messages kept per key.
+        :param max_keys: keys counted between reports.
+        """
+
+        self.max_samples = max_samples
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._dropped = 0
+        self._last_report = time.monotonic()
+
+    def record(self, resource, method, validator, path, message):
+        """
+        Count a failure, reporting the counts so far if the interval has passed.
+        :param resource: the raml resource path of the endpoint.
+        :param method: the http method.
+        :param validator: the validator keyword that failed, e.g. 'required'.
+        :param path: json path of the failure in the body, see schemas.error_path.
+        :param message: the error message, kept if there are fewer than max_samples for the key.
+        :returns: returns nothing.
+        """
+
+        key = (resource, method, validator, path)
+        now = time.monotonic()
+        with self._lock:
+            failure = self._failures.get(key)
+            if failure is None:
+                if len(self._failures) >= self.max_keys:
+                    self._dropped += 1
+                    return
+                failure = self._failures[key] = FailureCount()
+            failure.count += 1
+            if len(failure.samples) < self.max_samples:
+                failure.samples.append(message)
+
+            interval = get_setting('RAMLWRAP_VALIDATION_TELEMETRY_INTERVAL', DEFAULT_INTERVAL)
+            due = interval is not None and now - self._last_report >= interval
+
+        if due:
+            self.flush()
+
+    def snapshot(self):
+        """
+        :returns: the failures since the last report, as a list of dicts, without resetting them.
+        """
+
+        with self._lock:
+            return _report(self._failures)
+
+    def flush(self):
+        """
+        Report the failures since the last report and start counting again.
+        :returns: the report, see snapshot.
+        """
+
+        with self._lock:
+            failures, self._failures = self._failures, {}
+            dropped, self._dropped = self._dropped, 0
+            self._last_report = time.monotonic()
+
+        report = _report(failures)
+        if not report and not dropped:
+            return report
+
+        handler_full_path = get_setting('RAMLWRAP_VALIDATION_TELEMETRY_HANDLER')
+        if handler_full_path:
+            from . core import _import_handler
+            try:
+                _import_handler(handler_full_path)(report)
+            except Exception:
+                logger.exception("RAMLWRAP_VALIDATION_TELEMETRY_HANDLER raised an exception")
+        else:
+            for failure in report:
+                logger.info("Validation failed %d times for [%s] %s: [%s] at %s, e.g. %s", failure["count"],
+                            failure["method"], failure["resource"], failure["validator"], failure["path"],
+                            failure["samples"][0])
+
+        if dropped:
+            logger.warning("%d validation failures were not counted, more than %d kinds were seen",
+                           dropped, self.max_keys)
+
+        return report
+
+    def reset(self):
+        """Forget the failures since the last report without reporting them."""
+
+        with self._lock:
+            self._failures = {}
+            self._dropped = 0
+            self._last_report = time.monotonic()
+
+
+_aggregator = FailureAggregator()
+
+# Whether the failures are flushed at exit, registered with the first failure rather than on import
+_flush_at_exit = False
+
+
+def record_validation_failure(action, error):
+    """
+    Count a request that failed validation.
+    :param action: the action validating the request, None if not known.
+    :param error: the ValidationError.
+    :returns: returns nothing.
+    """
+
+    global _flush_at_exit
+    if not _flush_at_exit:
+        # Two threads may both register it, the second flush then has nothing to report
+        _flush_at_exit = True
+        atexit.register(flush_validation_failures)
+
+    resource = action.resource if action is not None else None
+    method = action.method if action is not None else None
+    _aggregator.record(resource, method, error.validator, error_path(error), error.message)
+
+
+def validation_failures():
+    """
+    :returns: the failures since the last report, see FailureAggregator.snapshot.
+    """
+
+    return _aggregator.snapshot()
+
+
+def flush_validation_failures():
+    """
+    Report the failures since the last report now, see FailureAggregator.flush.
+    :returns: the report.
+    """
+
+    return _aggregator.flush()
+
+
+def reset_validation_failures():
+    """Forget the failures since the last report without reporting them."""
+
+    _aggregator.reset()
+
+
+def _report(failures):
+    report = []
+    for (resource, method, validator, path), failure in failures.items():
+        report.append({
+            "resource": resource,
+            "method": method,
+            "validator": validator,
+            "path": path,
+            "count": failure.count,
+            "samples": list(failure.samples),
+        })
+    report.sort(key=lambda failure: failure["count"], reverse=True)
+    return report
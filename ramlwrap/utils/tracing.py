@@ -0,0 +1,196 @@
+"""
+Tracing of the phases ramlwrap serves a request in.
+
+Each request an endpoint serves gets a "ramlwrap.request" span, with a child
+span for each phase of serving it:
+
+    ramlwrap.query      validating the query parameters
+    ramlwrap.decode     decoding the request body
+    ramlwrap.validate   validating the decoded body against its schema
+    ramlwrap.target     calling the target (or generating the example)
+    ramlwrap.render     encoding what the target returned
+
+The request span has the attributes ramlwrap.resource (the raml resource
+path), http.request.method, http.request.body.size, ramlwrap.validation
+('valid' or 'invalid') and http.response.status_code.
+
+Tracing is off (and costs a no-op context manager per phase) until a tracer
+is set, e.g. at start up:
+
+    from ramlwrap.utils.tracing import OpenTelemetryTracer, set_tracer
+    set_tracer(OpenTelemetryTracer())
+
+OpenTelemetryTracer adds the spans to the traces of the opentelemetry api
+(pip install ramlwrap[opentelemetry]), under the span current when the
+request arrives. InMemoryTracer keeps them in a list, for tests. Any object
+with the methods of NoopTracer can be set.
+"""
+import contextvars
+import threading
+import time
+
+# The span of the InMemoryTracer that is current in this thread or task
+_current_span = contextvars.ContextVar("ramlwrap_current_span", default=None)
+
+
+class _NoopSpan:
+    """
+    A span that records nothing.
+    """
+
+    __slots__ = ()
+
+    def set_attribute(self, name, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class NoopTracer:
+    """
+    The tracer used until one is set, and the interface a tracer implements.
+    """
+
+    def span(self, name, attributes=None):
+        """
+        Start a span, a child of the current one.
+        :param name: the span name, e.g. 'ramlwrap.query'.
+        :param attributes: dict of attribute name to value.
+        :returns: a context manager of the span, ended when it exits.
+        """
+
+        return _NOOP_SPAN
+
+    def current_span(self):
+        """
+        :returns: the current span, for attributes only known part way through it.
+        """
+
+        return _NOOP_SPAN
+
+
+class RecordedSpan:
+    """
+    A span kept by the InMemoryTracer.
+    """
+
+    __slots__ = ("name", "attributes", "parent", "start_time", "end_time", "error", "_tracer", "_token")
+
+    def __init__(self, tracer, name, attributes=None, parent=None):
+        """Initialisation function."""
+        self.name = name
+        self.attributes = dict(attributes) if attributes else {}
+        self.parent = parent
+        self.start_time = None
+        self.end_time = None
+        self.error = None
+        self._tracer = tracer
+        self._token = None
+
+    @property
+    def duration(self):
+        """:returns: seconds from the start to the end of the span."""
+
+        return self.end_time - self.start_time
+
+    def set_attribute(self, name, value):
+        self.attributes[name] = value
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.end_time = time.perf_counter()
+        self.error = exc
+        _current_span.reset(self._token)
+        self._tracer._finish(self)
+        return False
+
+
+class InMemoryTracer(NoopTracer):
+    """
+    Keeps the spans it ends in a list, for tests.
+    """
+
+    def __init__(self):
+        """Initialisation function."""
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def span(self, name, attributes=None):
+        return RecordedSpan(self, name, attributes, _current_span.get())
+
+    def current_span(self):
+        span = _current_span.get()
+        return span if span is not None else _NOOP_SPAN
+
+    def finished(self, name=None):
+        """
+        :param name: only return the spans of this name.
+        :returns: list of the ended spans, in the order they ended.
+        """
+
+        with self._lock:
+            return [span for span in self.spans if name is None or span.name == name]
+
+    def clear(self):
+        """Forget the spans ended so far."""
+
+        with self._lock:
+            del self.spans[:]
+
+    def _finish(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+
+class OpenTelemetryTracer(NoopTracer):
+    """
+    Adds the spans to the traces of the opentelemetry api.
+    """
+
+    def __init__(self, tracer=None):
+        """
+        :param tracer: an opentelemetry Tracer, defaults to the one the global
+            tracer provider gives ramlwrap.
+        """
+
+        from opentelemetry import trace
+
+        self._trace = trace
+        self.tracer = tracer if tracer is not None else trace.get_tracer("ramlwrap")
+
+    def span(self, name, attributes=None):
+        return self.tracer.start_as_current_span(name, attributes=attributes)
+
+    def current_span(self):
+        return self._trace.get_current_span()
+
+
+_tracer = NoopTracer()
+
+
+def set_tracer(tracer):
+    """
+    Set the tracer the spans of every request are started with.
+    :param tracer: e.g. an OpenTelemetryTracer, None to stop tracing.
+    :returns: returns nothing.
+    """
+
+    global _tracer
+    _tracer = tracer if tracer is not None else NoopTracer()
+
+
+def get_tracer():
+    """:returns: the tracer set with set_tracer, a NoopTracer if none is."""
+
+    return _tracer
@@ -0,0 +1,107 @@
+"""
+Url matchers for the uriParameters a raml resource declares.
+
+Rather than a regex for each {placeholder} in the function map, a resource can
+declare its uri parameters and have ramlwrap build the regex:
+
+    /orders/{order_id}:
+      uriParameters:
+        order_id:
+          type: integer
+
+serves /orders/42 (and not /orders/abc) with order_id=42 passed to the target
+as an int. The type (integer, number, boolean or string), pattern, enum and
+minLength/maxLength of a declaration are all compiled into the regex, so a
+url that doesn't match them is never routed to the endpoint. Declarations are
+inherited by child resources, and a regex given in the function map still
+takes precedence (its value is then passed on as a string, as before).
+"""
+import logging
+import re
+
+from . query import get_converter
+
+logger = logging.getLogger(__name__)
+
+# A path segment, what a string parameter matches by default
+_SEGMENT = "[^/]+"
+
+_TYPE_PATTERNS = {
+    "integer": "-?[0-9]+",
+    "number": "-?[0-9]+(?:\\.[0-9]+)?",
+    "boolean": "true|false",
+}
+
+
+def uri_parameter_regex(name, declaration):
+    """
+    Build the regex matching a uri parameter.
+    :param name: name of the parameter, as in the {placeholder}.
+    :param declaration: its raml declaration (type, pattern, enum, minLength, maxLength).
+    :returns: a named group regex, e.g. '(?P<order_id>-?[0-9]+)'.
+    """
+
+    declaration = declaration or {}
+    type_name = declaration.get("type") or "string"
+
+    if declaration.get("enum"):
+        pattern = "|".join(re.escape(str(value)) for value in declaration["enum"])
+    elif type_name in _TYPE_PATTERNS:
+        pattern = _TYPE_PATTERNS[type_name]
+    elif declaration.get("pattern"):
+        pattern = _unanchored(str(declaration["pattern"]))
+    else:
+        pattern = _SEGMENT
+
+    min_length = declaration.get("minLength")
+    max_length = declaration.get("maxLength")
+    if min_length is not None or max_length is not None:
+        if pattern == _SEGMENT:
+            pattern = "[^/]{%d,%s}" % (min_length or 0, "" if max_length is None else max_length)
+        else:
+            # The length of the whole segment, whatever the pattern matches it with
+            pattern = "(?=[^/]{%d,%s}(?![^/]))(?:%s)" % (min_length or 0, "" if max_length is None else max_length,
+                                                         pattern)
+
+    return "(?P<%s>%s)" % (name, pattern)
+
+
+def compile_uri_parameters(path, declarations, regex_dict=None):
+    """
+    Build the regexes and converters of the uri parameters used in a resource path.
+    :param path: the resource path, e.g. 'orders/{order_id}'.
+    :param declarations: dict of uri parameter name to its raml declaration.
+    :param regex_dict: regexes from the function map, these parameters are left to it.
+    :returns: tuple of a dict of name to regex (for Endpoint.parse_regex) and a dict
+        of name to the function converting its value to the declared type.
+    """
+
+    regexes = {}
+    converters = {}
+    for name, declaration in (declarations or {}).items():
+        if "{%s}" % name not in path or (regex_dict and name in regex_dict):
+            continue
+
+        try:
+            regex = uri_parameter_regex(name, declaration)
+            re.compile(regex)
+        except (re.error, TypeError, ValueError) as e:
+            logger.error("Could not build a regex for uri parameter [%s] of [%s]: %s", name, path, e)
+            continue
+
+        regexes[name] = regex
+        type_name = (declaration or {}).get("type") or "string"
+        if type_name in _TYPE_PATTERNS:
+            converters[name] = get_converter(type_name)
+
+    return regexes, converters
+
+
+def _unanchored(pattern):
+    """Strip the ^ and $ a raml pattern (matching the whole value) may start and end with."""
+
+    if pattern.startswith("^"):
+        pattern = pattern[1:]
+    if pattern.endswith("$") and not pattern.endswith("\\$"):
+        pattern = pattern[:-1]
+    return pattern
@@ -1,65 +1,28 @@
-"""Validation functionality."""
-import importlib
-import inspect
-import json
-import logging
-import sys
+"""
+Validation functionality - the Django adapter for the engine in core.py.
 
-from jsonschema import validate
-from jsonschema.exceptions import ValidationError
+Django requests are wrapped in a core Request (the HttpRequest itself is still
+what targets receive) and core Responses are turned into HttpResponses.
+"""
+import logging
 
-from django.conf import settings
-from django.http.response import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.http.response import HttpResponse, HttpResponseBase, HttpResponseNotAllowed, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 
-from . exceptions import FatalException, UnsupportedMediaTypeException
+from . import core
+from . core import Action, ContentType, Request, Response, _validate_query_params
+from . exceptions import RequestEntityTooLargeException
+from . tracing import get_tracer
 
 logger = logging.getLogger(__name__)
 
 
-class ContentType:
-    """Represents http content types."""
-    JSON = 'application/json'
-
-    def __init__(self):
-        """Initialisation function."""
-        pass
-
-
-class Endpoint:
+class Endpoint(core.Endpoint):
     """
-    Endpoint that represents one url in the service. Each endpoint
-    contains Actions which represent a request method that the endpoint
-    supports.
+    Endpoint that represents one url in the service, served by Django.
     """
 
-    url = None
-    request_method_mapping = None
-
-    def __init__(self, url):
-        """Initialisation function."""
-        self.url = url
-        self.request_method_mapping = {}
-
-    def parse_regex(self, regex_dict):
-        """
-        Replace dynamic template in url with corresponding regex for a dynamic value
-        :param regex_dict: dictionary of dynamic id names to regex
-        e.g. {'dynamic_id': '(?P<dynamic_id>[a-zA-Z]+)'}
-        """
-
-        for regex_key, regex in regex_dict.items():
-            string_to_replace = "{%s}" % regex_key
-            self.url = self.url.replace(string_to_replace, regex)
-
-    def add_action(self, request_method, action):
-        """Add an action mapping for the given request method type.
-        :param request_method: http method type to map the action to.
-        :param action: the action to map to the request.
-        :returns: returns nothing.
-        """
-
-        self.request_method_mapping[request_method] = action
+    __slots__ = ()
 
     @csrf_exempt
     def serve(self, request, **dynamic_values):
@@ -71,91 +34,105 @@ class Endpoint:
         :returns: returns the HttpResponse, content of which is created by the target function.
         """
 
-        if request.method in self.request_method_mapping:
-            action = self.request_method_mapping[request.method]
-            response = _validate_api(request, action, dynamic_values)
-        else:
-            response = HttpResponseNotAllowed(self.request_method_mapping.keys())
+        action = self.request_method_mapping.get(request.method)
+        attributes = core._request_span_attributes(self, action, request.method)
+        with get_tracer().span("ramlwrap.request", attributes) as span:
+            if action is not None:
+                response = _validate_api(request, action, self.convert_dynamic_values(dynamic_values))
+            else:
+                response = HttpResponseNotAllowed(self.request_method_mapping.keys())
 
-        if isinstance(response, HttpResponse):
-            return response
-        else:
-            return HttpResponse(response)
+            if not isinstance(response, HttpResponseBase):
+                response = HttpResponse(response)
+            span.set_attribute("http.response.status_code", response.status_code)
 
+        return response
 
-class Action:
+
+def _core_request(request):
     """
-    Maps out the api definition associated with the parent Endpoint.
-    One of these will be created per http request method type.
+    Wrap a Django HttpRequest in a core Request. The body is only read
+    when the core asks for it.
+    :param request: incoming Django http request.
+    :returns: a core Request whose native request is the HttpRequest.
     """
 
-    example = None
-    schema = None
-    target = None
-    query_parameter_checks = None
-    resp_content_type = None
-    requ_content_type = None
-    regex = None
+    try:
+        # Grab the content-type coming in from the request
+        if "headers" in request.META:
+            content_type = request.META["headers"]["content-type"]
+        else:
+            content_type = request.META["CONTENT_TYPE"]
+    except Exception:
+        content_type = None
+
+    try:
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0) or None
+    except ValueError:
+        content_length = None
 
-    def __init__(self):
-        """Initialisation function."""
-        pass
+    return Request(request.method, request.path, core._EnvironHeaders(request.META), request.GET,
+                   lambda max_size: _read_body(request, max_size), content_type, native=request,
+                   content_length=content_length)
 
 
-def _validate_query_params(params, checks):
+def _read_body(request, max_size):
     """
-    Function to validate HTTP GET request params. If there are checks to be
-    performed then they will be; these will be items such as length and type
-    checks defined in the definition file.
-    :param params: incoming request parameters.
-    :param checks: dict of param to rule to validate with.
-    :raises ValidationError: raised when any query parameter fails any
-        of its checks defined in the checks param.
-    :returns: true if validated, otherwise raises an exception when fails.
+    Read the body of a Django request. With a max_size the stream is read in
+    chunks and abandoned as soon as the body grows past it, so a chunked upload
+    is never held in memory in full.
+    :param request: incoming Django http request.
+    :param max_size: maximum body size in bytes, None for no limit.
+    :raises RequestEntityTooLargeException: raised when the body is larger than max_size.
+    :returns: the body bytes.
     """
 
-    # If validation checks, check the params. If not, pass.
-    if checks:
-        for param in checks:
-            # If the expected param is in the query.
-            if param in params:
-                for check, rule in checks[param].items():
-                    if rule is not None:
-                        error_message = 'QueryParam [%s] failed validation check [%s]:[%s]' % (param, check, rule)
-                        if check == 'minLength':
-                            if len(params.get(param)) < rule:
-                                raise ValidationError(error_message)
-                        elif check == 'maxLength':
-                            if len(params.get(param)) > rule:
-                                raise ValidationError(error_message)
-                        elif check == 'type':
-                            if rule == 'number':
-                                try:
-                                    float(params.get(param))
-                                except ValueError:
-                                    raise ValidationError(error_message)
-
-            # If the require param isn't in the query.
-            elif checks[param]['required'] is True:
-                raise ValidationError('QueryParam [%s] failed validation check [Required]:[True]' % param)
-
-    return True
-
-
-def _generate_example(action):
+    if max_size is None or hasattr(request, "_body"):
+        body = request.body
+    else:
+        # Cache it the way HttpRequest.body does so targets can still use request.body
+        body = request._body = core._read_stream(request, max_size)
+
+    if max_size is not None and len(body) > max_size:
+        raise RequestEntityTooLargeException(core._too_large_message(max_size))
+
+    return body
+
+
+def _to_http_response(response):
     """
-    This is used by both GET and POST when returning an example
+    Convert a core Response into a Django HttpResponse.
+    :param response: the core Response.
+    :returns: the HttpResponse.
     """
-    # The original method of generating straight from the example is bad
-    # because v2 parser now has an object, which also allows us to do the
-    # headers correctly
 
-    ret_data = action.example
-    # FIXME: not sure about this content thing
-    if action.resp_content_type == "application/json":
-        ret_data = json.dumps(action.example)
+    if response.stream is not None:
+        http_response = StreamingHttpResponse(response.stream, status=response.status_code)
+    else:
+        http_response = HttpResponse(response.content, status=response.status_code)
+    if response.content_type:
+        http_response["Content-Type"] = response.content_type
+    else:
+        del http_response["Content-Type"]
+
+    for header, value in response.headers.items():
+        http_response[header] = value
+
+    return http_response
+
+
+def _from_http_response(http_response):
+    """
+    View a Django HttpResponse as a core Response (content is None for streams).
+    Its headers are the HttpResponse itself, which gets and sets them case
+    insensitively.
+    :param http_response: the HttpResponse.
+    :returns: a core Response whose native response is the HttpResponse.
+    """
 
-    return HttpResponse(ret_data, content_type=action.resp_content_type)
+    content = None if http_response.streaming else http_response.content
+    return Response(content, http_response.status_code, http_response.get("Content-Type"), headers=http_response,
+                    native=http_response)
 
 
 def _validate_api(request, action, dynamic_values=None):
@@ -169,178 +146,63 @@ def _validate_api(request, action, dynamic_values=None):
     :returns: returns the HttpResponse generated by the action target.
     """
 
-    if action.query_parameter_checks:
-        # Following raises exception on fail or passes through.
-        _validate_query_params(request.GET, action.query_parameter_checks)
-
-    error_response = None
+    core_request = _core_request(request)
 
-    if request.body:
-        error_response = _validate_body(request, action)
+    etag, not_modified = core._version_not_modified(core_request, action, dynamic_values)
+    if not_modified is not None:
+        # The client's copy is current, so there is nothing to call, encode or look up
+        return _to_http_response(not_modified)
 
-    if error_response:
-        response = error_response
+    if action.response_cache is not None:
+        # The key includes the typed query, so it is validated first
+        validated_query = core._validate_query(core_request, action)
+        key = action.response_cache.key(core_request, dynamic_values,
+                                        validated_query if core._query_parser(action) is not None else None)
+        response = action.response_cache.serve(key, lambda: _serve(core_request, action, dynamic_values))
     else:
-        if action.target:
-            if dynamic_values:
-                # If there was a dynamic value, pass it through
-                response = action.target(request, **dynamic_values)
-            else:
-                response = action.target(request)
-        else:
-            response = _generate_example(action)
+        response = _serve(core_request, action, dynamic_values)
 
-    if not isinstance(response, HttpResponse):
-        # As we weren't given a HttpResponse, we need to create one
-        # and handle the data correctly.
-        if action.resp_content_type == ContentType.JSON:
-            response = HttpResponse(json.dumps(response), content_type="application/json")
-        else:
-            # FIXME: write more types in here
-            raise Exception("Unsuported response content type - contact @jmons for future feature request")
+    core_response = _from_http_response(response)
+    content = core_response.content
+    finished = core._finish_response(core_request, action, core_response, etag)
+    if finished is not core_response:
+        return _to_http_response(finished)
+    if finished.content is not content:
+        response.content = finished.content
 
     return response
 
 
-def _validate_body(request, action):
-    error_response = None
-    content_type_matched = False
-
-    try:
-        # Grab the content-type coming in from the request
-        if "headers" in request.META:
-            request_content_type = request.META["headers"]["content-type"]
-
-        else:
-            request_content_type = request.META["CONTENT_TYPE"]
-    except Exception:
-        # couldn't find the content-type header so error
-        error_response = _validation_error_handler(UnsupportedMediaTypeException("Missing Content Type for this request"))
-        return error_response
-
-    if not request_content_type:
-        # content-type is empty so error
-        error_response = _validation_error_handler(UnsupportedMediaTypeException("Missing Content Type for this request"))
-        return error_response
-
-    # Parse the content type coming in (in case there are multiple optional entries)
-    request_content_type = request_content_type.replace(' ', '').split(';')[0]
-
-    # Set the actual content_type we are using in this request
-    action.requ_content_type = request_content_type
-
-    # Check the schema had content-types defined
-    if hasattr(action, 'request_content_type_options'):
-
-        for x in action.request_content_type_options:
-            # Check if the incoming content-type matches the allowed type in the schema and is JSON type
-            if x == request_content_type == str(ContentType.JSON):
-                content_type_matched = True
-
-                # If the expected request body is JSON, we need to load it.
-                if action.request_options[request_content_type]["schema"]:
-                    # If there is any schema, we'll validate it.
-                    try:
-                        data = json.loads(request.body.decode('utf-8'))
-                        validate(data, action.request_options[request_content_type]["schema"])
-                    except Exception as e:
-                        # Check the value is in settings, and that it is not None
-                        if hasattr(settings,
-                                   'RAMLWRAP_VALIDATION_ERROR_HANDLER') and settings.RAMLWRAP_VALIDATION_ERROR_HANDLER:
-                            error_response = _call_custom_handler(e, request, action)
-                        else:
-                            error_response = _validation_error_handler(e)
-                else:
-                    # Otherwise just load it (no validation as no schema).
-                    data = json.loads(request.body.decode('utf-8'))
-                break
-
-            # Incoming content type wasn't json but it does match one of the options in the raml so just decode it as is
-            elif x == request_content_type:
-                content_type_matched = True
-                try:
-                    data = request.body.decode('utf-8')
-                except UnicodeDecodeError:
-                    # Just send the body if it cannot be decoded
-                    data = request.body
-                break
-
-    else:
-        # There were no content type options in the schema so just load the data
-        content_type_matched = True
-        try:
-            data = request.body.decode('utf-8')
-        except UnicodeDecodeError:
-            # Just send the body if it cannot be decoded
-            data = request.body
-
-    if not content_type_matched:
-        error_response = _validation_error_handler(ValidationError("Invalid Content Type for this request: {}".format(request_content_type), validator="invalid"))
-
-    if not error_response:
-        request.validated_data = data
-
-    return error_response
+def _serve(core_request, action, dynamic_values):
+    """Serve a wrapped Django request, see _validate_api."""
 
+    response = core._call_action(core_request, action, dynamic_values)
 
-def _validation_error_handler(e):
-    """
-    Default validation handler for when a ValidationError occurs.
-    This behaviour can be overriden in the settings file.
-    :param e: exception raised that must be handled.
-    :returns: HttpResponse with status depending on the error.
-        ValidationError will return a 422 with json info on the cause.
-        Otherwise a FatalException is raised.
-    """
-
-    if isinstance(e, ValidationError):
-        message = 'Validation failed. {}'.format(e.message)
-        error_response = {
-            'message': message,
-            'code': e.validator
-        }
-        logger.info(message)
-        error_resp = JsonResponse(error_response, status=422)
+    if not isinstance(response, HttpResponseBase):
+        # As we weren't given a HttpResponse, we need to create one
+        # and handle the data correctly.
+        response = _to_http_response(core._render_result(action, response, core_request))
 
-    elif isinstance(e, UnsupportedMediaTypeException):
-        error_response = {'message': e.message}
-        error_resp = JsonResponse(error_response, status=415)
+    if action.response_schemas and core._should_validate_response(action):
+        core._validate_response(core_request, action, _from_http_response(response))
 
-    else:
-        raise FatalException('Malformed JSON in the request.', 400)
+    if action.etag and response.status_code == 200 and not response.streaming and not response.has_header("ETag"):
+        # Set here, so cached responses keep it
+        response["ETag"] = core._content_etag(response.content)
 
-    return error_resp
+    return response
 
 
-def _call_custom_handler(e, request, action):
+def _validate_body(request, action):
     """
-    Dynamically import and call the custom validation error handler
-    defined by the user in the django settings file.
-    :param e: exception raised that must be handled.
-    :param request: incoming http request that must be served correctly.
-    :param action: action object containing data used to validate and serve the request.
-    :returns: response returned from the custom handler, given the exception.
+    Validate the body of a Django request, see core._validate_body.
+    :param request: incoming http request.
+    :param action: action object containing data used to validate the request.
+    :returns: an error HttpResponse (or custom handler result) if validation failed, otherwise None.
     """
 
-    handler_full_path = settings.RAMLWRAP_VALIDATION_ERROR_HANDLER
-    handler_method = handler_full_path.split('.')[-1]
-    handler_class_path = '.'.join(handler_full_path.split('.')[0:-1])
+    error_response = core._validate_body(_core_request(request), action)
 
-    handler = getattr(importlib.import_module(handler_class_path), handler_method)
-
-    if _num_arguments_to_pass(handler) == 3:
-        return handler(e, request, action)
-    else:
-        # Handle old versions that still only accept the exception
-        return handler(e)
-
-
-def _num_arguments_to_pass(handler):
-    if sys.version_info[0] < 3:
-        # Python 2
-        args = inspect.getargspec(handler).args
-        return len(args)
-    else:
-        # Python 3
-        signature = inspect.signature(handler)
-        return len(signature.parameters)
+    if isinstance(error_response, Response):
+        return _to_http_response(error_response)
+    return error_response
@@ -0,0 +1,183 @@
+"""
+Cache of request body validation outcomes.
+
+Webhook senders and retrying clients send the same body bytes over and over.
+With the cache enabled, the outcome of decoding and validating a body (the
+decoded data, or the error raised) is kept in a bounded LRU keyed by the
+action, the Content-Type header and a digest of the body, so a repeated body
+skips decoding and schema validation entirely.
+
+The cache is off by default. Enable it in settings with:
+
+    RAMLWRAP_VALIDATION_CACHE_SIZE = 1024                   # max number of cached bodies
+    RAMLWRAP_VALIDATION_CACHE_MAX_BYTES = 16 * 1024 * 1024  # max total size of cached bodies
+    RAMLWRAP_VALIDATION_CACHE_MAX_ENTRY_BYTES = 64 * 1024   # larger bodies are never cached
+
+Targets always receive their own copy of the cached data, so changing
+request.validated_data cannot leak into later requests.
+"""
+import copy
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+from . config import get_setting
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_MAX_ENTRY_BYTES = 64 * 1024
+
+# Types that are shared rather than copied when handing out cached data
+_IMMUTABLE_TYPES = (str, int, float, bool, bytes, type(None))
+
+
+class ValidationCache:
+    """
+    Thread safe LRU of body validation outcomes, bounded by number of entries
+    and by the total size of the cached bodies.
+    """
+
+    def __init__(self, max_entries, max_bytes=DEFAULT_MAX_BYTES, max_entry_bytes=DEFAULT_MAX_ENTRY_BYTES):
+        """Initialisation function."""
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def decode(self, action, handler, body, content_type):
+        """
+        Decode and validate a body with the handler, or replay the cached outcome.
+        :param action: the action the body was sent to.
+        :param handler: the BodyHandler for the content type.
+        :param body: the body bytes.
+        :param content_type: the full Content-Type header of the request.
+        :raises ValidationError: raised (as by the handler) when the body does not match the schema.
+        :raises ValueError: raised (as by the handler) when the body cannot be decoded.
+        :returns: a copy of the decoded data, owned by the caller.
+        """
+
+        if len(body) > self.max_entry_bytes:
+            return handler(body, content_type)
+
+        key = (action, content_type, hashlib.blake2b(body, digest_size=16).digest())
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                entry = cached[0]
+            else:
+                self.misses += 1
+                entry = None
+
+        if entry is None:
+            try:
+                data = handler(body, content_type)
+            except Exception as e:
+                entry = (False, e)
+            else:
+                entry = (True, data)
+            self._store(key, entry, len(body))
+
+        succeeded, outcome = entry
+        if not succeeded:
+            # Drop the traceback of the earlier raise so it doesn't grow on every replay
+            raise outcome.with_traceback(None)
+
+        return copy_data(outcome)
+
+    def _store(self, key, entry, size):
+        with self._lock:
+            if key in self._entries:
+                return
+
+            self._entries[key] = (entry, size)
+            self.size += size
+
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups that were served from the cache."""
+
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """
+        :returns: dict of the cache counters, e.g. for a metrics endpoint.
+        """
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.size,
+        }
+
+    def clear(self):
+        """Empty the cache and reset its counters."""
+
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.size = 0
+
+
+def copy_data(data):
+    """
+    Copy decoded body data. Much faster than copy.deepcopy for the dicts,
+    lists and scalars that decoders produce.
+    :param data: decoded data.
+    :returns: a copy sharing nothing mutable with data.
+    """
+
+    if isinstance(data, _IMMUTABLE_TYPES):
+        return data
+    if type(data) is dict:
+        return {key: copy_data(value) for key, value in data.items()}
+    if type(data) is list:
+        return [copy_data(value) for value in data]
+    return copy.deepcopy(data)
+
+
+_cache = None
+_cache_limits = None
+
+
+def get_validation_cache():
+    """
+    The process wide validation cache, as configured in settings.
+    :returns: the ValidationCache, or None when RAMLWRAP_VALIDATION_CACHE_SIZE is not set.
+    """
+
+    global _cache, _cache_limits
+
+    max_entries = get_setting('RAMLWRAP_VALIDATION_CACHE_SIZE')
+    if not max_entries:
+        return None
+
+    limits = (max_entries,
+              get_setting('RAMLWRAP_VALIDATION_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES),
+              get_setting('RAMLWRAP_VALIDATION_CACHE_MAX_ENTRY_BYTES', DEFAULT_MAX_ENTRY_BYTES))
+    if limits != _cache_limits:
+        # First use, or the settings changed
+        _cache, _cache_limits = ValidationCache(*limits), limits
+
+    return _cache
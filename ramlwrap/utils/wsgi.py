@@ -0,0 +1,247 @@
+"""
+Raw WSGI/ASGI adapter for the engine in core.py.
+
+Serves the endpoints of a raml file without Django: no settings module, url
+resolver or middleware sit between the server and the validation. Targets
+receive a core Request (with `GET`, `headers`, `body` and `validated_data`)
+and return a core Response or data to be rendered in the response content type.
+
+    application = RamlApplication("api.raml", function_map)
+
+Settings such as RAMLWRAP_VALIDATION_ERROR_HANDLER are set with
+ramlwrap.utils.config.configure.
+"""
+import json
+import logging
+
+from http import HTTPStatus
+
+from jsonschema.exceptions import ValidationError
+
+from . config import get_setting
+from . core import QueryDict, Request, Response, _EnvironHeaders, _read_stream, _too_large_message, \
+    _validation_error_handler
+from . exceptions import FatalException, RequestEntityTooLargeException
+from . raml import raml_endpoints
+from . router import Router
+from . streaming import iterate_async
+
+logger = logging.getLogger(__name__)
+
+class RamlApplication:
+    """
+    WSGI application serving the endpoints of a raml file. Use the instance
+    itself as the WSGI callable and `asgi` as the ASGI one.
+    """
+
+    def __init__(self, raml_filepath, function_map):
+        """
+        Parse the raml and build the routing table.
+        :param raml_filepath: the path to the raml file (not a file pointer)
+        :param function_map: a dictionary of urls to functions for mapping
+        """
+
+        self.router = Router()
+        for endpoint in raml_endpoints(raml_filepath, function_map):
+            self.router.add(endpoint)
+
+    @property
+    def static_routes(self):
+        """Endpoints with a literal url, by url."""
+        return self.router.static_routes
+
+    @property
+    def dynamic_routes(self):
+        """(compiled regex, endpoint) of the endpoints with a regex url."""
+        return self.router.dynamic_routes
+
+    def resolve(self, path):
+        """
+        Find the endpoint for a path.
+        :param path: request path, with or without the leading slash.
+        :returns: tuple of the endpoint (None if not found) and its dynamic values.
+        """
+
+        return self.router.resolve(path)
+
+    def handle(self, request):
+        """
+        Serve a core Request.
+        :param request: incoming Request.
+        :returns: the Response.
+        """
+
+        endpoint, dynamic_values = self.resolve(request.path)
+        return self._dispatch(endpoint, dynamic_values, request)
+
+    def _dispatch(self, endpoint, dynamic_values, request):
+        """Serve a core Request with the endpoint resolved for it."""
+
+        if endpoint is None:
+            return _json_error(404, "Not found.")
+
+        try:
+            return endpoint.dispatch(request, **dynamic_values)
+        except ValidationError as e:
+            return _validation_error_handler(e)
+        except FatalException as e:
+            logger.error(e.message)
+            return _json_error(e.status_code, e.public_message)
+
+    def __call__(self, environ, start_response):
+        """WSGI entry point."""
+
+        try:
+            content_length = int(environ.get("CONTENT_LENGTH") or 0) or None
+        except ValueError:
+            content_length = None
+
+        stream = environ.get("wsgi.input")
+
+        def read_body(max_size):
+            if content_length:
+                return _read_stream(stream, max_size, content_length)
+            if environ.get("wsgi.input_terminated"):
+                # Chunked upload, read until the server signals the end
+                return _read_stream(stream, max_size)
+            return b""
+
+        request = Request(environ["REQUEST_METHOD"], environ.get("PATH_INFO") or "/", _EnvironHeaders(environ),
+                          QueryDict(environ.get("QUERY_STRING", "")), read_body, environ.get("CONTENT_TYPE"),
+                          content_length=content_length)
+
+        response = self.handle(request)
+
+        start_response(_status_line(response.status_code), _header_list(response))
+        if response.stream is not None:
+            if hasattr(response.stream, "__anext__"):
+                return iterate_async(response.stream)
+            return response.stream
+        return [response.content]
+
+    async def asgi(self, scope, receive, send):
+        """
+        ASGI entry point. Targets are plain functions, so they run on the
+        event loop thread; keep them quick or run the WSGI entry point instead.
+        Targets returning an async generator have its items streamed from the loop.
+        """
+
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        headers = dict((name.decode("latin-1").lower(), value.decode("latin-1")) for name, value in scope["headers"])
+        try:
+            content_length = int(headers.get("content-length") or 0) or None
+        except ValueError:
+            content_length = None
+
+        request = Request(scope["method"], scope["path"], headers,
+                          QueryDict(scope.get("query_string", b"").decode("latin-1")),
+                          b"", headers.get("content-type"), content_length=content_length)
+
+        # The core reads bodies synchronously, so receive it here first - but
+        # only after the headers have passed, and no more than the endpoint allows
+        endpoint, dynamic_values = self.resolve(request.path)
+        action = endpoint.request_method_mapping.get(request.method) if endpoint else None
+        max_body_size = _max_body_size(action) if action else None
+
+        if max_body_size is not None and content_length and content_length > max_body_size:
+            # Let the core reject it without receiving anything
+            response = self._dispatch(endpoint, dynamic_values, request)
+        else:
+            try:
+                request._body = await _receive_body(receive, max_body_size)
+            except RequestEntityTooLargeException as e:
+                response = _validation_error_handler(e)
+            else:
+                response = self._dispatch(endpoint, dynamic_values, request)
+
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in _header_list(response)],
+        })
+        if response.stream is None:
+            await send({"type": "http.response.body", "body": response.content})
+            return
+
+        if hasattr(response.stream, "__anext__"):
+            async for chunk in response.stream:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        else:
+            for chunk in response.stream:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+
+def _max_body_size(action):
+    """The body size limit for an action, see core._call_action."""
+
+    if action.max_body_size is not None:
+        return action.max_body_size
+    return get_setting('RAMLWRAP_MAX_BODY_SIZE')
+
+
+async def _receive_body(receive, max_size):
+    """
+    Receive an ASGI request body, giving up as soon as it grows past max_size.
+    :param receive: the ASGI receive callable.
+    :param max_size: maximum body size in bytes, None for no limit.
+    :raises RequestEntityTooLargeException: raised when the body is larger than max_size.
+    :returns: the body bytes.
+    """
+
+    chunks = []
+    size = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if max_size is not None and size > max_size:
+            raise RequestEntityTooLargeException(_too_large_message(max_size))
+        chunks.append(chunk)
+        more_body = message.get("more_body", False)
+
+    return b"".join(chunks)
+
+
+_status_lines = {}
+
+
+def _status_line(status_code):
+    """Return (and cache) the WSGI status line for a status code."""
+
+    line = _status_lines.get(status_code)
+    if line is None:
+        try:
+            phrase = HTTPStatus(status_code).phrase
+        except ValueError:
+            phrase = "Unknown"
+        line = _status_lines[status_code] = "%d %s" % (status_code, phrase)
+    return line
+
+
+def _header_list(response):
+    """Return the headers of a Response as a list of tuples."""
+
+    headers = []
+    if response.content is not None:
+        # Streamed responses have no length up front
+        headers.append(("Content-Length", str(len(response.content))))
+    if response.content_type:
+        headers.append(("Content-Type", response.content_type))
+    headers.extend(response.headers.items())
+    return headers
+
+
+def _json_error(status_code, message):
+    """Build a json error Response."""
+
+    return Response(json.dumps({"message": message}), status_code=status_code, content_type="application/json")
@@ -1,40 +1,89 @@
 """
 Loads include files in yaml.
+
+Every file pulled in with !include or !template (directly or through another
+include) is recorded in the loader's `includes`, so callers know which files a
+raml document depends on. Setting `include_cache` to a dict makes the loader
+reuse the parsed content of includes that haven't changed since they were
+last loaded with that cache, see file_stamp. Include paths are normalised, so
+documents in different directories including the same file share its entry.
 """
 
 import yaml
+import os
 import os.path
 from .exceptions import FatalException
 
 
 class Loader(yaml.Loader):
 
+    include_cache = None
+
     def __init__(self, stream):
 
         self._root = os.path.split(stream.name)[0]
+        self.includes = set()
 
         super(Loader, self).__init__(stream)
 
     def include(self, node):
 
-        filename = os.path.join(self._root, self.construct_scalar(node))
+        filename = os.path.normpath(os.path.join(self._root, self.construct_scalar(node)))
+
+        if self.include_cache is not None:
+            cached = self.include_cache.get(filename)
+            if cached is not None and all(file_stamp(f) == stamp for f, stamp in cached[0].items()):
+                stamps, data = cached
+                self.includes.update(stamps)
+                return data
 
         extension = filename.split(".")[-1]
 
+        includes = set()
         with open(filename, 'r') as f:
             if extension in ["yaml", "raml", "yml", "json"]:  # defined by raml 1.0 spec
-                return yaml.load(f, Loader)
+                loader = self.__class__(f)
+                loader.include_cache = self.include_cache
+                try:
+                    data = loader.get_single_data()
+                finally:
+                    loader.dispose()
+                includes = loader.includes
             else:
-                return f.read()
+                data = f.read()
+
+        includes.add(filename)
+        self.includes.update(includes)
+
+        if self.include_cache is not None:
+            # The content is only current while none of the files it came from change
+            self.include_cache[filename] = (dict((f, file_stamp(f)) for f in includes), data)
+
+        return data
 
     def template(self, node):
 
-        filename = os.path.join(self._root, self.construct_scalar(node))
+        filename = os.path.normpath(os.path.join(self._root, self.construct_scalar(node)))
         if os.path.isfile(filename):
+            self.includes.add(filename)
             with open(filename, 'r') as f:
                 return f.read()
         else:
             raise FatalException("Could not find %s" % filename)
 
+
+def file_stamp(filename):
+    """
+    :param filename: path of a file.
+    :returns: (modification time, size) of the file, None if it doesn't exist.
+    """
+
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
 Loader.add_constructor('!include', Loader.include)
 Loader.add_constructor('!template', Loader.template)
@@ -6,12 +6,7 @@ import yaml, copy
 
 from .utils.yaml_include_loader import Loader
 
-try:
-    # This import fails for django 1.9
-    from django.views import View
-except Exception as error:
-    print("failed to [from django.views import View] {}".format(error))
-    from django.views.generic.base import View
+from django.views import View
 
 
 class RamlDoc(View):
@@ -51,12 +51,13 @@ setup(
         # Specify the Python versions you support here. In particular, ensure
         # that you indicate whether you support Python 2, Python 3 or both.
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
-        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3 :: Only',
         'Programming Language :: Python :: 3.8'
     ],
 
+    # contextvars is new in 3.7, gzip.compress(mtime=) in 3.8
+    python_requires='>=3.8',
+
     # What does your project relate to?
     keywords='raml api django',
 
@@ -76,6 +77,15 @@ setup(
         "Django>=2.0",
         "jsonschema>=2.6.0",
         "pyyaml>=3.12"
-    ]
+    ],
+
+    # Optional dependencies for binary request and response bodies, e.g.
+    # pip install ramlwrap[msgpack,cbor]
+    extras_require={
+        "msgpack": ["msgpack"],
+        "cbor": ["cbor2"],
+        "brotli": ["brotli"],
+        "opentelemetry": ["opentelemetry-api"],
+    }
 
 )
@@ -1,4 +1,5 @@
 import json
+import time
 
 from django.http import HttpResponse
 
@@ -25,4 +26,110 @@ def regular_api(request):
     Example api for non dynamic urls
     """
 
-    return HttpResponse(json.dumps({"message": "woohoo"}), content_type="application/json")
\ No newline at end of file
+    return HttpResponse(json.dumps({"message": "woohoo"}), content_type="application/json")
+
+def valid_response_api(request):
+    """
+    Example api returning data that matches its response schema
+    """
+
+    return {"data": "value"}
+
+
+def invalid_response_api(request):
+    """
+    Example api returning data that does not match its response schema
+    """
+
+    return {"notData": 1}
+
+
+def echo_validated_data_api(request):
+    """
+    Example api returning the validated data it was given
+    """
+
+    data = getattr(request, "validated_data", None)
+    if isinstance(data, dict):
+        # Uploaded files are returned without their (binary) content
+        for value in data.values():
+            if isinstance(value, dict):
+                value["content"] = value["content"].decode("utf-8")
+
+    return {"validated_data": data}
+
+
+def echo_validated_data_meta_api(request):
+    """
+    Example api returning what was sampled validating the data it was given
+    """
+
+    return {"validated_data_meta": request.validated_data_meta}
+
+
+def echo_validated_query_api(request):
+    """
+    Example api returning the typed query parameters it was given
+    """
+
+    return {"validated_query": request.validated_query}
+
+
+def echo_dynamic_values_api(request, **dynamic_values):
+    """
+    Example api returning the dynamic values it was given, with their types
+    """
+
+    return {"dynamic_values": dynamic_values,
+            "types": dict((name, type(value).__name__) for name, value in dynamic_values.items())}
+
+
+# Paths counting_api was called for, for the response cache tests
+counting_api_calls = []
+
+
+def counting_api(request, **dynamic_values):
+    """
+    Example api returning how many times it has been called
+    """
+
+    counting_api_calls.append(request.path)
+    if request.GET.get("fail"):
+        return HttpResponse(status=500)
+    if request.GET.get("slow"):
+        time.sleep(0.2)
+
+    return {"calls": len(counting_api_calls), "query": request.validated_query}
+
+
+def counting_api_version(request):
+    """
+    Example version token function, the token is sent in the query to make it easy to change
+    """
+
+    return request.GET.get("version")
+
+
+def large_api(request):
+    """
+    Example api returning a large response
+    """
+
+    return {"items": list(range(500))}
+
+
+def streaming_api(request):
+    """
+    Example api streaming its response, the number of items is sent in the query
+    """
+
+    for i in range(int(request.GET.get("count", 3))):
+        yield {"id": i}
+
+
+def empty_streaming_api(request):
+    """
+    Example api streaming no items
+    """
+
+    return iter(())
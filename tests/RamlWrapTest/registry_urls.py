@@ -0,0 +1,9 @@
+"""RamlWrapTest URL Configuration serving the test raml files through a Registry."""
+from ramlwrap import Registry
+from RamlWrapTest.urls import function_map
+
+registry = Registry()
+registry.add("RamlWrapTest/tests/fixtures/raml/test.raml", function_map)
+registry.add("RamlWrapTest/tests/fixtures/raml/test_dynamic.raml", function_map)
+registry.add("RamlWrapTest/tests/fixtures/raml/test_uri_parameters.raml", function_map)
+urlpatterns = registry.urlpatterns
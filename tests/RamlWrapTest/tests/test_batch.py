@@ -0,0 +1,97 @@
+"""Tests for offline batch validation."""
+import io
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import SimpleTestCase
+
+from ramlwrap.utils.batch import main, validate_batch
+
+RAML = "RamlWrapTest/tests/fixtures/raml/test_binary_formats.raml"
+
+PAYLOADS = [
+    b'{"name": "a"}\n',
+    b'{"count": 1}\n',
+    b'\n',
+    b'{"name": "c", "count": "three"}\n',
+    b'not json\n',
+    b'{"name": "e", "count": 5}\n',
+]
+
+
+class BatchValidationTestCase(SimpleTestCase):
+    """TestCase for validate_batch and its command line."""
+
+    def _check(self, results):
+        failures = [failure.to_dict() for failure in results]
+
+        self.assertEqual([1, 3, 4], [failure["index"] for failure in failures])
+        self.assertEqual({"index": 1, "path": "$", "validator": "required",
+                          "message": "'name' is a required property"}, failures[0])
+        self.assertEqual("$.count", failures[1]["path"])
+        self.assertEqual("type", failures[1]["validator"])
+        self.assertEqual("malformed", failures[2]["validator"])
+        self.assertIsNone(failures[2]["path"])
+
+        self.assertEqual({"total": 5, "passed": 2, "failed": 3,
+                          "by_validator": {"required": 1, "type": 1, "malformed": 1}}, results.summary())
+
+    def test_in_process(self):
+        """Test validating in this process."""
+
+        self._check(validate_batch(RAML, "/binary-formats", "post", iter(PAYLOADS), processes=1))
+
+    def test_process_pool(self):
+        """Test that a process pool gives the same results, in order."""
+
+        self._check(validate_batch(RAML, "/binary-formats", "POST", PAYLOADS, processes=2, chunk_size=2))
+
+    def test_decoded_payloads(self):
+        """Test that already decoded payloads are validated as they are."""
+
+        results = validate_batch(RAML, "binary-formats", "POST", [{"name": "a"}, {"name": 1}], processes=1)
+
+        self.assertEqual([1], [failure.index for failure in results])
+
+    def test_uri_parameters(self):
+        """Test that resources with uriParameters are found by their raml path."""
+
+        raml = "RamlWrapTest/tests/fixtures/raml/test_uri_parameters.raml"
+        results = validate_batch(raml, "/uri-parameters/orders/{order_id}", "POST", [{"name": "a"}, {}], processes=1)
+
+        self.assertEqual([1], [failure.index for failure in results])
+
+    def test_unknown_method(self):
+        """Test that asking for something the raml doesn't declare fails straight away."""
+
+        with self.assertRaises(ValueError):
+            validate_batch(RAML, "/missing", "POST", [])
+        with self.assertRaises(ValueError):
+            validate_batch(RAML, "/binary-formats", "PUT", [])
+        with self.assertRaises(ValueError):
+            validate_batch(RAML, "/binary-formats", "GET", [])
+        with self.assertRaises(ValueError):
+            validate_batch(RAML, "/binary-formats", "POST", [], content_type="text/xml")
+
+    def test_command_line(self):
+        """Test the command line writes failures to stdout and the summary to stderr."""
+
+        with tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False) as f:
+            f.write(b"".join(PAYLOADS))
+        self.addCleanup(os.remove, f.name)
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        real_stdout, real_stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = stdout, stderr
+        try:
+            exit_code = main([RAML, "/binary-formats", "POST", f.name, "--processes", "1"])
+        finally:
+            sys.stdout, sys.stderr = real_stdout, real_stderr
+
+        self.assertEqual(1, exit_code)
+        self.assertEqual([1, 3, 4], [json.loads(line)["index"] for line in stdout.getvalue().splitlines()])
+        self.assertEqual(3, json.loads(stderr.getvalue())["failed"])
@@ -0,0 +1,162 @@
+"""Tests for the MessagePack and CBOR request and response formats."""
+import json
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import TestCase, Client, override_settings
+
+from ramlwrap.utils.core import Action, Request
+from ramlwrap.utils.decoders import is_installed
+from ramlwrap.utils.encoders import compile_response_encoders, negotiate
+from ramlwrap.utils.exceptions import FatalException
+from ramlwrap.utils.raml import raml_endpoints
+from ramlwrap.utils.validation import _validate_api
+
+HAS_MSGPACK = is_installed("msgpack")
+HAS_CBOR = is_installed("cbor2")
+
+if HAS_MSGPACK:
+    import msgpack
+if HAS_CBOR:
+    import cbor2
+
+
+@override_settings(RAMLWRAP_VALIDATION_ERROR_HANDLER=None)
+class BinaryFormatsTestCase(TestCase):
+    """TestCase for binary request bodies validated against the json schemas, and response negotiation."""
+
+    client = None
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_negotiate(self):
+        """Test that the Accept header picks the response type, by quality and specificity."""
+
+        offered = [("application/json", 1), ("application/msgpack", 2), ("application/cbor", 3)]
+
+        self.assertEqual("application/json", negotiate(None, offered)[0])
+        self.assertEqual("application/json", negotiate("text/html", offered)[0])
+        self.assertEqual("application/cbor", negotiate("application/cbor", offered)[0])
+        self.assertEqual("application/msgpack",
+                         negotiate("application/json;q=0.5, application/msgpack", offered)[0])
+        self.assertEqual("application/cbor",
+                         negotiate("application/*;q=0.2, application/cbor;q=0.9", offered)[0])
+        self.assertEqual("application/json", negotiate("*/*", offered)[0])
+
+    def test_json_still_default(self):
+        """Test that requests without an Accept header still get json."""
+
+        response = self.client.post("/binary-formats", data='{"name": "x"}', content_type="application/json")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("application/json", response["Content-Type"])
+        if HAS_MSGPACK or HAS_CBOR:
+            # It could have been encoded in one of them instead
+            self.assertEqual("Accept", response["Vary"])
+        self.assertEqual({"validated_data": {"name": "x"}}, json.loads(response.content.decode("utf-8")))
+
+    def test_undeclared_response_type_falls_back(self):
+        """Test that an action without declared response types still responds with json only."""
+
+        action = Action()
+        action.resp_content_type = "application/json"
+        action.target = lambda request: {"a": 1}
+        request = self.client.get("/").wsgi_request
+        request.META["HTTP_ACCEPT"] = "application/msgpack"
+
+        response = _validate_api(request, action)
+
+        self.assertEqual("application/json", response["Content-Type"])
+        self.assertFalse(response.has_header("Vary"))
+        self.assertEqual((("application/json", action.response_encoders[0][1]),),
+                         compile_response_encoders(["application/json", "application/unknown"]))
+
+    @unittest.skipUnless(HAS_MSGPACK, "msgpack is not installed")
+    def test_msgpack_request(self):
+        """Test that msgpack bodies are decoded and validated against the schema."""
+
+        response = self.client.post("/binary-formats", data=msgpack.packb({"name": "x", "count": 2}),
+                                    content_type="application/msgpack")
+        self.assertEqual({"validated_data": {"name": "x", "count": 2}}, json.loads(response.content.decode("utf-8")))
+
+        response = self.client.post("/binary-formats", data=msgpack.packb({"count": 2}),
+                                    content_type="application/msgpack")
+        self.assertEqual(422, response.status_code)
+        self.assertEqual("required", json.loads(response.content.decode("utf-8"))["code"])
+
+        response = self.client.post("/binary-formats", data=msgpack.packb({"name": "x", "count": "two"}),
+                                    content_type="application/msgpack")
+        self.assertEqual(422, response.status_code)
+
+    @unittest.skipUnless(HAS_MSGPACK, "msgpack is not installed")
+    def test_malformed_msgpack(self):
+        """Test that a body which is not msgpack is rejected as malformed."""
+
+        with self.assertRaises(FatalException):
+            self.client.post("/binary-formats", data=b"\xc1", content_type="application/msgpack")
+
+    @unittest.skipUnless(HAS_MSGPACK, "msgpack is not installed")
+    def test_msgpack_response(self):
+        """Test that targets and examples respond in msgpack when the client asks for it."""
+
+        response = self.client.post("/binary-formats", data='{"name": "x"}', content_type="application/json",
+                                    HTTP_ACCEPT="application/msgpack")
+        self.assertEqual("application/msgpack", response["Content-Type"])
+        self.assertEqual({"validated_data": {"name": "x"}}, msgpack.unpackb(response.content, raw=False))
+
+        # Without a target the json example is sent as msgpack
+        endpoint = raml_endpoints("RamlWrapTest/tests/fixtures/raml/test_binary_formats.raml", {})[0]
+        response = endpoint.dispatch(Request("GET", "/binary-formats", {"accept": "application/msgpack"}))
+        self.assertEqual("application/msgpack", response.content_type)
+        self.assertEqual({"name": "example"}, msgpack.unpackb(response.content, raw=False))
+
+    @unittest.skipUnless(HAS_CBOR, "cbor2 is not installed")
+    def test_cbor_request_and_response(self):
+        """Test that cbor bodies are validated and cbor responses negotiated."""
+
+        response = self.client.post("/binary-formats", data=cbor2.dumps({"name": "x"}),
+                                    content_type="application/cbor", HTTP_ACCEPT="application/cbor")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("application/cbor", response["Content-Type"])
+        self.assertEqual({"validated_data": {"name": "x"}}, cbor2.loads(response.content))
+
+        response = self.client.post("/binary-formats", data=cbor2.dumps({"name": 1}),
+                                    content_type="application/cbor")
+        self.assertEqual(422, response.status_code)
+
+    @unittest.skipUnless(HAS_MSGPACK, "msgpack is not installed")
+    def test_concurrent_content_types(self):
+        """Test that concurrent requests to one action are each decoded with the handler for their own content type."""
+
+        function_map = {"binary-formats": {"function": lambda request: {"validated_data": request.validated_data}}}
+        endpoint = raml_endpoints("RamlWrapTest/tests/fixtures/raml/test_binary_formats.raml", function_map)[0]
+        action = endpoint.request_method_mapping["POST"]
+        bodies = {"application/json": b'{"name": "x"}', "application/msgpack": msgpack.packb({"name": "x"})}
+        barrier = threading.Barrier(8)
+        failures = []
+
+        def post(content_type):
+            barrier.wait()
+            for _ in range(50):
+                try:
+                    response = endpoint.dispatch(Request("POST", "/binary-formats", body=bodies[content_type],
+                                                         content_type=content_type))
+                    if response.status_code != 200 or action.requ_content_type != content_type:
+                        failures.append((content_type, response.status_code, action.requ_content_type))
+                except Exception as e:
+                    failures.append((content_type, e))
+
+        threads = [threading.Thread(target=post, args=(content_type,)) for content_type in list(bodies) * 4]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([], failures)
+        # Only seen while serving its requests
+        self.assertIsNone(action.requ_content_type)
@@ -0,0 +1,170 @@
+"""Tests for rejecting oversized request bodies."""
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import TestCase, Client, override_settings
+from django.test.client import RequestFactory
+
+from ramlwrap.utils.validation import _validate_api, Action, ContentType
+from ramlwrap.utils.wsgi import RamlApplication
+
+
+class _CountingStream(io.BytesIO):
+    """Stream that records how many bytes have been read from it."""
+
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super(_CountingStream, self).read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class _UnreadableStream(object):
+    """Stream that fails the test if it is read at all."""
+
+    def read(self, *args):
+        raise AssertionError("The body should not have been read")
+
+    readline = read
+
+
+def _limited_action(max_body_size):
+    action = Action()
+    action.resp_content_type = ContentType.JSON
+    action.request_content_type_options = [ContentType.JSON]
+    action.request_options = {ContentType.JSON: {"schema": None}}
+    action.example = {"ok": True}
+    action.max_body_size = max_body_size
+    return action
+
+
+class BodyLimitsTestCase(TestCase):
+    """TestCase for the body size limits."""
+
+    client = None
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_annotation_limit(self):
+        """Test that the (maxBodySize) annotation on a method is enforced."""
+
+        response = self.client.post("/limits/annotated", data=json.dumps({"a": "b"}), content_type="application/json")
+        self.assertEqual(200, response.status_code)
+
+        response = self.client.post("/limits/annotated", data=json.dumps({"a": "b" * 50}),
+                                    content_type="application/json")
+        self.assertEqual(413, response.status_code)
+        self.assertEqual({"message": "Request body is larger than the maximum of 32 bytes"},
+                         json.loads(response.content.decode("utf-8")))
+
+    def test_resource_annotation_limit(self):
+        """Test that the (maxBodySize) annotation on a resource applies to its methods."""
+
+        response = self.client.put("/limits/resource-annotated", data=json.dumps({"a": "b" * 20}),
+                                   content_type="application/json")
+        self.assertEqual(413, response.status_code)
+
+    def test_function_map_limit(self):
+        """Test that the function map limit overrides the annotation."""
+
+        response = self.client.post("/limits/mapped", data=json.dumps({"a": "b"}), content_type="application/json")
+        self.assertEqual(413, response.status_code)
+
+    @override_settings(RAMLWRAP_MAX_BODY_SIZE=4)
+    def test_setting_limit(self):
+        """Test that RAMLWRAP_MAX_BODY_SIZE applies to endpoints without their own limit."""
+
+        response = self.client.post("/api/multi_content_type", data="{}", content_type="application/json")
+        self.assertEqual(200, response.status_code)
+
+        response = self.client.post("/api/multi_content_type", data='{"a": 1}', content_type="application/json")
+        self.assertEqual(413, response.status_code)
+
+    def test_rejected_before_body_is_read(self):
+        """Test that the Content-Length and Content-Type are checked without reading the body."""
+
+        # Too large
+        request = RequestFactory().post("/limits", data="{}" * 100, content_type="application/json")
+        request._stream = _UnreadableStream()
+        self.assertEqual(413, _validate_api(request, _limited_action(10)).status_code)
+
+        # Missing content type
+        request = RequestFactory().post("/limits", data="{}", content_type="")
+        request._stream = _UnreadableStream()
+        self.assertEqual(415, _validate_api(request, _limited_action(10)).status_code)
+
+        # Content type not in the raml
+        request = RequestFactory().post("/limits", data="{}", content_type="text/plain")
+        request._stream = _UnreadableStream()
+        self.assertEqual(422, _validate_api(request, _limited_action(10)).status_code)
+
+    def test_chunked_body_cut_off(self):
+        """Test that a body without a Content-Length stops being read once it is over the limit."""
+
+        stream = _CountingStream(b"x" * (1024 * 1024))
+        request = RequestFactory().post("/limits", data="", content_type="application/json")
+        request.META.pop("CONTENT_LENGTH", None)
+        request._stream = stream
+
+        response = _validate_api(request, _limited_action(1000))
+        self.assertEqual(413, response.status_code)
+        self.assertTrue(stream.bytes_read < 128 * 1024)
+
+    def test_body_available_to_target(self):
+        """Test that a body read within the limit is still available as request.body."""
+
+        def target(request):
+            return {"body": request.body.decode("utf-8"), "data": request.validated_data}
+
+        action = _limited_action(100)
+        action.target = target
+        request = RequestFactory().post("/limits", data='{"a": 1}', content_type="application/json")
+
+        response = _validate_api(request, action)
+        self.assertEqual({"body": '{"a": 1}', "data": {"a": 1}}, json.loads(response.content.decode("utf-8")))
+
+
+class WSGIBodyLimitsTestCase(TestCase):
+    """TestCase for the body size limits in the WSGI adapter."""
+
+    def setUp(self):
+        self.app = RamlApplication("RamlWrapTest/tests/fixtures/raml/test_body_limits.raml", {})
+
+    def _post(self, environ):
+        started = {}
+
+        def start_response(status, headers):
+            started["status"] = status
+
+        environ.setdefault("REQUEST_METHOD", "POST")
+        environ.setdefault("PATH_INFO", "/limits/annotated")
+        environ.setdefault("CONTENT_TYPE", "application/json")
+        self.app(environ, start_response)
+        return started["status"]
+
+    def test_content_length_rejected_before_read(self):
+        """Test that a too large Content-Length is rejected without reading."""
+
+        status = self._post({"CONTENT_LENGTH": "5000", "wsgi.input": _UnreadableStream()})
+        self.assertEqual("413 Request Entity Too Large", status)
+
+    def test_chunked_body_cut_off(self):
+        """Test that a chunked upload is cut off once it is over the limit."""
+
+        stream = _CountingStream(b"x" * (1024 * 1024))
+        status = self._post({"wsgi.input": stream, "wsgi.input_terminated": True})
+        self.assertEqual("413 Request Entity Too Large", status)
+        self.assertTrue(stream.bytes_read < 128 * 1024)
+
+    def test_small_body_accepted(self):
+        """Test that a body within the limit is served."""
+
+        body = b'{"a": "b"}'
+        status = self._post({"CONTENT_LENGTH": str(len(body)), "wsgi.input": io.BytesIO(body)})
+        self.assertEqual("200 OK", status)
@@ -0,0 +1,296 @@
+"""Tests for the validators generated from json schemas."""
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import SimpleTestCase, override_settings
+
+import jsonschema
+
+from jsonschema import Draft4Validator, Draft7Validator
+from jsonschema.exceptions import SchemaError, ValidationError, best_match
+
+from ramlwrap.utils.codegen import compile_validator, generate_source
+from ramlwrap.utils.raml import raml_endpoints
+from ramlwrap.utils.schemas import SchemaValidator
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "raml")
+
+DRAFTS = {
+    Draft4Validator: "http://json-schema.org/draft-04/schema#",
+    Draft7Validator: "http://json-schema.org/draft-07/schema#",
+}
+if hasattr(jsonschema, "Draft202012Validator"):
+    # jsonschema 4 and later
+    DRAFTS[jsonschema.Draft202012Validator] = "https://json-schema.org/draft/2020-12/schema"
+
+KEYS = ["a", "b", "name"]
+STRINGS = ["", "a", "ab", "b1", "xxx", "a123", "name", "hello"]
+NUMBERS = [-2, 0, 1, 2, 2.0, 2.5, 3, 10, -0.5, 100]
+PATTERNS = ["^a", "b$", "[0-9]+", "^x*$"]
+TYPES = ["string", "object", "array", "boolean", "null", "number", "integer"]
+
+
+def _random_value(rng, depth=0):
+    """A random json value."""
+
+    kind = rng.randrange(7 if depth < 3 else 5)
+    if kind == 0:
+        return None
+    if kind == 1:
+        return rng.choice([True, False])
+    if kind == 2:
+        return rng.choice(NUMBERS)
+    if kind in (3, 4):
+        return rng.choice(STRINGS)
+    if kind == 5:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return dict((rng.choice(KEYS), _random_value(rng, depth + 1)) for _ in range(rng.randrange(4)))
+
+
+def _random_schema(rng, cls, depth=0):
+    """A random schema using the keywords the generated validators implement."""
+
+    legacy = cls is Draft4Validator
+    if not legacy and rng.random() < 0.05:
+        return rng.choice([True, False])
+
+    schema = {}
+    if rng.random() < 0.6:
+        types = rng.sample(TYPES, rng.randrange(1, 3))
+        schema["type"] = types[0] if len(types) == 1 and rng.random() < 0.7 else types
+    if rng.random() < 0.1:
+        schema["enum"] = rng.sample(STRINGS, rng.randrange(0, 3)) + ([None] if rng.random() < 0.3 else [])
+    if not legacy and rng.random() < 0.05:
+        schema["const"] = rng.choice(STRINGS + [None])
+
+    if rng.random() < 0.3:
+        schema["minLength"] = rng.randrange(4)
+    if rng.random() < 0.3:
+        schema["maxLength"] = rng.randrange(6)
+    if rng.random() < 0.2:
+        schema["pattern"] = rng.choice(PATTERNS)
+    if rng.random() < 0.1:
+        schema["format"] = "email"
+
+    for keyword in ("minimum", "maximum"):
+        if rng.random() < 0.3:
+            schema[keyword] = rng.choice(NUMBERS)
+    if legacy:
+        for keyword in ("exclusiveMinimum", "exclusiveMaximum"):
+            if rng.random() < 0.2:
+                schema[keyword] = rng.choice([True, False])
+    else:
+        for keyword in ("exclusiveMinimum", "exclusiveMaximum"):
+            if rng.random() < 0.2:
+                schema[keyword] = rng.choice(NUMBERS)
+
+    if depth < 3:
+        if rng.random() < 0.5:
+            schema["properties"] = dict((key, _random_schema(rng, cls, depth + 1))
+                                        for key in rng.sample(KEYS, rng.randrange(1, 3)))
+        if rng.random() < 0.4:
+            schema["required"] = rng.sample(KEYS, rng.randrange(1 if legacy else 0, 3))
+        if rng.random() < 0.3:
+            schema["additionalProperties"] = rng.choice([True, False, {}, _random_schema(rng, cls, depth + 1)])
+        if rng.random() < 0.4:
+            schema["items"] = _random_schema(rng, cls, depth + 1)
+        for combinator in ("allOf", "anyOf", "oneOf"):
+            if rng.random() < 0.1:
+                schema[combinator] = [_random_schema(rng, cls, depth + 1) for _ in range(rng.randrange(1, 3))]
+        if rng.random() < 0.05:
+            schema["not"] = _random_schema(rng, cls, depth + 1)
+
+    for keyword in ("minProperties", "maxProperties", "minItems", "maxItems"):
+        if rng.random() < 0.1:
+            schema[keyword] = rng.randrange(4)
+    if rng.random() < 0.05:
+        schema["uniqueItems"] = False
+
+    return schema
+
+
+def _instance_for(rng, schema, depth=0):
+    """A value likely to be (nearly) valid against a schema, so valid paths are exercised too."""
+
+    if not isinstance(schema, dict) or depth > 4:
+        return _random_value(rng, depth)
+
+    types = schema.get("type", rng.choice(TYPES))
+    type_name = rng.choice(types) if isinstance(types, list) and types else types
+    if schema.get("enum") and rng.random() < 0.7:
+        return rng.choice(schema["enum"])
+    if type_name == "object":
+        value = {}
+        for key, subschema in schema.get("properties", {}).items():
+            if rng.random() < 0.8:
+                value[key] = _instance_for(rng, subschema, depth + 1)
+        for key in schema.get("required", ()):
+            if key not in value and rng.random() < 0.9:
+                value[key] = _random_value(rng, depth + 1)
+        return value
+    if type_name == "array":
+        return [_instance_for(rng, schema.get("items"), depth + 1) for _ in range(rng.randrange(4))]
+    if type_name == "string":
+        return rng.choice(STRINGS)
+    if type_name in ("number", "integer"):
+        return rng.choice(NUMBERS)
+    return _random_value(rng, depth)
+
+
+def _fixture_schemas():
+    """The request and response schemas of the raml fixtures."""
+
+    schemas = []
+    for filename in sorted(os.listdir(FIXTURES)):
+        if not filename.endswith(".raml"):
+            continue
+        try:
+            endpoints = raml_endpoints(os.path.join(FIXTURES, filename), {})
+        except Exception:
+            # Fixtures of broken raml
+            continue
+        for endpoint in endpoints:
+            for action in endpoint.request_method_mapping.values():
+                for handler in (action.request_handlers or {}).values():
+                    if handler.validator is not None:
+                        schemas.append(handler.validator.schema)
+                for validator in action.response_validators.values():
+                    schemas.append(validator.schema)
+    return schemas
+
+
+def _fixture_documents():
+    """The json documents among the fixtures."""
+
+    documents = []
+    directory = os.path.join(FIXTURES, "json")
+    for filename in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, filename)) as f:
+            documents.append(json.load(f))
+    return documents
+
+
+class CodegenTestCase(SimpleTestCase):
+    """TestCase for the validators generated from json schemas."""
+
+    def assertSameOutcome(self, schema, cls, instances):
+        """Assert the generated check agrees with jsonschema on every instance."""
+
+        check = compile_validator(schema, cls)
+        self.assertIsNotNone(check, schema)
+        validator = cls(schema)
+        for instance in instances:
+            self.assertEqual(validator.is_valid(instance), check(instance),
+                             "%s disagrees with jsonschema on %r\n%s" % (
+                                 json.dumps(schema), instance, generate_source(schema, cls)[0]))
+
+    def test_fixture_schemas(self):
+        """Test that the schemas of the raml fixtures give the same outcome as jsonschema."""
+
+        rng = random.Random(0)
+        schemas = _fixture_schemas()
+        documents = _fixture_documents()
+        self.assertTrue(schemas)
+
+        for schema in schemas:
+            cls = type(SchemaValidator(schema).validator)
+            instances = documents + [_instance_for(rng, schema) for _ in range(50)]
+            instances += [_random_value(rng) for _ in range(50)]
+            if compile_validator(schema, cls) is not None:
+                self.assertSameOutcome(schema, cls, instances)
+
+    def test_fuzz(self):
+        """Test random schemas and instances give the same outcome as jsonschema."""
+
+        rng = random.Random(48)
+        for i in range(600):
+            cls = list(DRAFTS)[i % len(DRAFTS)]
+            schema = _random_schema(rng, cls)
+            if isinstance(schema, dict):
+                schema["$schema"] = DRAFTS[cls]
+            try:
+                cls.check_schema(schema)
+            except SchemaError:
+                continue
+
+            instances = [_instance_for(rng, schema) for _ in range(20)] + [_random_value(rng) for _ in range(10)]
+            self.assertSameOutcome(schema, cls, instances)
+
+    def test_same_errors(self):
+        """Test that invalid data raises exactly the error jsonschema gives."""
+
+        with open(os.path.join(FIXTURES, "json", "service_request.json")) as f:
+            schema = json.load(f)
+        validator = SchemaValidator(schema)
+
+        for data in ({}, {"data": 1}, [], {"data": "value", "other": None}):
+            expected = best_match(Draft4Validator(schema).iter_errors(data))
+            if expected is None:
+                validator.validate(data)
+                continue
+            with self.assertRaises(ValidationError) as raised:
+                validator.validate(data)
+            self.assertEqual((expected.message, expected.validator, list(expected.path)),
+                             (raised.exception.message, raised.exception.validator, list(raised.exception.path)))
+
+        self.assertIsNotNone(validator.check)
+
+    def test_unsupported_keywords(self):
+        """Test that schemas using keywords the generated checks don't implement are left to jsonschema."""
+
+        for schema, valid in (({"$ref": "#/definitions/a", "definitions": {"a": {"type": "string"}}}, "x"),
+                              ({"type": "number", "multipleOf": 2}, 4),
+                              ({"properties": {"a": {"patternProperties": {"^x": {"type": "string"}}}}}, {}),
+                              ({"type": "array", "uniqueItems": True}, [1, 2]),
+                              ({"$schema": DRAFTS[Draft7Validator], "items": [{"type": "string"}]}, ["x"]),
+                              ({"enum": [1, True]}, 1)):
+            self.assertIsNone(compile_validator(schema), schema)
+
+            validator = SchemaValidator(schema)
+            validator.validate(valid)
+            self.assertIsNone(validator.check)
+
+        with self.assertRaises(ValidationError):
+            SchemaValidator({"type": "number", "multipleOf": 2}).validate(3)
+
+    def test_generated_when_built(self):
+        """Test that a schema is compiled when its validator is built, not when it first validates something."""
+
+        validator = SchemaValidator({"type": "object", "required": ["name"]})
+        check = validator.check
+        self.assertTrue(callable(check))
+
+        validator.validate({"name": "value"})
+        with self.assertRaises(ValidationError):
+            validator.validate({})
+        self.assertIs(check, validator.check)
+
+    def test_generated_when_raml_loaded(self):
+        """Test that the request schemas of the endpoints built from a raml are compiled before any request."""
+
+        endpoints = raml_endpoints("RamlWrapTest/tests/fixtures/raml/test_validation_errors.raml", {})
+        handlers = [handler for endpoint in endpoints for action in endpoint.request_method_mapping.values()
+                    for handler in action.request_handlers.values() if handler.validator is not None]
+        self.assertTrue(handlers)
+        for handler in handlers:
+            self.assertTrue(callable(handler.validator.check))
+
+    @override_settings(RAMLWRAP_GENERATED_VALIDATORS=False)
+    def test_off(self):
+        """Test that the setting leaves every schema to jsonschema."""
+
+        validator = SchemaValidator({"type": "object", "required": ["name"]})
+        validator.validate({"name": "value"})
+        self.assertIsNone(validator.check)
+
+    def test_deep_nesting(self):
+        """Test that schemas nested deeper than python can compile are left to jsonschema."""
+
+        schema = {"type": "string"}
+        for _ in range(60):
+            schema = {"type": "array", "items": schema}
+        self.assertIsNone(compile_validator(schema))
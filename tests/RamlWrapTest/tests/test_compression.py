@@ -0,0 +1,93 @@
+"""Tests for response compression."""
+import gzip
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import SimpleTestCase, override_settings
+
+from ramlwrap.utils import compression
+from ramlwrap.utils.compression import negotiate_coding
+from ramlwrap.utils.core import Request
+from ramlwrap.utils.wsgi import RamlApplication
+
+
+class CompressionTestCase(SimpleTestCase):
+    """TestCase for response compression."""
+
+    def test_example_precompressed(self):
+        """Test that example responses are compressed once, when the raml is loaded."""
+
+        response = self.client.get("/compressed", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual("gzip", response["Content-Encoding"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertIn("compress me", json.loads(gzip.decompress(response.content).decode("utf-8"))["text"])
+
+        calls = []
+        original = compression._compressors["gzip"]
+        compression._compressors["gzip"] = (lambda content, level: calls.append(level), original[1])
+        try:
+            self.client.get("/compressed", HTTP_ACCEPT_ENCODING="gzip")
+        finally:
+            compression._compressors["gzip"] = original
+        self.assertEqual([], calls)
+
+    def test_not_accepted(self):
+        """Test that clients not accepting a coding get the body as it is, with Vary set."""
+
+        for accept_encoding in (None, "identity", "gzip;q=0"):
+            extra = {"HTTP_ACCEPT_ENCODING": accept_encoding} if accept_encoding else {}
+            response = self.client.get("/compressed", **extra)
+            self.assertFalse(response.has_header("Content-Encoding"))
+            self.assertIn("Accept-Encoding", response["Vary"])
+            self.assertIn("compress me", json.loads(response.content.decode("utf-8"))["text"])
+
+    def test_function_map_threshold(self):
+        """Test the threshold and level from the function map."""
+
+        response = self.client.get("/compressed/target", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual("gzip", response["Content-Encoding"])
+        self.assertEqual({"items": list(range(500))}, json.loads(gzip.decompress(response.content).decode("utf-8")))
+
+    def test_off_by_default(self):
+        """Test that endpoints without a setting or annotation aren't compressed."""
+
+        response = self.client.get("/compressed/off", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+        response = self.client.get("/response-validation/valid", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    @override_settings(RAMLWRAP_COMPRESSION_MIN_SIZE=10)
+    def test_setting(self):
+        """Test that the setting turns compression on, except where it is turned off."""
+
+        response = self.client.get("/response-validation/valid", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual("gzip", response["Content-Encoding"])
+
+        response = self.client.get("/compressed/off", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_etag_weakened(self):
+        """Test that the ETag of a compressed response is weak, and still matches."""
+
+        app = RamlApplication("RamlWrapTest/tests/fixtures/raml/test_compression.raml",
+                              {"compressed": {"etag": True}})
+
+        response = app.handle(Request("GET", "/compressed", {"accept-encoding": "gzip"}))
+        self.assertEqual("gzip", response.headers["Content-Encoding"])
+        etag = response.headers["ETag"]
+        self.assertTrue(etag.startswith("W/"))
+
+        response = app.handle(Request("GET", "/compressed", {"accept-encoding": "gzip", "if-none-match": etag}))
+        self.assertEqual(304, response.status_code)
+
+    def test_negotiate(self):
+        """Test picking the coding from Accept-Encoding."""
+
+        self.assertEqual("gzip", negotiate_coding("gzip;q=0.5, identity"))
+        self.assertEqual("gzip", negotiate_coding("*"))
+        self.assertIsNone(negotiate_coding("deflate"))
+        self.assertIsNone(negotiate_coding(None))
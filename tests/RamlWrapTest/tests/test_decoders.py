@@ -0,0 +1,109 @@
+"""Tests for the request body decoders."""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, Client, override_settings
+
+from ramlwrap.utils import decoders
+from ramlwrap.utils.decoders import BodyHandler, register_decoder
+from ramlwrap.utils.raml import raml_endpoints
+
+
+@override_settings(RAMLWRAP_VALIDATION_ERROR_HANDLER=None)
+class DecodersTestCase(TestCase):
+    """TestCase for decoding and validating non json request bodies."""
+
+    client = None
+
+    def setUp(self):
+        self.client = Client()
+
+    def _validated_data(self, response):
+        self.assertEqual(200, response.status_code)
+        return json.loads(response.content.decode("utf-8"))["validated_data"]
+
+    def test_dispatch_table_built_at_load(self):
+        """Test that each declared media type gets a compiled handler when the raml is loaded."""
+
+        endpoint = raml_endpoints("RamlWrapTest/tests/fixtures/raml/test_decoders.raml", {})[0]
+        handlers = endpoint.request_method_mapping["POST"].request_handlers
+
+        self.assertEqual(
+            sorted(["application/json", "application/x-www-form-urlencoded", "multipart/form-data",
+                    "text/csv", "text/plain"]),
+            sorted(handlers))
+        for handler in handlers.values():
+            self.assertTrue(isinstance(handler, BodyHandler))
+
+        self.assertIs(decoders.decode_form, handlers["application/x-www-form-urlencoded"].decoder)
+        self.assertIsNotNone(handlers["text/csv"].validator)
+        self.assertIsNone(handlers["text/plain"].validator)
+
+    def test_json_schema_as_string(self):
+        """Test that a schema written inline as a json string is validated."""
+
+        response = self.client.post("/decoders", data="{}", content_type="application/json")
+        self.assertEqual(422, response.status_code)
+
+        data = self._validated_data(
+            self.client.post("/decoders", data='{"name": "x"}', content_type="application/json"))
+        self.assertEqual({"name": "x"}, data)
+
+    def test_form_urlencoded(self):
+        """Test that form bodies are decoded, with repeated fields as lists, and validated."""
+
+        data = self._validated_data(self.client.post(
+            "/decoders", data="name=ramlwrap&tags=a&tags=b", content_type="application/x-www-form-urlencoded"))
+        self.assertEqual({"name": "ramlwrap", "tags": ["a", "b"]}, data)
+
+        response = self.client.post("/decoders", data="name=r", content_type="application/x-www-form-urlencoded")
+        self.assertEqual(422, response.status_code)
+        self.assertEqual("minLength", json.loads(response.content.decode("utf-8"))["code"])
+
+    def test_multipart(self):
+        """Test that multipart bodies are decoded into fields and files, and validated."""
+
+        upload = SimpleUploadedFile("hello.txt", b"hello world", content_type="text/plain")
+        data = self._validated_data(self.client.post("/decoders", data={"name": "ramlwrap", "upload": upload}))
+
+        self.assertEqual("ramlwrap", data["name"])
+        self.assertEqual({"filename": "hello.txt", "content_type": "text/plain", "content": "hello world"},
+                         data["upload"])
+
+        response = self.client.post("/decoders", data={"other": "value"})
+        self.assertEqual(422, response.status_code)
+        self.assertEqual("required", json.loads(response.content.decode("utf-8"))["code"])
+
+    def test_csv(self):
+        """Test that csv bodies are decoded to a list of rows and validated."""
+
+        data = self._validated_data(self.client.post(
+            "/decoders", data="id,name\r\n1,one\r\n2,two\r\n", content_type="text/csv"))
+        self.assertEqual([{"id": "1", "name": "one"}, {"id": "2", "name": "two"}], data)
+
+        response = self.client.post("/decoders", data="id\r\n1\r\n", content_type="text/csv")
+        self.assertEqual(422, response.status_code)
+
+    def test_type_without_decoder_is_text(self):
+        """Test that a declared type without a decoder is passed through as text."""
+
+        data = self._validated_data(self.client.post("/decoders", data="just text", content_type="text/plain"))
+        self.assertEqual("just text", data)
+
+    def test_registered_decoder(self):
+        """Test that a registered decoder is used for raml loaded after it."""
+
+        def decode_upper(body, content_type):
+            return body.decode("utf-8").upper()
+
+        register_decoder("text/plain", decode_upper)
+        try:
+            endpoint = raml_endpoints("RamlWrapTest/tests/fixtures/raml/test_decoders.raml", {})[0]
+            handler = endpoint.request_method_mapping["POST"].request_handlers["text/plain"]
+            self.assertEqual("SHOUT", handler(b"shout", "text/plain; charset=utf-8"))
+        finally:
+            del decoders._decoders["text/plain"]
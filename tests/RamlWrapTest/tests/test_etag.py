@@ -0,0 +1,91 @@
+"""Tests for ETags and 304 responses."""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import SimpleTestCase
+
+from ramlwrap.utils.core import QueryDict, Request
+from ramlwrap.utils.wsgi import RamlApplication
+
+from RamlWrapTest.apis.test_apis import counting_api_calls, counting_api_version
+
+
+class ETagTestCase(SimpleTestCase):
+    """TestCase for ETag handling."""
+
+    def setUp(self):
+        del counting_api_calls[:]
+
+    def test_content_etag(self):
+        """Test that a matching If-None-Match gets an empty 304."""
+
+        response = self.client.get("/etag")
+        self.assertEqual(200, response.status_code)
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('"'))
+
+        response = self.client.get("/etag", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b"", response.content)
+        self.assertEqual(etag, response["ETag"])
+
+        # Weak and listed tags match too
+        response = self.client.get("/etag", HTTP_IF_NONE_MATCH='"other", W/%s' % etag)
+        self.assertEqual(304, response.status_code)
+
+    def test_changed_content(self):
+        """Test that a changed body gets a new ETag and a full response."""
+
+        etag = self.client.get("/etag/counting")["ETag"]
+
+        # counting_api returns a new call count each time
+        response = self.client.get("/etag/counting", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response["ETag"])
+
+    def test_errors_untagged(self):
+        """Test that only successful responses get an ETag."""
+
+        response = self.client.get("/etag/counting?fail=1")
+        self.assertEqual(500, response.status_code)
+        self.assertFalse(response.has_header("ETag"))
+
+    def test_no_etag_by_default(self):
+        """Test that endpoints without the annotation aren't tagged."""
+
+        self.assertFalse(self.client.get("/cached-by-map").has_header("ETag"))
+
+    def test_version_token(self):
+        """Test that a current version token skips calling the target."""
+
+        response = self.client.get("/etag/versioned?version=1")
+        etag = response["ETag"]
+        self.assertEqual(1, len(counting_api_calls))
+
+        response = self.client.get("/etag/versioned?version=1", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(1, len(counting_api_calls))
+
+        response = self.client.get("/etag/versioned?version=2", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response["ETag"])
+        self.assertEqual(2, len(counting_api_calls))
+
+    def test_wsgi(self):
+        """Test ETags served by the WSGI adapter."""
+
+        app = RamlApplication("RamlWrapTest/tests/fixtures/raml/test_etag.raml",
+                              {"etag/versioned": {"function": lambda request: {"data": 1},
+                                                  "etag": counting_api_version}})
+
+        response = app.handle(Request("GET", "/etag"))
+        etag = response.headers["ETag"]
+        response = app.handle(Request("GET", "/etag", {"if-none-match": etag}))
+        self.assertEqual(304, response.status_code)
+
+        response = app.handle(Request("GET", "/etag/versioned", query=QueryDict("version=3")))
+        etag = response.headers["ETag"]
+        response = app.handle(Request("GET", "/etag/versioned", {"if-none-match": etag}, QueryDict("version=3")))
+        self.assertEqual(304, response.status_code)
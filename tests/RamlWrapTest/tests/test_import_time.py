@@ -0,0 +1,48 @@
+"""Tests for the cost of importing ramlwrap."""
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import SimpleTestCase
+
+import ramlwrap
+
+# Cumulative microseconds for `import ramlwrap`, as reported by -X importtime
+IMPORT_TIME_BUDGET = 30000
+
+HEAVY_MODULES = ("django", "jsonschema", "yaml", "ramlwrap.RamlWrap", "ramlwrap.views", "ramlwrap.utils")
+
+
+class ImportTimeTestCase(SimpleTestCase):
+    """TestCase for importing ramlwrap lazily."""
+
+    def _run(self, code):
+        env = dict(os.environ)
+        env.pop("DJANGO_SETTINGS_MODULE", None)
+        env["PYTHONPATH"] = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../"))
+        return subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+
+    def test_import_is_cheap(self):
+        """Test that importing ramlwrap imports nothing heavy, prints nothing and stays within budget."""
+
+        result = self._run(
+            "import sys, ramlwrap; print(sorted(m for m in sys.modules if m.startswith(%r)))" % (HEAVY_MODULES,))
+
+        self.assertEqual(b"[]", result.stdout.strip())
+
+        lines = [line for line in result.stderr.decode("utf-8").splitlines() if line.endswith("| ramlwrap")]
+        cumulative = int(lines[-1].split("|")[1])
+        self.assertLess(cumulative, IMPORT_TIME_BUDGET, "import ramlwrap took %dus" % cumulative)
+
+    def test_lazy_names(self):
+        """Test that the public names still import, from the module they live in."""
+
+        from ramlwrap.RamlWrap import ramlwrap as ramlwrap_function
+
+        self.assertIs(ramlwrap_function, ramlwrap.ramlwrap)
+        self.assertIn("ramlwrap", dir(ramlwrap))
+        with self.assertRaises(AttributeError):
+            ramlwrap.missing
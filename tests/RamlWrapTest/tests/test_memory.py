@@ -0,0 +1,109 @@
+"""Tests for the memory held by the endpoints built from a raml file."""
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import SimpleTestCase
+
+from ramlwrap.utils import raml
+from ramlwrap.utils.core import Action
+from ramlwrap.utils.raml import raml_endpoints
+
+from RamlWrapTest.utils.generated_raml import write_raml
+
+RESOURCES = 200
+
+# The share of the raml tree that must be freed once the endpoints are built (the examples and response
+# schemas, which serving needs, are kept)
+RELEASED = 0.75
+
+
+def _traced_bytes(build):
+    """
+    :param build: function building something to keep.
+    :returns: the bytes held by what build returns, measured with tracemalloc.
+    """
+
+    # Warm up imports and caches outside the measurement
+    build()
+    gc.collect()
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        gc.collect()
+        held = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    del kept
+    return held
+
+
+class MemoryTestCase(SimpleTestCase):
+    """TestCase for the size and immutability of built endpoints."""
+
+    @classmethod
+    def setUpClass(cls):
+        super(MemoryTestCase, cls).setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.raml_path = os.path.join(cls.directory, "api.raml")
+        write_raml(cls.raml_path, RESOURCES, "Memory")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+        super(MemoryTestCase, cls).tearDownClass()
+
+    def test_bytes_per_endpoint(self):
+        """
+        Test the memory held per endpoint once the raml tree is released, against
+        endpoints built the same way but kept along with their raml tree.
+        """
+
+        def build_keeping_tree():
+            trees = []
+
+            def load_tree(*args, **kwargs):
+                trees.append(load(*args, **kwargs))
+                return trees[-1]
+
+            load = raml._load_tree
+            with mock.patch("ramlwrap.utils.raml._load_tree", load_tree):
+                return raml_endpoints(self.raml_path, {}), trees
+
+        self.assertEqual(RESOURCES, len(raml_endpoints(self.raml_path, {})))
+
+        held = _traced_bytes(lambda: raml_endpoints(self.raml_path, {}))
+        held_with_tree = _traced_bytes(build_keeping_tree)
+        tree = _traced_bytes(lambda: raml._load_tree(self.raml_path))
+
+        sys.stderr.write("\n%d bytes per endpoint, %d with the raml tree kept (%d%% less)\n" % (
+            held / RESOURCES, held_with_tree / RESOURCES, 100 - 100 * held / held_with_tree))
+
+        # Endpoints holding on to any part of the tree would make keeping it cost less than the whole tree
+        self.assertGreater(held_with_tree - held, tree * RELEASED)
+
+    def test_actions_are_slotted_and_frozen(self):
+        """Test that built actions have no __dict__ and can't be changed, not even per request."""
+
+        action = raml_endpoints(self.raml_path, {})[0].request_method_mapping["POST"]
+
+        self.assertFalse(hasattr(action, "__dict__"))
+        self.assertIsNone(action.request_options)
+        with self.assertRaises(AttributeError):
+            action.target = None
+        with self.assertRaises(AttributeError):
+            action.requ_content_type = "application/json"
+
+        # Actions built by hand stay writable
+        action = Action()
+        action.target = None
@@ -0,0 +1,136 @@
+"""Tests for the ramlwrap mock server."""
+import asyncio
+import json
+import os
+import sys
+
+from http import HTTPStatus
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import SimpleTestCase
+
+from ramlwrap.utils.mock import MockServer
+
+
+def _wsgi_get(app, path, method="GET", headers=None):
+    """Call the WSGI application and return the status, headers and body."""
+
+    environ = {"REQUEST_METHOD": method, "PATH_INFO": path}
+    for name, value in (headers or {}).items():
+        environ["HTTP_%s" % name.upper().replace("-", "_")] = value
+
+    started = {}
+
+    def start_response(status, response_headers):
+        started["status"] = status
+        started["headers"] = dict(response_headers)
+
+    body = b"".join(app(environ, start_response))
+    return started["status"], started["headers"], body
+
+
+class MockServerTestCase(SimpleTestCase):
+    """TestCase for the standalone mock server."""
+
+    def setUp(self):
+        self.app = MockServer("RamlWrapTest/tests/fixtures/raml/test.raml")
+
+    def test_example_returned(self):
+        """Test that the 200 example is returned by default."""
+
+        status, headers, body = _wsgi_get(self.app, "/api/3")
+        self.assertEqual("200 OK", status)
+        self.assertEqual("application/json", headers["Content-Type"])
+        self.assertEqual(str(len(body)), headers["Content-Length"])
+        self.assertEqual({"exampleData": "You just made a GET!"}, json.loads(body.decode("utf-8")))
+
+    def test_example_bytes_are_precomputed(self):
+        """Test that the same encoded bytes are returned for every request."""
+
+        body_one = _wsgi_get(self.app, "/api/3")[2]
+        body_two = _wsgi_get(self.app, "/api/3")[2]
+        self.assertIs(body_one, body_two)
+
+    def test_included_example_returned(self):
+        """Test that examples loaded with !include are returned."""
+
+        status, _, body = _wsgi_get(self.app, "/api", method="POST")
+        self.assertEqual("200 OK", status)
+        self.assertEqual({"data": "value"}, json.loads(body.decode("utf-8")))
+
+    def test_not_found(self):
+        """Test that unknown paths return a 404."""
+
+        self.assertEqual("404 Not Found", _wsgi_get(self.app, "/not/a/path")[0])
+
+    def test_method_not_allowed(self):
+        """Test that undeclared methods return a 405 with the allowed methods."""
+
+        status, headers, _ = _wsgi_get(self.app, "/api/3", method="DELETE")
+        self.assertEqual("405 Method Not Allowed", status)
+        self.assertEqual("GET, POST", headers["Allow"])
+
+    def test_select_example_by_header(self):
+        """Test that the example header selects one of multiple examples."""
+
+        app = MockServer("RamlWrapTest/tests/fixtures/raml/ramlv1_tests.raml")
+
+        _, _, body = _wsgi_get(app, "/ramlv1-api/multi-example", headers={"X-Ramlwrap-Example": "two"})
+        self.assertEqual({"exampleData2": "This is a second example"}, json.loads(body.decode("utf-8")))
+
+        _, _, body = _wsgi_get(app, "/ramlv1-api/multi-example", headers={"X-Ramlwrap-Example": "one"})
+        self.assertEqual({"exampleData": "This is the first example response"}, json.loads(body.decode("utf-8")))
+
+        status, _, _ = _wsgi_get(app, "/ramlv1-api/multi-example", headers={"X-Ramlwrap-Example": "three"})
+        self.assertEqual("400 Bad Request", status)
+
+    def test_select_status_by_header(self):
+        """Test that the status header selects the response for that status code."""
+
+        app = MockServer("RamlWrapTest/tests/fixtures/raml/test_multiple_responses.raml")
+
+        status, _, body = _wsgi_get(app, "/api/first", method="POST", headers={"X-Ramlwrap-Status": "422"})
+        # The phrase for 422 depends on the python version
+        self.assertEqual("422 %s" % HTTPStatus(422).phrase, status)
+        self.assertEqual({"reason": "invalidManatee"}, json.loads(body.decode("utf-8")))
+
+        status, _, body = _wsgi_get(app, "/api/first", method="POST", headers={"X-Ramlwrap-Status": "204"})
+        self.assertEqual("204 No Content", status)
+        self.assertEqual(b"", body)
+
+        # Without a 200 the lowest declared status is the default
+        status, _, _ = _wsgi_get(app, "/api/second")
+        self.assertEqual("204 No Content", status)
+
+    def test_dynamic_urls(self):
+        """Test that dynamic url segments match any value."""
+
+        app = MockServer("RamlWrapTest/tests/fixtures/raml/test_dynamic.raml")
+
+        _, _, body = _wsgi_get(app, "/dynamicapi/anything/123")
+        self.assertEqual({"exampleData": "You just made a dynamic get request with 2 dynamic values!"},
+                         json.loads(body.decode("utf-8")))
+
+    def test_asgi(self):
+        """Test that the ASGI entry point returns the same response."""
+
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/3",
+            "headers": [(b"x-ramlwrap-status", b"200")],
+        }
+        asyncio.run(self.app.asgi(scope, receive, send))
+
+        self.assertEqual(200, sent[0]["status"])
+        self.assertIn((b"content-type", b"application/json"), sent[0]["headers"])
+        self.assertEqual({"exampleData": "You just made a GET!"}, json.loads(sent[1]["body"].decode("utf-8")))
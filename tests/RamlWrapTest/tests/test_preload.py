@@ -0,0 +1,73 @@
+"""Tests for preloading endpoints before forking workers."""
+import gc
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import SimpleTestCase
+from django.urls import get_resolver
+
+import ramlwrap
+from ramlwrap.utils.core import Request
+from ramlwrap.utils.preload import _collect_patterns, _schema_validators
+from ramlwrap.utils.schemas import SchemaValidator
+from ramlwrap.utils.wsgi import RamlApplication
+
+
+class PreloadTestCase(SimpleTestCase):
+    """TestCase for ramlwrap.preload."""
+
+    def test_preload_url_conf(self):
+        """Test that the endpoints in the url conf are found and built."""
+
+        count = ramlwrap.preload(freeze=False)
+
+        # One per resource with methods in the raml files RamlWrapTest.urls loads
+        self.assertGreater(count, 20)
+
+    def test_preload_application(self):
+        """Test that RamlApplication endpoints are frozen with their examples encoded."""
+
+        app = RamlApplication("RamlWrapTest/tests/fixtures/raml/test_binary_formats.raml", {})
+
+        ramlwrap.preload(app, freeze=False)
+
+        action = app.static_routes["binary-formats"].request_method_mapping["GET"]
+        self.assertIn("application/json", action.encoded_examples)
+        response = app.handle(Request("GET", "/binary-formats"))
+        self.assertIs(action.encoded_examples["application/json"], response.content)
+
+    def test_validators_compiled(self):
+        """Test that every schema validator is built with its generated check, those of sampled bodies included."""
+
+        app = RamlApplication("RamlWrapTest/tests/fixtures/raml/test_sampled_validation.raml",
+                              {"bulk": {"function": lambda request: None, "sampled_validation": True}})
+
+        ramlwrap.preload(app, freeze=False)
+
+        endpoints = list(app.static_routes.values())
+        _collect_patterns(get_resolver().url_patterns, endpoints)
+
+        validators = [validator for endpoint in endpoints for action in endpoint.request_method_mapping.values()
+                      for validator in _schema_validators(action)]
+        for validator in validators:
+            self.assertIsInstance(validator, SchemaValidator)
+            self.assertTrue(validator.check is None or callable(validator.check))
+        self.assertTrue(any(validator.check is not None for validator in validators))
+
+        # The whole bulk schema and the envelope validated without the sampled items
+        bulk = _schema_validators(app.static_routes["bulk"].request_method_mapping["POST"])
+        self.assertEqual(2, len(bulk))
+        self.assertTrue(all(callable(validator.check) for validator in bulk))
+
+    @unittest.skipUnless(hasattr(gc, "freeze"), "gc.freeze needs python 3.7")
+    def test_gc_frozen(self):
+        """Test that preload moves everything into the permanent generation."""
+
+        self.addCleanup(gc.unfreeze)
+
+        ramlwrap.preload()
+
+        self.assertGreater(gc.get_freeze_count(), 0)
@@ -0,0 +1,65 @@
+"""Tests for typed query parameters."""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import TestCase
+from jsonschema.exceptions import ValidationError
+
+from ramlwrap.utils.core import QueryDict
+from ramlwrap.utils.query import compile_query_parameters
+
+
+class TypedQueryTestCase(TestCase):
+    """TestCase for request.validated_query."""
+
+    def _validated_query(self, query_string):
+        response = self.client.get("/typed-query?%s" % query_string)
+        self.assertEqual(200, response.status_code)
+        return json.loads(response.content.decode("utf-8"))["validated_query"]
+
+    def test_typed_values(self):
+        """Test that values are converted to their declared types."""
+
+        self.assertEqual({"page": 3, "ratio": 0.5, "active": True, "name": "abc"},
+                         self._validated_query("page=3&ratio=0.5&active=true&name=abc"))
+
+    def test_defaults(self):
+        """Test that defaults are filled in and undeclared parameters left out."""
+
+        self.assertEqual({"page": 1}, self._validated_query("other=1"))
+
+    def test_repeated(self):
+        """Test that repeated parameters are lists, whether declared with [] or repeat."""
+
+        self.assertEqual({"page": 1, "tags": ["a", "b"], "ids": [1, 2]},
+                         self._validated_query("tags=a&tags=b&ids=1&ids=2"))
+
+    def test_invalid_values(self):
+        """Test that values that aren't of their declared type are rejected."""
+
+        for query_string in ("page=one", "page=1.5", "active=yes", "ids=1&ids=x"):
+            with self.assertRaises(ValidationError) as context:
+                self.client.get("/typed-query?%s" % query_string)
+            self.assertEqual("type", context.exception.validator)
+
+    def test_checks_still_run(self):
+        """Test that the queryParameters checks run before the conversion."""
+
+        with self.assertRaises(ValidationError) as context:
+            self.client.get("/typed-query?name=a")
+        self.assertEqual("minLength", context.exception.validator)
+
+    def test_core_query(self):
+        """Test parsing a core QueryDict, with a raml 1.0 array declaration."""
+
+        parser = compile_query_parameters({
+            "sizes": {"type": "array", "items": "number", "default": 1},
+            "flag": {"type": "boolean"},
+        })
+
+        self.assertEqual({"sizes": [1]}, parser.parse(QueryDict("")))
+        self.assertEqual({"sizes": [2, 2.5], "flag": False}, parser.parse(QueryDict("sizes=2&sizes=2.5&flag=false")))
+        self.assertIsNone(compile_query_parameters({}))
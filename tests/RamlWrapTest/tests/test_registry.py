@@ -0,0 +1,97 @@
+"""Tests for serving several raml files through one registry."""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import Resolver404
+
+from ramlwrap import Registry
+from ramlwrap.utils.exceptions import FatalException
+
+from RamlWrapTest.urls import function_map
+
+RAML_DIR = "RamlWrapTest/tests/fixtures/raml"
+
+
+class RegistryTestCase(SimpleTestCase):
+    """TestCase for Registry."""
+
+    def _registry(self, *names):
+        registry = Registry()
+        for name in names:
+            registry.add(os.path.join(RAML_DIR, name), function_map)
+        return registry
+
+    def test_resolve_across_specs(self):
+        """Test that one resolver serves the literal and dynamic urls of every raml file."""
+
+        registry = self._registry("test.raml", "test_dynamic.raml")
+        resolver = registry.urlpatterns[0]
+
+        match = resolver.resolve("api/1")
+        self.assertEqual("api/1", match.func.__self__.url)
+
+        match = resolver.resolve("dynamicapi/abc/123/api3")
+        self.assertEqual({"dynamic_id": "abc", "dynamic_id_2": "123"}, match.kwargs)
+        self.assertEqual(os.path.join(RAML_DIR, "test_dynamic.raml"), registry.source(match.func.__self__))
+
+        with self.assertRaises(Resolver404):
+            resolver.resolve("dynamicapi/123")
+
+    @override_settings(ROOT_URLCONF="RamlWrapTest.registry_urls", RAMLWRAP_VALIDATION_ERROR_HANDLER=None)
+    def test_served_through_django(self):
+        """Test that urls served by a registry answer requests through Django."""
+
+        response = self.client.get("/dynamicapi/abc/123/api3")
+        self.assertEqual(200, response.status_code)
+
+        response = self.client.post("/api", data="{}", content_type="application/json")
+        self.assertEqual(422, response.status_code)
+
+        response = self.client.get("/uri-parameters/orders/42")
+        self.assertEqual({"order_id": 42}, json.loads(response.content.decode("utf-8"))["dynamic_values"])
+        self.assertEqual(404, self.client.get("/uri-parameters/orders/abc").status_code)
+
+        response = self.client.get("/not-in-any-raml")
+        self.assertEqual(404, response.status_code)
+
+    def test_duplicate_resource(self):
+        """Test that a resource defined by two raml files is rejected."""
+
+        registry = self._registry("test.raml")
+
+        with self.assertRaises(FatalException):
+            registry.add(os.path.join(RAML_DIR, "test.raml"), function_map)
+
+        # Nothing from the rejected file was added
+        self.assertEqual([os.path.join(RAML_DIR, "test.raml")], registry.specs)
+        self.assertEqual(len(registry.router.endpoints), len(registry.urlpatterns[0].url_patterns))
+
+    def test_shadowed_resource(self):
+        """Test that a literal url also matched by a dynamic one is logged, and served."""
+
+        registry = self._registry("test_dynamic.raml")
+
+        with self.assertLogs("ramlwrap.utils.registry", "WARNING") as logs:
+            registry.add(os.path.join(RAML_DIR, "test_registry.raml"), {})
+
+        self.assertIn("dynamicapi/shadowed", logs.output[0])
+        endpoint, _ = registry.router.resolve("/dynamicapi/shadowed")
+        self.assertEqual(os.path.join(RAML_DIR, "test_registry.raml"), registry.source(endpoint))
+
+    def test_shared_include_cache(self):
+        """Test that a file included by several raml files is parsed once."""
+
+        registry = self._registry("test.raml", "test_registry.raml")
+
+        included = [filename for filename in registry.include_cache if filename.endswith("service_request.json")]
+        self.assertEqual(1, len(included))
+
+        first, _ = registry.router.resolve("api")
+        second, _ = registry.router.resolve("dynamicapi/shadowed")
+        first_handler = first.request_method_mapping["POST"].request_handlers["application/json"]
+        second_handler = second.request_method_mapping["POST"].request_handlers["application/json"]
+        self.assertIs(first_handler.validator, second_handler.validator)
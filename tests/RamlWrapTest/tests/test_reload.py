@@ -0,0 +1,201 @@
+"""Tests for hot reloading raml files."""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import TestCase, override_settings
+from django.test.client import RequestFactory
+from django.urls import Resolver404
+from django.urls.resolvers import RegexPattern, URLResolver
+
+from ramlwrap import ramlwrap
+from ramlwrap.utils.reload import HotReloader
+from ramlwrap.utils.yaml_include_loader import Loader
+
+RAML = """#%RAML 0.8
+---
+title: Hot reload
+/a:
+  post:
+    body:
+      application/json:
+        schema: !include schema.json
+/b:
+  get:
+    responses:
+      200:
+        body:
+          application/json:
+            example: |
+              {"b": 1}
+"""
+
+SCHEMA = {"type": "object", "required": ["name"]}
+
+URI_PARAMETERS_RAML = """#%RAML 0.8
+---
+title: Hot reload
+/orders/{order_id}:
+  uriParameters:
+    order_id:
+      type: integer
+  get:
+    responses:
+      200:
+        body:
+          application/json:
+            example: |
+              {"order": 1}
+"""
+
+
+@override_settings(RAMLWRAP_VALIDATION_ERROR_HANDLER=None)
+class HotReloadTestCase(TestCase):
+    """TestCase for HotReloader."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.raml_path = os.path.join(self.directory, "api.raml")
+        self.schema_path = os.path.join(self.directory, "schema.json")
+        self._mtime = 1000000000 * 10 ** 9
+
+        self._write(self.raml_path, RAML)
+        self._write(self.schema_path, json.dumps(SCHEMA))
+
+        self.reloader = HotReloader(self.raml_path, {})
+        self.resolver = URLResolver(RegexPattern(r"^/"), self.reloader.urlpatterns)
+
+    def _write(self, path, content):
+        with open(path, "w") as f:
+            f.write(content)
+        # Make sure the change is seen even on file systems with coarse timestamps
+        self._mtime += 10 ** 9
+        os.utime(path, ns=(self._mtime, self._mtime))
+
+    def _post_a(self, data):
+        request = RequestFactory().post("/a", data=json.dumps(data), content_type="application/json")
+        match = self.resolver.resolve("/a")
+        return match.func(request, *match.args, **match.kwargs)
+
+    def test_includes_tracked(self):
+        """Test that the loader records the files a raml includes."""
+
+        with open(self.raml_path) as f:
+            loader = Loader(f)
+            loader.get_single_data()
+            loader.dispose()
+
+        self.assertEqual({self.schema_path}, loader.includes)
+
+    def test_no_change(self):
+        """Test that nothing is reloaded while nothing changes."""
+
+        self.assertFalse(self.reloader.check())
+        self.assertEqual(["/a", "/b"], self.reloader.rebuilt)
+
+    def test_include_change_rebuilds_only_its_endpoint(self):
+        """Test that changing an include rebuilds only the endpoint using it, behind the same pattern."""
+
+        self.assertEqual(422, self._post_a({}).status_code)
+        pattern = self.reloader.urlpatterns[0]
+        endpoint_a, endpoint_b = self.reloader.endpoints
+
+        self._write(self.schema_path, json.dumps({"type": "object"}))
+        self.assertTrue(self.reloader.check())
+
+        self.assertEqual(["/a"], self.reloader.rebuilt)
+        self.assertIs(pattern, self.reloader.urlpatterns[0])
+        self.assertIsNot(endpoint_a, self.reloader.endpoints[0])
+        self.assertIs(endpoint_b, self.reloader.endpoints[1])
+        self.assertEqual(200, self._post_a({}).status_code)
+
+        # The previous endpoint is untouched for requests still using it
+        self.assertEqual(422, endpoint_a.serve(
+            RequestFactory().post("/a", data="{}", content_type="application/json")).status_code)
+
+    def test_resources_added_and_removed(self):
+        """Test that new resources are served and removed ones are not."""
+
+        schema = self.reloader._include_cache[self.schema_path][1]
+
+        self._write(self.raml_path, RAML.replace("/b:", "/c:"))
+        self.assertTrue(self.reloader.check())
+
+        # The unchanged include was not parsed again
+        self.assertIs(schema, self.reloader._include_cache[self.schema_path][1])
+
+        self.assertEqual(["/c"], self.reloader.rebuilt)
+        self.assertEqual("c", self.resolver.resolve("/c").func.__self__.endpoint.url)
+        with self.assertRaises(Resolver404):
+            self.resolver.resolve("/b")
+
+    def test_broken_raml_keeps_serving(self):
+        """Test that a raml that can't be loaded leaves the previous endpoints in place."""
+
+        endpoints = self.reloader.endpoints
+        self._write(self.schema_path, "{not: [valid")
+
+        with self.assertLogs("ramlwrap", "ERROR"):
+            self.assertTrue(self.reloader.check())
+        self.assertEqual(endpoints, self.reloader.endpoints)
+
+        # Not retried until it changes again
+        self.assertFalse(self.reloader.check())
+
+        # Fixed back to what is being served, so nothing needs rebuilding
+        self._write(self.schema_path, json.dumps(SCHEMA))
+        self.assertTrue(self.reloader.check())
+        self.assertEqual([], self.reloader.rebuilt)
+        self.assertEqual(422, self._post_a({}).status_code)
+
+    def test_uri_parameter_type_change(self):
+        """Test that changing the type of a uriParameter changes the url the endpoint is served on."""
+
+        raml_path = os.path.join(self.directory, "orders.raml")
+        self._write(raml_path, URI_PARAMETERS_RAML)
+        reloader = HotReloader(raml_path, {})
+        resolver = URLResolver(RegexPattern(r"^/"), reloader.urlpatterns)
+
+        resolver.resolve("/orders/1")
+        with self.assertRaises(Resolver404):
+            resolver.resolve("/orders/abc")
+
+        self._write(raml_path, URI_PARAMETERS_RAML.replace("type: integer", "type: string"))
+        self.assertTrue(reloader.check())
+
+        self.assertEqual({"order_id": "abc"}, resolver.resolve("/orders/abc").kwargs)
+        self.assertIs(reloader.endpoints[0], resolver.resolve("/orders/abc").func.__self__.endpoint)
+
+    def test_ramlwrap_hot_reload(self):
+        """Test that ramlwrap() returns a single live pattern when hot reloading."""
+
+        patterns = ramlwrap(self.raml_path, {}, hot_reload=True)
+        reloader = patterns[0].url_patterns.reloader
+        self.addCleanup(reloader.stop)
+
+        self.assertEqual(1, len(patterns))
+        self.assertEqual(2, len(patterns[0].url_patterns))
+        self.assertTrue(reloader._thread.is_alive())
+
+    def test_stop(self):
+        """Test that stopping ends the polling thread and changes are no longer picked up."""
+
+        self.reloader.start(0.01)
+        thread = self.reloader._thread
+        self.reloader.stop()
+
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(self.reloader._thread)
+
+        self._write(self.schema_path, json.dumps({"type": "object"}))
+        time.sleep(0.05)
+        self.assertEqual(422, self._post_a({}).status_code)
+
+        # Stopping again does nothing
+        self.reloader.stop()
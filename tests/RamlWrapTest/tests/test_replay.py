@@ -0,0 +1,86 @@
+"""Tests for replaying recorded traffic."""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import TestCase, override_settings
+
+from RamlWrapTest.urls import function_map
+from ramlwrap.utils.replay import Replayer, compare, diff_outcomes, load_log, load_outcomes, replay_sharded
+
+RAML = "RamlWrapTest/tests/fixtures/raml/test_binary_formats.raml"
+RAML_V2 = "RamlWrapTest/tests/fixtures/raml/test_replay.raml"
+
+LOG = [
+    {"method": "POST", "path": "/binary-formats", "headers": {"Content-Type": "application/json"},
+     "body": '{"name": "a"}'},
+    {"method": "post", "path": "/binary-formats", "headers": {"Content-Type": "application/json"},
+     "body": '{"count": 1}'},
+    {"method": "GET", "path": "/binary-formats?x=1", "headers": {"Accept": "application/json"}},
+    {"method": "POST", "path": "/binary-formats", "headers": {"Content-Type": "application/json"},
+     "body": '{"name": "d", "count": 2}'},
+    {"method": "GET", "path": "/nowhere"},
+]
+
+
+@override_settings(RAMLWRAP_VALIDATION_ERROR_HANDLER=None)
+class ReplayTestCase(TestCase):
+    """TestCase for the replay harness."""
+
+    def setUp(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as f:
+            f.write("\n".join(json.dumps(record) for record in LOG) + "\n\n")
+        self.log_path = f.name
+        self.addCleanup(os.remove, f.name)
+
+    def test_replay(self):
+        """Test that each request is served and reported against its endpoint."""
+
+        report = Replayer(RAML, function_map).replay(load_log(self.log_path))
+
+        self.assertEqual([
+            (0, "POST", "/binary-formats", 200, None),
+            (1, "POST", "/binary-formats", 422, "required"),
+            (2, "GET", "/binary-formats?x=1", 200, None),
+            (3, "POST", "/binary-formats", 200, None),
+            (4, "GET", "/nowhere", 404, None),
+        ], report.outcomes)
+
+        summary = report.summary()
+        self.assertEqual(5, summary["requests"])
+        self.assertEqual(["<unresolved>", "binary-formats"], list(summary["endpoints"]))
+
+        endpoint = summary["endpoints"]["binary-formats"]
+        self.assertEqual(4, endpoint["requests"])
+        self.assertEqual({200: 3, 422: 1}, endpoint["statuses"])
+        self.assertTrue(0 < endpoint["p50"] <= endpoint["p90"] <= endpoint["p99"] <= endpoint["max"])
+        self.assertTrue(endpoint["throughput"] > 0)
+
+    def test_compare_specs(self):
+        """Test that replaying against a stricter spec reports the requests it now rejects."""
+
+        self.assertEqual([(0, "POST", "/binary-formats", (200, None), (422, "required")),
+                          (2, "GET", "/binary-formats?x=1", (200, None), (405, None))],
+                         compare(RAML, RAML_V2, function_map, self.log_path))
+
+    def test_saved_outcomes(self):
+        """Test that outcomes saved by one run can be diffed with a later run."""
+
+        report = Replayer(RAML, function_map).replay(load_log(self.log_path))
+        with tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False) as f:
+            pass
+        self.addCleanup(os.remove, f.name)
+        report.save_outcomes(f.name)
+
+        self.assertEqual([], diff_outcomes(load_outcomes(f.name), report.outcomes))
+
+    def test_sharded(self):
+        """Test that a sharded replay covers every request once."""
+
+        report = replay_sharded(RAML, function_map, self.log_path, 2)
+
+        self.assertEqual([0, 1, 2, 3, 4], [outcome[0] for outcome in report.outcomes])
+        self.assertEqual(4, report.endpoints["binary-formats"].requests)
@@ -0,0 +1,98 @@
+"""Tests for caching GET responses."""
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase
+
+from ramlwrap.utils.response_cache import cache_stats, compile_cache_policy, reset_cache_stats
+
+from RamlWrapTest.apis.test_apis import counting_api_calls
+
+
+class ResponseCacheTestCase(SimpleTestCase):
+    """TestCase for the response cache."""
+
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        del counting_api_calls[:]
+
+    def _calls(self, path, **extra):
+        response = self.client.get(path, **extra)
+        self.assertEqual(200, response.status_code)
+        return json.loads(response.content.decode("utf-8"))["calls"]
+
+    def test_cached(self):
+        """Test that the target is only called once for the same request."""
+
+        self.assertEqual(1, self._calls("/cached"))
+        self.assertEqual(1, self._calls("/cached"))
+        self.assertEqual({"hits": 1, "misses": 1, "stores": 1, "waits": 0}, cache_stats()["cached"])
+
+        response = self.client.get("/cached")
+        self.assertEqual("application/json", response["Content-Type"])
+        self.assertIn("Accept-Language", response["Vary"])
+
+    def test_key(self):
+        """Test that the typed query, dynamic values and vary headers are part of the key."""
+
+        self.assertEqual(1, self._calls("/cached"))
+        # The same typed query
+        self.assertEqual(1, self._calls("/cached?page=1"))
+        self.assertEqual(2, self._calls("/cached?page=2"))
+        self.assertEqual(3, self._calls("/cached", HTTP_ACCEPT_LANGUAGE="fr"))
+        self.assertEqual(3, self._calls("/cached", HTTP_ACCEPT_LANGUAGE="fr"))
+
+        self.assertEqual(4, self._calls("/cached/1"))
+        self.assertEqual(5, self._calls("/cached/2"))
+        self.assertEqual(4, self._calls("/cached/1"))
+
+    def test_function_map(self):
+        """Test that the function map turns caching on and off."""
+
+        self.assertEqual(1, self._calls("/cached-by-map"))
+        self.assertEqual(1, self._calls("/cached-by-map"))
+
+        self.assertEqual(2, self._calls("/not-cached"))
+        self.assertEqual(3, self._calls("/not-cached"))
+
+    def test_only_get_and_success(self):
+        """Test that only successful GET responses are cached."""
+
+        self.assertEqual(1, json.loads(self.client.post("/cached").content.decode("utf-8"))["calls"])
+        self.assertEqual(2, json.loads(self.client.post("/cached").content.decode("utf-8"))["calls"])
+
+        self.assertEqual(500, self.client.get("/cached?fail=1").status_code)
+        self.assertEqual(500, self.client.get("/cached?fail=1").status_code)
+        self.assertEqual(4, len(counting_api_calls))
+
+    def test_stampede(self):
+        """Test that concurrent requests for an uncached response call the target once."""
+
+        results = []
+
+        def get():
+            results.append(json.loads(Client().get("/cached?slow=1").content.decode("utf-8"))["calls"])
+
+        threads = [threading.Thread(target=get) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([1, 1, 1], results)
+        self.assertEqual(1, len(counting_api_calls))
+        self.assertEqual(2, cache_stats()["cached"]["waits"])
+
+    def test_policy(self):
+        """Test building policies from annotations."""
+
+        self.assertIsNone(compile_cache_policy("path", None))
+        policy = compile_cache_policy("path", 30, ["application/json", "application/msgpack"])
+        self.assertEqual(30, policy.ttl)
+        self.assertEqual(("Accept",), policy.vary)
@@ -0,0 +1,91 @@
+"""Tests for ramlwrap response validation."""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import TestCase, Client, override_settings
+
+from jsonschema.exceptions import ValidationError
+
+from ramlwrap.utils.raml import raml_url_patterns
+from RamlWrapTest.utils import validation_handler
+
+HANDLER = "RamlWrapTest.utils.validation_handler.record_response_validation_failure"
+
+
+@override_settings(RAMLWRAP_RESPONSE_VALIDATION_HANDLER=HANDLER)
+class ResponseValidationTestCase(TestCase):
+    """TestCase for validating responses against their raml schema."""
+
+    client = None
+
+    def setUp(self):
+        self.client = Client()
+        del validation_handler.response_validation_failures[:]
+
+    def test_response_schemas_are_parsed(self):
+        """Test that the response schema of each status code is kept on the action."""
+
+        patterns = raml_url_patterns("RamlWrapTest/tests/fixtures/raml/test_multiple_responses.raml", {})
+        for pattern in patterns:
+            endpoint = pattern.callback.__self__
+            if endpoint.url == "api/first":
+                self.assertEqual({200: {"schema": "example"}},
+                                 endpoint.request_method_mapping["POST"].response_schemas)
+
+    def test_response_validation_disabled_by_default(self):
+        """Test that no response is validated when no rate is set."""
+
+        response = self.client.get("/response-validation/invalid")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([], validation_handler.response_validation_failures)
+
+    @override_settings(RAMLWRAP_RESPONSE_VALIDATION_RATE=1)
+    def test_invalid_response_calls_handler(self):
+        """Test that an invalid response is sent unchanged and reported to the handler."""
+
+        response = self.client.get("/response-validation/invalid")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({"notData": 1}, json.loads(response.content.decode("utf-8")))
+
+        self.assertEqual(1, len(validation_handler.response_validation_failures))
+        e, request, action, failed_response = validation_handler.response_validation_failures[0]
+        self.assertTrue(isinstance(e, ValidationError))
+        self.assertEqual("required", e.validator)
+        self.assertEqual("/response-validation/invalid", request.path)
+        self.assertIs(response, failed_response)
+
+    @override_settings(RAMLWRAP_RESPONSE_VALIDATION_RATE=1)
+    def test_valid_response_does_not_call_handler(self):
+        """Test that a response matching its schema is not reported."""
+
+        response = self.client.get("/response-validation/valid")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([], validation_handler.response_validation_failures)
+
+    @override_settings(RAMLWRAP_RESPONSE_VALIDATION_RATE=0.5)
+    def test_sample_rate(self):
+        """Test that only a sample of the responses are validated."""
+
+        for _ in range(200):
+            self.client.get("/response-validation/invalid")
+
+        failures = len(validation_handler.response_validation_failures)
+        self.assertTrue(0 < failures < 200)
+
+    def test_function_map_rate_overrides_settings(self):
+        """Test that the rate set in the function map is used over the setting."""
+
+        response = self.client.get("/response-validation/sampled")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, len(validation_handler.response_validation_failures))
+
+    @override_settings(RAMLWRAP_RESPONSE_VALIDATION_RATE=1, RAMLWRAP_RESPONSE_VALIDATION_HANDLER=None)
+    def test_failure_logged_without_handler(self):
+        """Test that a failure is logged when there is no handler."""
+
+        with self.assertLogs("ramlwrap", level="WARNING"):
+            response = self.client.get("/response-validation/invalid")
+        self.assertEqual(200, response.status_code)
@@ -0,0 +1,149 @@
+"""Tests for validating a sample of the items of large arrays."""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import SimpleTestCase, override_settings
+
+from jsonschema.exceptions import ValidationError
+
+from ramlwrap.utils.sampling import SampledValidator, SamplingPolicy, compile_sampling
+from ramlwrap.utils.schemas import SchemaValidator, ValidationErrors
+from ramlwrap.utils.validation_cache import get_validation_cache
+
+
+def _records(count, invalid=()):
+    return [{"id": i, "name": 1 if i in invalid else "name"} for i in range(count)]
+
+
+def _sampled(schema, first=2, rate=0):
+    return SampledValidator(SchemaValidator(schema), SamplingPolicy(first, rate))
+
+
+@override_settings(RAMLWRAP_VALIDATION_ERROR_HANDLER=None)
+class SampledValidationTestCase(SimpleTestCase):
+    """TestCase for endpoints sampling the items of their large arrays."""
+
+    def _post(self, data):
+        return self.client.post("/bulk", data=json.dumps(data), content_type="application/json")
+
+    def test_small_arrays_validated_in_full(self):
+        """Test that arrays no longer than the items always validated are not sampled."""
+
+        response = self._post({"batch": "a", "records": _records(10)})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({"sampled": False, "arrays": {}}, response.json()["validated_data_meta"])
+
+    def test_large_arrays_sampled(self):
+        """Test that the first items and a sample of the rest of large arrays are validated."""
+
+        response = self._post({"batch": "a", "records": _records(1000)})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({"sampled": True, "arrays": {"$.records": {"length": 1000, "validated": 10 + 99}}},
+                         response.json()["validated_data_meta"])
+
+    def test_first_items_always_validated(self):
+        """Test that an invalid item among the first ones is always found."""
+
+        response = self._post({"batch": "a", "records": _records(1000, invalid=[9])})
+        self.assertEqual(422, response.status_code)
+
+    def test_envelope_validated_in_full(self):
+        """Test that everything but the array items is validated in full."""
+
+        response = self._post({"records": _records(1000)})
+        self.assertEqual(422, response.status_code)
+        self.assertEqual("required", response.json()["code"])
+
+    def test_sampled_items_validated(self):
+        """Test that invalid items beyond the first ones are found when sampled."""
+
+        response = self._post({"batch": "a", "records": _records(1000, invalid=range(10, 1000))})
+        self.assertEqual(422, response.status_code)
+        self.assertEqual("type", response.json()["code"])
+
+    @override_settings(RAMLWRAP_VALIDATION_CACHE_SIZE=16)
+    def test_not_cached(self):
+        """Test that sampled outcomes are not replayed from the validation cache."""
+
+        cache = get_validation_cache()
+        cache.clear()
+        body = {"batch": "a", "records": _records(20)}
+        for _ in range(2):
+            self.assertTrue(self._post(body).json()["validated_data_meta"]["sampled"])
+        self.assertEqual(0, len(cache))
+
+    def test_unsampled_items_not_validated(self):
+        """Test that items outside the sample are not validated, and the meta says how many were."""
+
+        validator = _sampled({"type": "array", "items": {"type": "integer"}})
+        self.assertEqual({"$": {"length": 5, "validated": 2}}, validator.validate([1, 2, "3", "4", "5"]))
+
+        with self.assertRaises(ValidationError):
+            validator.validate([1, "2", 3, 4, 5])
+
+    def test_array_keywords_validated_in_full(self):
+        """Test that keywords on the whole array still see every item."""
+
+        validator = _sampled({"type": "array", "maxItems": 4, "uniqueItems": True, "items": {"type": "integer"}})
+        with self.assertRaises(ValidationError) as raised:
+            validator.validate([1, 2, 3, 4, 5])
+        self.assertEqual("maxItems", raised.exception.validator)
+
+        with self.assertRaises(ValidationError) as raised:
+            validator.validate([1, 2, 3, 3])
+        self.assertEqual("uniqueItems", raised.exception.validator)
+
+    def test_error_paths(self):
+        """Test that errors in sampled items are where they are in the whole body."""
+
+        schema = {
+            "type": "object",
+            "definitions": {"record": {"type": "object", "properties": {"name": {"type": "string"}}}},
+            "properties": {"records": {"type": "array", "items": {"$ref": "#/definitions/record"}}},
+        }
+        data = {"records": [{"name": 1}, {}, {}, {}]}
+
+        with self.assertRaises(ValidationErrors) as raised:
+            _sampled(schema, first=2, rate=1 / 3.0).validate(data, 5)
+        error, = raised.exception.errors
+        self.assertEqual(["records", 0, "name"], list(error.absolute_path))
+
+        # The same as validating in full
+        with self.assertRaises(ValidationErrors) as raised:
+            SchemaValidator(schema).validate(data, 5)
+        self.assertEqual(list(raised.exception.absolute_schema_path), list(error.absolute_schema_path))
+
+    def test_untraceable_arrays_validated_in_full(self):
+        """Test that arrays behind references or with keywords evaluating their items aren't sampled."""
+
+        for schema in ({"definitions": {"a": {"type": "array", "items": {"type": "integer"}}},
+                        "properties": {"a": {"$ref": "#/definitions/a"}}},
+                       {"type": "array", "items": {"type": "integer"}, "additionalItems": False},
+                       {"$schema": "http://json-schema.org/draft-07/schema#", "items": [{"type": "integer"}]}):
+            validator = _sampled(schema)
+            self.assertEqual([], validator.arrays)
+
+    def test_compile_sampling(self):
+        """Test the function map entry is turned into a policy."""
+
+        self.assertIsNone(compile_sampling(None))
+        self.assertIsNone(compile_sampling(False))
+
+        policy = compile_sampling(True)
+        self.assertEqual((None, None), (policy.first, policy.rate))
+        policy = compile_sampling({"first": 5, "rate": 0.5})
+        self.assertEqual((5, 0.5), (policy.first, policy.rate))
+
+        for config in ({"first": -1}, {"rate": 2}):
+            with self.assertRaises(ValueError):
+                compile_sampling(config)
+
+    @override_settings(RAMLWRAP_SAMPLED_VALIDATION_FIRST=3, RAMLWRAP_SAMPLED_VALIDATION_RATE=0)
+    def test_settings(self):
+        """Test that policies without their own limits use the settings."""
+
+        validator = SampledValidator(SchemaValidator({"items": {"type": "integer"}}), compile_sampling(True))
+        self.assertEqual({"$": {"length": 5, "validated": 3}}, validator.validate([1, 2, 3, "4", "5"]))
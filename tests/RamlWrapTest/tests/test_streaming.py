@@ -0,0 +1,156 @@
+"""Tests for streamed responses."""
+import asyncio
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import SimpleTestCase, override_settings
+
+from ramlwrap.utils.streaming import NDJSON, encode_stream, is_stream, stream_formats
+from ramlwrap.utils.wsgi import RamlApplication
+
+RAML = "RamlWrapTest/tests/fixtures/raml/test_streaming.raml"
+
+
+def _items(request):
+    """Stream two items."""
+    yield {"id": 0}
+    yield {"id": 1}
+
+
+async def _async_items(request):
+    """Stream two items from an async generator."""
+    for i in range(2):
+        await asyncio.sleep(0)
+        yield {"id": i}
+
+
+def _wsgi_chunks(app, path, accept=None):
+    """Call the WSGI application and return the headers and the chunks of the body."""
+
+    environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": "", "wsgi.input": io.BytesIO()}
+    if accept:
+        environ["HTTP_ACCEPT"] = accept
+
+    started = {}
+
+    def start_response(status, headers):
+        started["headers"] = dict(headers)
+
+    chunks = list(app(environ, start_response))
+    return started["headers"], chunks
+
+
+class StreamingTestCase(SimpleTestCase):
+    """TestCase for streaming the items of generator targets."""
+
+    def test_json_array(self):
+        """Test that a generator is streamed as a json array."""
+
+        response = self.client.get("/streamed", {"count": 3})
+        self.assertTrue(response.streaming)
+        self.assertEqual("application/json", response["Content-Type"])
+        self.assertEqual([{"id": 0}, {"id": 1}, {"id": 2}],
+                         json.loads(b"".join(response.streaming_content).decode("utf-8")))
+
+    def test_ndjson(self):
+        """Test that clients accepting newline delimited json get it."""
+
+        response = self.client.get("/streamed/ndjson", {"count": 2}, HTTP_ACCEPT="application/x-ndjson")
+        self.assertEqual("application/x-ndjson", response["Content-Type"])
+        self.assertEqual("Accept", response["Vary"])
+        self.assertEqual(b'{"id": 0}\n{"id": 1}\n', b"".join(response.streaming_content))
+
+        response = self.client.get("/streamed/ndjson", {"count": 2}, HTTP_ACCEPT="application/json")
+        self.assertEqual("application/json", response["Content-Type"])
+        self.assertEqual([{"id": 0}, {"id": 1}], json.loads(b"".join(response.streaming_content).decode("utf-8")))
+
+    def test_empty(self):
+        """Test that a stream without items is sent as an empty body, or an empty json array."""
+
+        response = self.client.get("/streamed/empty")
+        self.assertEqual(b"", b"".join(response.streaming_content))
+
+        response = self.client.get("/streamed", {"count": 0})
+        self.assertEqual([], json.loads(b"".join(response.streaming_content).decode("utf-8")))
+
+    @override_settings(RAMLWRAP_STREAM_CHUNK_SIZE=100)
+    def test_chunks(self):
+        """Test that items are sent in chunks of about the chunk size rather than all at once."""
+
+        response = self.client.get("/streamed", {"count": 100})
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 5)
+        self.assertTrue(all(len(chunk) < 120 for chunk in chunks))
+        self.assertEqual(list(range(100)), [item["id"] for item in json.loads(b"".join(chunks).decode("utf-8"))])
+
+    def test_stream_closed(self):
+        """Test that the items are closed when the stream is, e.g. when the client disconnects."""
+
+        closed = []
+
+        def items():
+            try:
+                for i in range(1000):
+                    yield {"id": i}
+            finally:
+                closed.append(True)
+
+        stream = encode_stream(items(), stream_formats([NDJSON])[0][1], chunk_size=10)
+        next(stream)
+        stream.close()
+        self.assertEqual([True], closed)
+
+    def test_is_stream(self):
+        """Test that only iterators are streamed, not lists or dicts."""
+
+        self.assertTrue(is_stream(iter([])))
+        self.assertTrue(is_stream(_async_items(None)))
+        self.assertFalse(is_stream([{"id": 0}]))
+        self.assertFalse(is_stream({"id": 0}))
+
+    def test_wsgi(self):
+        """Test that the WSGI entry point streams the chunks, without a Content-Length."""
+
+        app = RamlApplication(RAML, {"streamed/ndjson": {"function": _items}})
+        headers, chunks = _wsgi_chunks(app, "/streamed/ndjson", accept="application/x-ndjson")
+        self.assertNotIn("Content-Length", headers)
+        self.assertEqual("application/x-ndjson", headers["Content-Type"])
+        self.assertEqual(b'{"id": 0}\n{"id": 1}\n', b"".join(chunks))
+
+    def test_wsgi_async_generator(self):
+        """Test that the WSGI entry point runs async generators on a loop of its own."""
+
+        app = RamlApplication(RAML, {"streamed": {"function": _async_items}})
+        _, chunks = _wsgi_chunks(app, "/streamed")
+        self.assertEqual([{"id": 0}, {"id": 1}], json.loads(b"".join(chunks).decode("utf-8")))
+
+    def test_asgi_async_generator(self):
+        """Test that the ASGI entry point streams the items of an async generator."""
+
+        app = RamlApplication(RAML, {"streamed/ndjson": {"function": _async_items}})
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/streamed/ndjson",
+            "query_string": b"",
+            "headers": [(b"accept", b"application/x-ndjson")],
+        }
+        asyncio.run(app.asgi(scope, receive, send))
+
+        self.assertEqual(200, sent[0]["status"])
+        self.assertNotIn(b"content-length", dict(sent[0]["headers"]))
+        self.assertTrue(all(message["more_body"] for message in sent[1:-1]))
+        self.assertFalse(sent[-1].get("more_body", False))
+        self.assertEqual(b'{"id": 0}\n{"id": 1}\n', b"".join(message["body"] for message in sent[1:]))
@@ -0,0 +1,135 @@
+"""Tests for the aggregated telemetry of validation failures."""
+import logging
+import os
+import sys
+
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import SimpleTestCase, override_settings
+
+from jsonschema.exceptions import ValidationError
+
+from ramlwrap.utils import telemetry
+from ramlwrap.utils.core import Action
+from ramlwrap.utils.telemetry import FailureAggregator, flush_validation_failures, record_validation_failure, \
+    reset_validation_failures, validation_failures
+from RamlWrapTest.utils import validation_handler
+
+HANDLER = "RamlWrapTest.utils.validation_handler.record_validation_telemetry"
+
+
+@override_settings(RAMLWRAP_VALIDATION_ERROR_HANDLER=None, RAMLWRAP_VALIDATION_TELEMETRY_HANDLER=None)
+class ValidationTelemetryTestCase(SimpleTestCase):
+    """TestCase for counting validation failures instead of logging each of them."""
+
+    def setUp(self):
+        reset_validation_failures()
+        del validation_handler.validation_telemetry_reports[:]
+
+    def test_failures_counted_not_logged(self):
+        """Test that failed requests are counted by endpoint, method, validator and path, without a log line each."""
+
+        records = []
+        handler = logging.Handler(logging.INFO)
+        handler.emit = records.append
+        ramlwrap_logger = logging.getLogger("ramlwrap")
+        level = ramlwrap_logger.level
+        ramlwrap_logger.addHandler(handler)
+        ramlwrap_logger.setLevel(logging.INFO)
+        try:
+            for _ in range(5):
+                response = self.client.post("/api", data="{}", content_type="application/json")
+                self.assertEqual(422, response.status_code)
+        finally:
+            ramlwrap_logger.removeHandler(handler)
+            ramlwrap_logger.setLevel(level)
+        self.assertEqual([], [record.getMessage() for record in records])
+
+        self.assertEqual([{
+            "resource": "api",
+            "method": "POST",
+            "validator": "required",
+            "path": "$",
+            "count": 5,
+            "samples": ["'data' is a required property"] * 3,
+        }], validation_failures())
+
+    def test_flushed_at_exit(self):
+        """Test that the failures are flushed at exit, registered by the first failure rather than on import."""
+
+        with mock.patch.object(telemetry, "_flush_at_exit", False), \
+                mock.patch("ramlwrap.utils.telemetry.atexit.register") as register:
+            for _ in range(2):
+                record_validation_failure(None, ValidationError("Invalid", validator="type"))
+        register.assert_called_once_with(flush_validation_failures)
+
+    def test_query_failures_counted(self):
+        """Test that query parameters failing their checks are counted as well."""
+
+        with self.assertRaises(ValidationError):
+            self.client.get("/api/3", {"param2": "abc"})
+
+        failure, = validation_failures()
+        self.assertEqual(("api/3", "GET", "minLength"),
+                         (failure["resource"], failure["method"], failure["validator"]))
+
+    def test_json_path(self):
+        """Test that failures are keyed on where in the body they are."""
+
+        action = Action()
+        action.resource = "orders"
+        action.method = "POST"
+        for path in (["items", 0, "sku"], ["items", 1, "sku"], ["items", 0, "sku"]):
+            record_validation_failure(action, ValidationError("'sku' is not a string", validator="type", path=path))
+
+        self.assertEqual([("$.items[0].sku", 2), ("$.items[1].sku", 1)],
+                         [(failure["path"], failure["count"]) for failure in validation_failures()])
+
+    @override_settings(RAMLWRAP_VALIDATION_TELEMETRY_HANDLER=HANDLER)
+    def test_flush_to_handler(self):
+        """Test that flushing passes the counts to the handler and starts counting again."""
+
+        self.client.post("/api", data="{}", content_type="application/json")
+        report = flush_validation_failures()
+
+        self.assertEqual([report], validation_handler.validation_telemetry_reports)
+        self.assertEqual(1, report[0]["count"])
+        self.assertEqual([], validation_failures())
+
+        # Nothing to report
+        flush_validation_failures()
+        self.assertEqual(1, len(validation_handler.validation_telemetry_reports))
+
+    @override_settings(RAMLWRAP_VALIDATION_TELEMETRY_HANDLER=HANDLER, RAMLWRAP_VALIDATION_TELEMETRY_INTERVAL=0)
+    def test_interval(self):
+        """Test that the counts are reported once the interval has passed."""
+
+        self.client.post("/api", data="{}", content_type="application/json")
+        self.client.post("/api", data="{}", content_type="application/json")
+        self.assertEqual(2, len(validation_handler.validation_telemetry_reports))
+
+    def test_flush_logged(self):
+        """Test that without a handler the counts are logged, one line per key."""
+
+        self.client.post("/api", data="{}", content_type="application/json")
+        self.client.post("/api", data="{}", content_type="application/json")
+
+        with self.assertLogs("ramlwrap.utils.telemetry", "INFO") as logs:
+            flush_validation_failures()
+        self.assertEqual(1, len(logs.output))
+        self.assertIn("Validation failed 2 times for [POST] api: [required] at $", logs.output[0])
+
+    def test_max_keys(self):
+        """Test that failures beyond the number of keys kept are only counted as dropped."""
+
+        aggregator = FailureAggregator(max_keys=1)
+        aggregator.record("a", "GET", "type", "$", "message")
+        aggregator.record("b", "GET", "type", "$", "message")
+        aggregator.record("a", "GET", "type", "$", "message")
+
+        with self.assertLogs("ramlwrap.utils.telemetry", "WARNING") as logs:
+            report = aggregator.flush()
+        self.assertEqual([("a", 2)], [(failure["resource"], failure["count"]) for failure in report])
+        self.assertIn("1 validation failures were not counted", logs.output[-1])
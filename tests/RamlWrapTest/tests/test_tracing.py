@@ -0,0 +1,147 @@
+"""Tests for tracing the phases of serving a request."""
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import SimpleTestCase, override_settings
+
+from jsonschema.exceptions import ValidationError
+
+from ramlwrap.utils.core import Request
+from ramlwrap.utils.decoders import is_installed
+from ramlwrap.utils.tracing import InMemoryTracer, NoopTracer, OpenTelemetryTracer, get_tracer, set_tracer
+from ramlwrap.utils.wsgi import RamlApplication
+
+
+@override_settings(RAMLWRAP_VALIDATION_ERROR_HANDLER=None)
+class TracingTestCase(SimpleTestCase):
+    """TestCase for the spans of each request."""
+
+    def setUp(self):
+        self.tracer = InMemoryTracer()
+        set_tracer(self.tracer)
+
+    def tearDown(self):
+        set_tracer(None)
+
+    def test_phases(self):
+        """Test that a request span is opened with a child span for each phase."""
+
+        body = json.dumps({"name": "value"})
+        response = self.client.post("/decoders", data=body, content_type="application/json")
+        self.assertEqual(200, response.status_code)
+
+        request_span, = self.tracer.finished("ramlwrap.request")
+        self.assertEqual(["ramlwrap.query", "ramlwrap.decode", "ramlwrap.validate", "ramlwrap.target",
+                          "ramlwrap.render", "ramlwrap.request"], [span.name for span in self.tracer.finished()])
+        for span in self.tracer.finished():
+            if span is not request_span:
+                self.assertIs(request_span, span.parent)
+            self.assertGreaterEqual(span.duration, 0)
+
+        self.assertEqual({
+            "ramlwrap.resource": "decoders",
+            "http.request.method": "POST",
+            "http.request.body.size": len(body),
+            "ramlwrap.validation": "valid",
+            "http.response.status_code": 200,
+        }, request_span.attributes)
+
+    def test_invalid_body(self):
+        """Test that a body failing its schema is recorded on the spans."""
+
+        response = self.client.post("/api", data="{}", content_type="application/json")
+        self.assertEqual(422, response.status_code)
+
+        request_span, = self.tracer.finished("ramlwrap.request")
+        self.assertEqual("invalid", request_span.attributes["ramlwrap.validation"])
+        self.assertEqual(422, request_span.attributes["http.response.status_code"])
+
+        validate_span, = self.tracer.finished("ramlwrap.validate")
+        self.assertIsInstance(validate_span.error, ValidationError)
+        self.assertEqual([], self.tracer.finished("ramlwrap.target"))
+
+    def test_invalid_query(self):
+        """Test that a query failing its checks is recorded on the spans."""
+
+        with self.assertRaises(ValidationError):
+            self.client.get("/api/3")
+
+        query_span, = self.tracer.finished("ramlwrap.query")
+        self.assertIsInstance(query_span.error, ValidationError)
+        request_span, = self.tracer.finished("ramlwrap.request")
+        self.assertEqual("invalid", request_span.attributes["ramlwrap.validation"])
+        self.assertIsInstance(request_span.error, ValidationError)
+
+    def test_method_not_allowed(self):
+        """Test that requests with a method the endpoint doesn't serve still get a span."""
+
+        response = self.client.put("/api")
+        self.assertEqual(405, response.status_code)
+
+        request_span, = self.tracer.finished()
+        self.assertEqual("PUT", request_span.attributes["http.request.method"])
+        self.assertEqual(405, request_span.attributes["http.response.status_code"])
+
+    def test_wsgi(self):
+        """Test that requests served without Django are traced the same way."""
+
+        app = RamlApplication("RamlWrapTest/tests/fixtures/raml/test.raml", {})
+        response = app.handle(Request("POST", "/api", {}, body=b'{"data": "value"}', content_type="application/json"))
+        self.assertEqual(200, response.status_code)
+
+        request_span, = self.tracer.finished("ramlwrap.request")
+        self.assertEqual("valid", request_span.attributes["ramlwrap.validation"])
+        self.assertEqual(200, request_span.attributes["http.response.status_code"])
+        self.assertEqual(1, len(self.tracer.finished("ramlwrap.target")))
+
+    def test_clear(self):
+        """Test that the in-memory tracer can forget its spans."""
+
+        self.client.put("/api")
+        self.tracer.clear()
+        self.assertEqual([], self.tracer.finished())
+
+    def test_off_by_default(self):
+        """Test that nothing is traced until a tracer is set."""
+
+        set_tracer(None)
+        self.assertIsInstance(get_tracer(), NoopTracer)
+
+        with get_tracer().span("ramlwrap.request", {"a": 1}) as span:
+            span.set_attribute("b", 2)
+        self.assertIs(span, get_tracer().current_span())
+        self.assertEqual([], self.tracer.finished())
+
+
+@unittest.skipUnless(is_installed("opentelemetry") and is_installed("opentelemetry.sdk"),
+                     "opentelemetry is not installed")
+class OpenTelemetryTracerTestCase(SimpleTestCase):
+    """TestCase for adding the spans to opentelemetry traces."""
+
+    def tearDown(self):
+        set_tracer(None)
+
+    def test_spans_nested_under_current(self):
+        """Test that the request span is a child of the current opentelemetry span."""
+
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        tracer = provider.get_tracer("test")
+        set_tracer(OpenTelemetryTracer(tracer))
+
+        with tracer.start_as_current_span("outer") as outer:
+            self.client.post("/api", data=json.dumps({"data": "value"}), content_type="application/json")
+
+        spans = dict((span.name, span) for span in exporter.get_finished_spans())
+        self.assertEqual(outer.get_span_context().span_id, spans["ramlwrap.request"].parent.span_id)
+        self.assertEqual(spans["ramlwrap.request"].context.span_id, spans["ramlwrap.target"].parent.span_id)
+        self.assertEqual("valid", spans["ramlwrap.request"].attributes["ramlwrap.validation"])
@@ -0,0 +1,81 @@
+"""Tests for url matchers built from uriParameters."""
+import json
+import os
+import sys
+
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import TestCase
+
+from ramlwrap.utils.raml import raml_endpoints
+from ramlwrap.utils.uri import uri_parameter_regex
+
+
+class UriParametersTestCase(TestCase):
+    """TestCase for uriParameters."""
+
+    def _get(self, path):
+        response = self.client.get(path)
+        if response.status_code != 200:
+            return response.status_code
+        return json.loads(response.content.decode("utf-8"))
+
+    def test_integer(self):
+        """Test that an integer parameter only matches integers, and is passed as an int."""
+
+        self.assertEqual({"dynamic_values": {"order_id": 42}, "types": {"order_id": "int"}},
+                         self._get("/uri-parameters/orders/42"))
+        self.assertEqual(404, self._get("/uri-parameters/orders/abc"))
+
+    def test_inherited(self):
+        """Test that child resources use the uriParameters of their parents."""
+
+        self.assertEqual({"dynamic_values": {"order_id": -1, "item": "pear"},
+                          "types": {"order_id": "int", "item": "str"}},
+                         self._get("/uri-parameters/orders/-1/items/pear"))
+        self.assertEqual(404, self._get("/uri-parameters/orders/1/items/plum"))
+
+    def test_boolean_and_number(self):
+        """Test boolean and number parameters."""
+
+        self.assertEqual({"dynamic_values": {"flag": True, "ratio": 0.5}, "types": {"flag": "bool", "ratio": "float"}},
+                         self._get("/uri-parameters/flags/true/0.5"))
+        self.assertEqual(404, self._get("/uri-parameters/flags/yes/1"))
+
+    def test_pattern_and_length(self):
+        """Test that the pattern and length of a string parameter are both applied."""
+
+        self.assertEqual({"code": "ABC"}, self._get("/uri-parameters/codes/ABC")["dynamic_values"])
+        self.assertEqual(404, self._get("/uri-parameters/codes/abc"))
+        self.assertEqual(404, self._get("/uri-parameters/codes/ABCD"))
+
+        self.assertEqual({"length": "abc"}, self._get("/uri-parameters/lengths/abc")["dynamic_values"])
+        self.assertEqual(404, self._get("/uri-parameters/lengths/a"))
+        self.assertEqual(404, self._get("/uri-parameters/lengths/abcde"))
+
+    def test_function_map_regex_wins(self):
+        """Test that a regex in the function map is used over the uriParameters declaration."""
+
+        self.assertEqual({"name": "abcdef"}, self._get("/uri-parameters/names/abcdef")["dynamic_values"])
+        self.assertEqual(404, self._get("/uri-parameters/names/AB"))
+
+    def test_regex(self):
+        """Test the regexes built for declarations."""
+
+        self.assertEqual("(?P<id>[^/]+)", uri_parameter_regex("id", None))
+        self.assertEqual("(?P<id>a\\.b|c)", uri_parameter_regex("id", {"enum": ["a.b", "c"]}))
+        self.assertEqual("(?P<id>[^/]{0,5})", uri_parameter_regex("id", {"maxLength": 5}))
+
+    def test_declared_parameters_not_reported_unmapped(self):
+        """Test that urls whose parameters are all declared aren't reported as needing a function map regex."""
+
+        with mock.patch("ramlwrap.utils.raml.logger") as logger:
+            raml_endpoints("RamlWrapTest/tests/fixtures/raml/test_uri_parameters.raml", {})
+        logger.error.assert_not_called()
+
+        # Undeclared ones still are
+        with mock.patch("ramlwrap.utils.raml.logger") as logger:
+            raml_endpoints("RamlWrapTest/tests/fixtures/raml/test_dynamic.raml", {})
+        self.assertIn("dynamicapi/{dynamic_id}", logger.error.call_args[0][0])
@@ -0,0 +1,149 @@
+"""Tests for the cache of request body validation outcomes."""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import TestCase, SimpleTestCase, Client, override_settings
+from jsonschema.exceptions import ValidationError
+
+from ramlwrap.utils.validation_cache import ValidationCache, copy_data, get_validation_cache
+
+
+class _CountingHandler:
+    """BodyHandler stand in counting its calls."""
+
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    def __call__(self, body, content_type):
+        self.calls += 1
+        if self.fail:
+            raise ValidationError("bad", validator="required")
+        return json.loads(body.decode("utf-8"))
+
+
+class ValidationCacheTestCase(SimpleTestCase):
+    """TestCase for the ValidationCache itself."""
+
+    def test_repeats_skip_the_handler(self):
+        """Test that a repeated body is decoded once and counted as a hit."""
+
+        cache = ValidationCache(10)
+        handler = _CountingHandler()
+
+        for _ in range(3):
+            self.assertEqual({"a": [1]}, cache.decode("action", handler, b'{"a": [1]}', "application/json"))
+
+        self.assertEqual(1, handler.calls)
+        self.assertEqual({"hits": 2, "misses": 1, "hit_rate": 2 / 3, "evictions": 0, "entries": 1, "bytes": 10},
+                         cache.stats())
+
+    def test_key(self):
+        """Test that the action and content type are part of the key."""
+
+        cache = ValidationCache(10)
+        handler = _CountingHandler()
+
+        cache.decode("action", handler, b"{}", "application/json")
+        cache.decode("other", handler, b"{}", "application/json")
+        cache.decode("action", handler, b"{}", "application/json; charset=latin-1")
+
+        self.assertEqual(3, handler.calls)
+
+    def test_copies_are_independent(self):
+        """Test that changing the data handed out doesn't change the cached data."""
+
+        cache = ValidationCache(10)
+        handler = _CountingHandler()
+
+        data = cache.decode("action", handler, b'{"a": {"b": [1]}}', "application/json")
+        data["a"]["b"].append(2)
+        data["c"] = 3
+
+        self.assertEqual({"a": {"b": [1]}}, cache.decode("action", handler, b'{"a": {"b": [1]}}', "application/json"))
+
+    def test_errors_are_replayed(self):
+        """Test that a failed validation is cached and raised again."""
+
+        cache = ValidationCache(10)
+        handler = _CountingHandler(fail=True)
+
+        for _ in range(2):
+            with self.assertRaises(ValidationError):
+                cache.decode("action", handler, b"{}", "application/json")
+
+        self.assertEqual(1, handler.calls)
+
+    def test_limits(self):
+        """Test that the cache is bounded by entries and bytes, and skips large bodies."""
+
+        cache = ValidationCache(2, max_bytes=100, max_entry_bytes=50)
+        handler = _CountingHandler()
+
+        for i in range(3):
+            cache.decode("action", handler, str(i).encode("utf-8"), "application/json")
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.evictions)
+
+        # Least recently used goes first
+        cache.decode("action", handler, b"1", "application/json")
+        cache.decode("action", handler, b"3", "application/json")
+        cache.decode("action", handler, b"1", "application/json")
+        self.assertEqual(4, handler.calls)
+
+        big = ("[" + ",".join(["1"] * 30) + "]").encode("utf-8")
+        cache.decode("action", handler, big, "application/json")
+        self.assertEqual(2, len(cache))
+        self.assertEqual(2, cache.size)
+
+        cache = ValidationCache(10, max_bytes=5)
+        for i in range(10, 13):
+            cache.decode("action", handler, str(i).encode("utf-8"), "application/json")
+        self.assertEqual(2, len(cache))
+
+    def test_copy_data(self):
+        """Test that copy_data copies containers and shares scalars."""
+
+        data = {"a": [{"b": "c"}], "d": b"e", "f": (1, [2])}
+        copied = copy_data(data)
+
+        self.assertEqual(data, copied)
+        self.assertIsNot(data["a"][0], copied["a"][0])
+        self.assertIsNot(data["f"][1], copied["f"][1])
+        self.assertIs(data["d"], copied["d"])
+
+
+@override_settings(RAMLWRAP_VALIDATION_ERROR_HANDLER=None)
+class ValidationCacheRequestsTestCase(TestCase):
+    """TestCase for the validation cache serving requests."""
+
+    client = None
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_off_by_default(self):
+        """Test that there is no cache unless it is configured."""
+
+        self.assertIsNone(get_validation_cache())
+
+    @override_settings(RAMLWRAP_VALIDATION_CACHE_SIZE=16)
+    def test_requests_use_cache(self):
+        """Test that repeated request bodies are served from the cache with the same outcome."""
+
+        cache = get_validation_cache()
+        cache.clear()
+
+        for _ in range(2):
+            response = self.client.post("/decoders", data='{"name": "x"}', content_type="application/json")
+            self.assertEqual({"validated_data": {"name": "x"}}, json.loads(response.content.decode("utf-8")))
+
+            response = self.client.post("/decoders", data="{}", content_type="application/json")
+            self.assertEqual(422, response.status_code)
+            self.assertEqual("required", json.loads(response.content.decode("utf-8"))["code"])
+
+        self.assertEqual(2, cache.hits)
+        self.assertEqual(2, cache.misses)
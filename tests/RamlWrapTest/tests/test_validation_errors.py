@@ -0,0 +1,108 @@
+"""Tests for reporting the first or several validation errors of a request body."""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import SimpleTestCase, override_settings
+
+from jsonschema.exceptions import ValidationError
+
+from ramlwrap.utils.schemas import SchemaValidator, ValidationErrors
+from ramlwrap.utils.telemetry import reset_validation_failures, validation_failures
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "raml")
+
+# Missing the customer, with a sku that isn't a string and a quantity below the minimum
+INVALID_ORDER = {"items": [{"sku": 1, "quantity": 0}]}
+
+
+@override_settings(RAMLWRAP_VALIDATION_ERROR_HANDLER=None)
+class ValidationErrorsTestCase(SimpleTestCase):
+    """TestCase for the fail fast and collected validation error modes."""
+
+    def setUp(self):
+        reset_validation_failures()
+
+    def _post(self, url, data):
+        return self.client.post(url, data=json.dumps(data), content_type="application/json")
+
+    def test_best_match_by_default(self):
+        """Test that without a mode the single best matching error is returned, as before."""
+
+        response = self._post("/validation-errors", INVALID_ORDER)
+        self.assertEqual(422, response.status_code)
+        self.assertEqual({"message", "code"}, set(response.json()))
+
+    def test_fail_fast(self):
+        """Test that failing fast returns the first error, with where it is in the body."""
+
+        response = self._post("/validation-errors/fail-fast", INVALID_ORDER)
+        self.assertEqual(422, response.status_code)
+        self.assertEqual({
+            "message": "Validation failed. 'customer' is a required property",
+            "code": "required",
+            "errors": [{"path": "$", "message": "'customer' is a required property", "code": "required"}],
+        }, response.json())
+
+    def test_collected(self):
+        """Test that up to the endpoint's number of errors are collected."""
+
+        response = self._post("/validation-errors/collected", INVALID_ORDER)
+        self.assertEqual(422, response.status_code)
+        self.assertEqual([("$", "required"), ("$.items[0].sku", "type")],
+                         [(error["path"], error["code"]) for error in response.json()["errors"]])
+
+        # Fewer errors than the maximum are all returned
+        response = self._post("/validation-errors/collected", {"customer": "a", "items": [{"sku": "b"}]})
+        self.assertEqual([("$.items[0]", "required")],
+                         [(error["path"], error["code"]) for error in response.json()["errors"]])
+
+    @override_settings(RAMLWRAP_MAX_VALIDATION_ERRORS=10)
+    def test_setting(self):
+        """Test that the setting applies to endpoints without their own mode."""
+
+        response = self._post("/validation-errors", INVALID_ORDER)
+        self.assertEqual(["$", "$.items[0].sku", "$.items[0].quantity"],
+                         [error["path"] for error in response.json()["errors"]])
+
+        # The endpoint's own mode wins
+        response = self._post("/validation-errors/fail-fast", INVALID_ORDER)
+        self.assertEqual(1, len(response.json()["errors"]))
+
+    def test_valid(self):
+        """Test that valid bodies are passed to the target whatever the mode."""
+
+        order = {"customer": "a", "items": [{"sku": "b", "quantity": 2}]}
+        for url in ("/validation-errors", "/validation-errors/fail-fast", "/validation-errors/collected"):
+            response = self._post(url, order)
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(order, response.json()["validated_data"])
+
+    def test_each_error_counted(self):
+        """Test that the telemetry counts every collected error at its path."""
+
+        self._post("/validation-errors/collected", INVALID_ORDER)
+        self.assertEqual([("$", "required"), ("$.items[0].sku", "type")],
+                         [(failure["path"], failure["validator"]) for failure in validation_failures()])
+
+    def test_validator(self):
+        """Test the errors raised by a SchemaValidator given the number to collect."""
+
+        with open(os.path.join(FIXTURES, "json", "order_request.json")) as f:
+            validator = SchemaValidator(json.load(f))
+
+        with self.assertRaises(ValidationErrors) as raised:
+            validator.validate(INVALID_ORDER, 2)
+        e = raised.exception
+        self.assertIsInstance(e, ValidationError)
+        self.assertEqual(2, len(e.errors))
+        # Raised as the first error
+        self.assertEqual((e.errors[0].message, e.errors[0].validator), (e.message, e.validator))
+
+        with self.assertRaises(ValidationError) as raised:
+            validator.validate(INVALID_ORDER)
+        self.assertNotIsInstance(raised.exception, ValidationErrors)
+
+        validator.validate({"customer": "a", "items": []}, 2)
@@ -0,0 +1,191 @@
+"""Tests for the framework independent core and its WSGI/ASGI adapter."""
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from django.test import SimpleTestCase, override_settings
+
+from ramlwrap.utils.core import QueryDict, Response
+from ramlwrap.utils.wsgi import RamlApplication
+
+
+def _echo_target(request):
+    """Return the validated data."""
+    return {"received": request.validated_data}
+
+
+def _query_target(request):
+    """Return the query parameters."""
+    return {"param2": request.GET.get("param2")}
+
+
+def _response_target(request):
+    """Return a core Response."""
+    return Response(b"plain", status_code=201, content_type="text/plain", headers={"X-Test": "yes"})
+
+
+def _dynamic_target(request, dynamic_id, dynamic_id_2):
+    """Return the dynamic values."""
+    return {"dynamicValueOne": dynamic_id, "dynamicValueTwo": dynamic_id_2}
+
+
+FUNCTION_MAP = {
+    "api": {"function": _echo_target},
+    "api/3": {"function": _query_target},
+    "api/5": {"function": _response_target},
+}
+
+
+def _call(app, method, path, body=b"", content_type=None, query_string=""):
+    """Call the WSGI application and return the status, headers and body."""
+
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "QUERY_STRING": query_string,
+        "CONTENT_LENGTH": str(len(body)) if body else "",
+        "wsgi.input": io.BytesIO(body),
+    }
+    if content_type:
+        environ["CONTENT_TYPE"] = content_type
+
+    started = {}
+
+    def start_response(status, headers):
+        started["status"] = status
+        started["headers"] = dict(headers)
+
+    content = b"".join(app(environ, start_response))
+    return started["status"], started["headers"], content
+
+
+@override_settings(RAMLWRAP_VALIDATION_ERROR_HANDLER=None)
+class WSGIAdapterTestCase(SimpleTestCase):
+    """TestCase for serving raml endpoints without Django."""
+
+    def setUp(self):
+        self.app = RamlApplication("RamlWrapTest/tests/fixtures/raml/test.raml", FUNCTION_MAP)
+
+    def test_valid_body_reaches_target(self):
+        """Test that the validated body is handed to the target."""
+
+        status, headers, content = _call(self.app, "POST", "/api", b'{"data": "value"}', "application/json")
+        self.assertEqual("200 OK", status)
+        self.assertEqual("application/json", headers["Content-Type"])
+        self.assertEqual({"received": {"data": "value"}}, json.loads(content.decode("utf-8")))
+
+    def test_invalid_body_returns_422(self):
+        """Test that a body failing its schema returns the validation error."""
+
+        status, _, content = _call(self.app, "POST", "/api", b"{}", "application/json")
+        self.assertEqual("422 Unprocessable Entity", status)
+        self.assertEqual({"message": "Validation failed. 'data' is a required property", "code": "required"},
+                         json.loads(content.decode("utf-8")))
+
+    def test_missing_content_type_returns_415(self):
+        """Test that a body without a content type returns a 415."""
+
+        status, _, _ = _call(self.app, "POST", "/api", b"{}")
+        self.assertEqual("415 Unsupported Media Type", status)
+
+    def test_query_params(self):
+        """Test that query parameters are validated and passed to the target."""
+
+        status, _, content = _call(self.app, "GET", "/api/3", query_string="param2=hello")
+        self.assertEqual("200 OK", status)
+        self.assertEqual({"param2": "hello"}, json.loads(content.decode("utf-8")))
+
+        status, _, _ = _call(self.app, "GET", "/api/3", query_string="param2=hi")
+        self.assertEqual("422 Unprocessable Entity", status)
+
+    def test_example_returned(self):
+        """Test that actions without a target return their example."""
+
+        status, headers, content = _call(self.app, "GET", "/api/2")
+        self.assertEqual("200 OK", status)
+        self.assertEqual("application/json", headers["Content-Type"])
+        self.assertTrue(json.loads(content.decode("utf-8")))
+
+    def test_core_response_returned(self):
+        """Test that a core Response returned by a target is sent as is."""
+
+        status, headers, content = _call(self.app, "PUT", "/api/5")
+        self.assertEqual("201 Created", status)
+        self.assertEqual("yes", headers["X-Test"])
+        self.assertEqual(b"plain", content)
+
+    def test_not_found_and_not_allowed(self):
+        """Test that unknown paths return 404 and unknown methods 405."""
+
+        self.assertEqual("404 Not Found", _call(self.app, "GET", "/nope")[0])
+
+        status, headers, _ = _call(self.app, "DELETE", "/api/3")
+        self.assertEqual("405 Method Not Allowed", status)
+        self.assertEqual(["GET", "POST"], sorted(m.strip() for m in headers["Allow"].split(",")))
+
+    def test_dynamic_values(self):
+        """Test that dynamic url values are passed to the target."""
+
+        app = RamlApplication("RamlWrapTest/tests/fixtures/raml/test_dynamic.raml", {
+            "dynamicapi/{dynamic_id}/{dynamic_id_2}/api3": {
+                "function": _dynamic_target,
+                "regex": {"dynamic_id": "(?P<dynamic_id>[a-zA-Z]+)", "dynamic_id_2": "(?P<dynamic_id_2>[0-9]+)"}
+            }
+        })
+
+        status, _, content = _call(app, "GET", "/dynamicapi/aBc/123/api3")
+        self.assertEqual("200 OK", status)
+        self.assertEqual({"dynamicValueOne": "aBc", "dynamicValueTwo": "123"}, json.loads(content.decode("utf-8")))
+        self.assertEqual("404 Not Found", _call(app, "GET", "/dynamicapi/123/aBc/api3")[0])
+
+    def test_asgi(self):
+        """Test that the ASGI entry point validates and serves the request."""
+
+        sent = []
+        messages = [
+            {"type": "http.request", "body": b'{"data": ', "more_body": True},
+            {"type": "http.request", "body": b'"value"}', "more_body": False},
+        ]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/api",
+            "query_string": b"",
+            "headers": [(b"content-type", b"application/json")],
+        }
+        asyncio.run(self.app.asgi(scope, receive, send))
+
+        self.assertEqual(200, sent[0]["status"])
+        self.assertEqual({"received": {"data": "value"}}, json.loads(sent[1]["body"].decode("utf-8")))
+
+    def test_query_dict(self):
+        """Test that the core QueryDict reads like Django's."""
+
+        query = QueryDict("a=1&a=2&b=")
+        self.assertEqual("2", query["a"])
+        self.assertEqual("2", query.get("a"))
+        self.assertEqual(["1", "2"], query.getlist("a"))
+        self.assertEqual("", query.get("b"))
+        self.assertEqual(None, query.get("c"))
+
+    def test_no_django_import(self):
+        """Test that the core and WSGI adapter do not import Django."""
+
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../"))
+        env = dict(os.environ, PYTHONPATH=root)
+        env.pop("DJANGO_SETTINGS_MODULE", None)
+        output = subprocess.check_output(
+            [sys.executable, "-c", "import sys, ramlwrap.utils.wsgi; print('django' in sys.modules)"], env=env)
+        self.assertEqual(b"False", output.strip())
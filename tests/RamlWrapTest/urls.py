@@ -17,7 +17,10 @@ from django.urls import re_path
 from django.contrib import admin
 
 from ramlwrap import ramlwrap
-from RamlWrapTest.apis.test_apis import dynamic_api_one, dynamic_api_two, regular_api
+from RamlWrapTest.apis.test_apis import dynamic_api_one, dynamic_api_two, regular_api, \
+    valid_response_api, invalid_response_api, echo_validated_data_api, echo_validated_query_api, \
+    echo_dynamic_values_api, counting_api, counting_api_version, large_api, \
+    streaming_api, empty_streaming_api, echo_validated_data_meta_api
 from ramlwrap.views import noscript
 from ramlwrap.views import RamlDoc
 
@@ -46,10 +49,73 @@ function_map = {
     'api/multi_content_type': {'function': regular_api},
     'api/no_content_type': {'function': regular_api},
 
+    # urls for response validation
+    'response-validation/valid': {'function': valid_response_api},
+    'response-validation/invalid': {'function': invalid_response_api},
+    'response-validation/sampled': {'function': invalid_response_api, 'response_validation_rate': 1},
+
+    # url with a body size limit
+    'limits/mapped': {'max_body_size': 8},
+
+    # url accepting several decoded content types
+    'decoders': {'function': echo_validated_data_api},
+
+    # url accepting and responding with binary formats
+    'binary-formats': {'function': echo_validated_data_api},
+
+    # url with typed query parameters
+    'typed-query': {'function': echo_validated_query_api},
+
+    # urls matched with regexes built from their uriParameters
+    'uri-parameters/orders/{order_id}': {'function': echo_dynamic_values_api},
+    'uri-parameters/orders/{order_id}/items/{item}': {'function': echo_dynamic_values_api},
+    'uri-parameters/flags/{flag}/{ratio}': {'function': echo_dynamic_values_api},
+    'uri-parameters/codes/{code}': {'function': echo_dynamic_values_api},
+    'uri-parameters/names/{name}': {'function': echo_dynamic_values_api, 'regex': {'name': '(?P<name>[a-z]+)'}},
+    'uri-parameters/lengths/{length}': {'function': echo_dynamic_values_api},
+
+    # urls with cached responses
+    'cached': {'function': counting_api},
+    'cached/{item}': {'function': counting_api},
+    'cached-by-map': {'function': counting_api, 'cache': {'ttl': 60}},
+    'not-cached': {'function': counting_api, 'cache': None},
+
+    # urls answering If-None-Match with 304s
+    'etag': {'function': valid_response_api},
+    'etag/counting': {'function': counting_api},
+    'etag/versioned': {'function': counting_api, 'etag': counting_api_version},
+
+    # url with compressed responses
+    'compressed/target': {'function': large_api, 'compression': {'min_size': 100, 'level': 9}},
+
+    # urls streaming their responses
+    'streamed': {'function': streaming_api},
+    'streamed/ndjson': {'function': streaming_api},
+    'streamed/empty': {'function': empty_streaming_api},
+
+    # urls reporting the first or several validation errors
+    'validation-errors': {'function': echo_validated_data_api},
+    'validation-errors/fail-fast': {'function': echo_validated_data_api, 'max_validation_errors': 1},
+    'validation-errors/collected': {'function': echo_validated_data_api, 'max_validation_errors': 2},
+
+    # url validating a sample of the items of large arrays
+    'bulk': {'function': echo_validated_data_meta_api, 'sampled_validation': {'first': 10, 'rate': 0.1}},
+
 }
 
-# Load in test raml file
+# Load in test raml files
 urlpatterns.extend(ramlwrap("RamlWrapTest/tests/fixtures/raml/test.raml", function_map))
 urlpatterns.extend(ramlwrap("RamlWrapTest/tests/fixtures/raml/test_dynamic.raml", function_map))
 urlpatterns.extend(ramlwrap("RamlWrapTest/tests/fixtures/raml/ramlv1_tests.raml", function_map))
-
+urlpatterns.extend(ramlwrap("RamlWrapTest/tests/fixtures/raml/test_response_validation.raml", function_map))
+urlpatterns.extend(ramlwrap("RamlWrapTest/tests/fixtures/raml/test_body_limits.raml", function_map))
+urlpatterns.extend(ramlwrap("RamlWrapTest/tests/fixtures/raml/test_decoders.raml", function_map))
+urlpatterns.extend(ramlwrap("RamlWrapTest/tests/fixtures/raml/test_binary_formats.raml", function_map))
+urlpatterns.extend(ramlwrap("RamlWrapTest/tests/fixtures/raml/test_query.raml", function_map))
+urlpatterns.extend(ramlwrap("RamlWrapTest/tests/fixtures/raml/test_uri_parameters.raml", function_map))
+urlpatterns.extend(ramlwrap("RamlWrapTest/tests/fixtures/raml/test_response_cache.raml", function_map))
+urlpatterns.extend(ramlwrap("RamlWrapTest/tests/fixtures/raml/test_etag.raml", function_map))
+urlpatterns.extend(ramlwrap("RamlWrapTest/tests/fixtures/raml/test_compression.raml", function_map))
+urlpatterns.extend(ramlwrap("RamlWrapTest/tests/fixtures/raml/test_streaming.raml", function_map))
+urlpatterns.extend(ramlwrap("RamlWrapTest/tests/fixtures/raml/test_validation_errors.raml", function_map))
+urlpatterns.extend(ramlwrap("RamlWrapTest/tests/fixtures/raml/test_sampled_validation.raml", function_map))
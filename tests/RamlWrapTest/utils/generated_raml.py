@@ -0,0 +1,45 @@
+"""
+A generated raml file of many similar resources, for measuring the memory
+held by the endpoints built from it (test_memory.py and preload_memory.py).
+"""
+
+RESOURCE = """/resource%(i)d:
+  post:
+    body:
+      application/json:
+        schema: |
+          {"type": "object", "required": ["name"],
+           "properties": {"name": {"type": "string", "maxLength": %(i)d}, "count": {"type": "integer"}}}
+    responses:
+      200:
+        body:
+          application/json:
+            example: |
+              {"name": "example %(i)d", "count": 1}
+  get:
+    queryParameters:
+      page:
+        type: integer
+    responses:
+      200:
+        body:
+          application/json:
+            example: |
+              {"name": "example %(i)d"}
+"""
+
+
+def write_raml(path, resources, title="Generated"):
+    """
+    Write a raml file with a post and a get on each of /resource0 to /resource<resources - 1>,
+    each post with a distinct schema.
+    :param path: the file to write.
+    :param resources: the number of resources.
+    :param title: the title of the raml.
+    :returns: returns nothing.
+    """
+
+    with open(path, "w") as f:
+        f.write("#%%RAML 0.8\n---\ntitle: %s\n" % title)
+        for i in range(resources):
+            f.write(RESOURCE % {"i": i})
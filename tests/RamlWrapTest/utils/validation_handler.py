@@ -34,3 +34,25 @@ def custom_validation_with_request_action(e, request, action):
         "path": request.path,
         "content_type": action.requ_content_type
     }
+
+
+response_validation_failures = []
+
+
+def record_response_validation_failure(e, request, action, response):
+    """
+    Response validation handler that records every failure it is given.
+    """
+
+    response_validation_failures.append((e, request, action, response))
+
+
+validation_telemetry_reports = []
+
+
+def record_validation_telemetry(report):
+    """
+    Telemetry handler keeping the reports it is given.
+    """
+
+    validation_telemetry_reports.append(report)
@@ -0,0 +1,107 @@
+"""
+Measure the memory each pre-forked worker doesn't share with the master, with
+and without ramlwrap.preload.
+
+    python preload_memory.py --workers 4 --resources 500
+
+The master builds a RamlApplication for a generated raml file (and preloads it
+or not), then forks the workers. Each worker serves every endpoint a few times
+and runs a garbage collection, as a long lived worker would, and reports its
+unique set size (private pages, from /proc/self/smaps_rollup - Linux only).
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from RamlWrapTest.utils.generated_raml import write_raml
+
+
+def _unique_set_size():
+    """Private (unshared) memory of this process in KiB."""
+
+    total = 0
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                total += int(line.split()[1])
+    return total
+
+
+def _worker(app, resources, write_fd):
+    from ramlwrap.utils.core import Request
+
+    for _ in range(3):
+        for i in range(resources):
+            app.handle(Request("GET", "/resource%d" % i))
+            app.handle(Request("POST", "/resource%d" % i, {"content-type": "application/json"},
+                               body=b'{"name": "x"}', content_type="application/json", content_length=13))
+    gc.collect()
+
+    os.write(write_fd, ("%d\n" % _unique_set_size()).encode("ascii"))
+    os._exit(0)
+
+
+def measure(raml_path, resources, workers, preload):
+    """Fork the workers and return their unique set sizes in KiB."""
+
+    import ramlwrap
+    from ramlwrap.utils.wsgi import RamlApplication
+
+    app = RamlApplication(raml_path, {})
+    if preload:
+        ramlwrap.preload(app)
+
+    read_fd, write_fd = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            _worker(app, resources, write_fd)
+        pids.append(pid)
+
+    os.close(write_fd)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    with os.fdopen(read_fd) as f:
+        return [int(line) for line in f.read().split()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per worker unique memory with and without preload.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--resources", type=int, default=500)
+    parser.add_argument("--mode", choices=["preload", "lazy"], default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--raml", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        sizes = measure(args.raml, args.resources, args.workers, args.mode == "preload")
+        print(json.dumps(sizes))
+        return
+
+    directory = tempfile.mkdtemp()
+    try:
+        raml_path = os.path.join(directory, "api.raml")
+        write_raml(raml_path, args.resources, "Preload")
+
+        for mode in ("lazy", "preload"):
+            # Each mode in a fresh interpreter so neither inherits the other's heap
+            output = subprocess.check_output([sys.executable, __file__, "--mode", mode, "--raml", raml_path,
+                                              "--workers", str(args.workers), "--resources", str(args.resources)])
+            sizes = json.loads(output)
+            print("%-8s unique KiB per worker: mean %d (%s)" % (mode, sum(sizes) / len(sizes),
+                                                             ", ".join(str(size) for size in sizes)))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()